@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+論理パーティションの偏りを分析するスクリプト
+
+コンテナごとにパーティションキーとドキュメント種別（type）だけを射影したクエリで
+全件をストリーミングし、論理パーティションごとの件数と推定サイズを集計する。
+
+- 推定サイズ: 種別ごとに少数のドキュメントを取得して平均サイズを求め、件数に掛けて推定する
+- 偏り: 最大パーティションの件数 / 平均件数（skew）と上位N件のホットキー
+- 論理パーティションの上限（20GB）に近づいているパーティションを警告する
+- --metrics-json に MetricsRegistry.to_json() の出力を渡すと、コンテナごとの消費RUと
+  429の回数を合わせて表示する
+
+Usage:
+    python scripts/analyze_partitions.py
+    python scripts/analyze_partitions.py --database auth_management --top 20
+    python scripts/analyze_partitions.py --metrics-json metrics.json --json report.json
+"""
+import argparse
+import json
+import sys
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# .envファイルを自動読み込み
+from dotenv import load_dotenv
+
+# プロジェクトルート
+project_root = Path(__file__).resolve().parent.parent
+
+# .envファイルの読み込み
+if not os.getenv("COSMOS_DB_ENDPOINT"):
+    env_file = project_root / "src" / "auth-service" / ".env"
+    if env_file.exists():
+        load_dotenv(env_file)
+        print(f"📝 環境変数を読み込みました: {env_file}")
+
+# プロジェクトルートをパスに追加
+sys.path.append(str(project_root / 'src'))
+
+from shared.cosmos_client import CosmosDBClient
+from shared.pagination import stream_query
+from shared.partition_key import get_partition_key_paths
+from shared.provisioning import load_manifest
+
+# スキーママニフェスト（分析対象のデータベース・コンテナ定義）
+DEFAULT_MANIFEST = project_root / "scripts" / "schema" / "cosmos_schema.json"
+# 論理パーティションのサービス上限
+LOGICAL_PARTITION_LIMIT_BYTES = 20 * 1024 ** 3
+# この割合を超えたパーティションを警告する
+PARTITION_SIZE_WARNING_RATIO = 0.5
+DEFAULT_TOP = 10
+DEFAULT_SAMPLE_SIZE = 100
+DEFAULT_SKEW_THRESHOLD = 10.0
+SCAN_PAGE_SIZE = 1000
+TYPE_FIELD = "type"
+UNTYPED = "(none)"
+
+
+def _property_ref(path: str) -> str:
+    """パーティションキーパスをクエリのプロパティ参照に変換（/a/b → c["a"]["b"]）"""
+    return "c" + "".join(f'["{segment}"]' for segment in path.strip("/").split("/"))
+
+
+def projection_query(paths: List[str]) -> str:
+    """パーティションキーと type だけを取得するクエリ"""
+    columns = [f"{_property_ref(path)} AS pk{idx}" for idx, path in enumerate(paths)]
+    columns.append(f"c.{TYPE_FIELD} AS {TYPE_FIELD}")
+    return f"SELECT {', '.join(columns)} FROM c"
+
+
+def _document_size(document: Dict[str, Any]) -> int:
+    return len(json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def sample_document_sizes(container, sample_size: int) -> Dict[str, float]:
+    """種別ごとの平均ドキュメントサイズ（バイト）を少数のサンプルから求める
+
+    DISTINCT は type が未定義のドキュメントを返さないため、type のない（または null の）
+    ドキュメントは常に別途サンプリングして UNTYPED として扱う。
+    """
+    types = [doc_type for doc_type in
+             stream_query(container, f"SELECT DISTINCT VALUE c.{TYPE_FIELD} FROM c")
+             if doc_type is not None]
+    samples_by_type = [
+        (doc_type, f"SELECT TOP {sample_size} * FROM c WHERE c.{TYPE_FIELD} = @type",
+         [{"name": "@type", "value": doc_type}])
+        for doc_type in types
+    ]
+    samples_by_type.append((
+        UNTYPED,
+        f"SELECT TOP {sample_size} * FROM c "
+        f"WHERE NOT IS_DEFINED(c.{TYPE_FIELD}) OR IS_NULL(c.{TYPE_FIELD})",
+        None))
+    sizes: Dict[str, float] = {}
+    for doc_type, query, parameters in samples_by_type:
+        samples = [_document_size(document)
+                   for document in stream_query(container, query, parameters=parameters)]
+        if samples:
+            sizes[doc_type] = sum(samples) / len(samples)
+    return sizes
+
+
+class PartitionStats:
+    """論理パーティションごとの件数と推定サイズ"""
+
+    def __init__(self, average_sizes: Dict[str, float]):
+        self.average_sizes = average_sizes
+        self.fallback_size = (
+            sum(average_sizes.values()) / len(average_sizes) if average_sizes else 0.0)
+        self.counts: Dict[Any, int] = {}
+        self.bytes: Dict[Any, float] = {}
+        self.type_counts: Dict[str, int] = {}
+
+    def add(self, key: Any, doc_type: Optional[str]):
+        doc_type = doc_type if doc_type is not None else UNTYPED
+        size = self.average_sizes.get(doc_type, self.fallback_size)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.bytes[key] = self.bytes.get(key, 0.0) + size
+        self.type_counts[doc_type] = self.type_counts.get(doc_type, 0) + 1
+
+    def top(self, n: int, by_size: bool = False) -> List[Tuple[Any, int, float]]:
+        values = self.bytes if by_size else self.counts
+        keys = sorted(values, key=values.get, reverse=True)[:n]
+        return [(key, self.counts[key], self.bytes[key]) for key in keys]
+
+    def summary(self) -> Dict[str, Any]:
+        documents = sum(self.counts.values())
+        partitions = len(self.counts)
+        largest = max(self.counts.values(), default=0)
+        ordered = sorted(self.counts.values())
+        mean = documents / partitions if partitions else 0.0
+        return {
+            "documents": documents,
+            "partitions": partitions,
+            "estimatedBytes": round(sum(self.bytes.values())),
+            "meanDocuments": round(mean, 2),
+            "medianDocuments": ordered[len(ordered) // 2] if ordered else 0,
+            "maxDocuments": largest,
+            "maxEstimatedBytes": round(max(self.bytes.values(), default=0.0)),
+            "skew": round(largest / mean, 2) if mean else 0.0,
+            "types": dict(sorted(self.type_counts.items())),
+        }
+
+
+def analyze_container(
+    client,
+    database: str,
+    container_name: str,
+    top: int = DEFAULT_TOP,
+    sample_size: int = DEFAULT_SAMPLE_SIZE
+) -> Dict[str, Any]:
+    """1コンテナのパーティション分布を集計"""
+    container = client.get_database_client(database).get_container_client(container_name)
+    paths = get_partition_key_paths(container)
+    started_at = time.monotonic()
+
+    stats = PartitionStats(sample_document_sizes(container, sample_size))
+    for row in stream_query(container, projection_query(paths), page_size=SCAN_PAGE_SIZE):
+        values = [row.get(f"pk{idx}") for idx in range(len(paths))]
+        key = values[0] if len(values) == 1 else tuple(values)
+        stats.add(key, row.get(TYPE_FIELD))
+
+    def entries(rows):
+        return [
+            {"partitionKey": list(key) if isinstance(key, tuple) else key,
+             "documents": count, "estimatedBytes": round(size)}
+            for key, count, size in rows
+        ]
+
+    return {
+        "database": database,
+        "container": container_name,
+        "partitionKeyPaths": paths,
+        "averageDocumentBytes": {
+            doc_type: round(size) for doc_type, size in sorted(stats.average_sizes.items())},
+        **stats.summary(),
+        "topByDocuments": entries(stats.top(top)),
+        "topByEstimatedBytes": entries(stats.top(top, by_size=True)),
+        "elapsedSeconds": round(time.monotonic() - started_at, 2),
+    }
+
+
+def load_request_metrics(path: str) -> Dict[Tuple[str, str], Dict[str, float]]:
+    """MetricsRegistry.to_json() の出力からコンテナごとの消費RU・429回数を集計"""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for operation in data.get("operations", []):
+        key = (operation.get("database", ""), operation.get("container", ""))
+        entry = totals.setdefault(key, {"requestCharge": 0.0, "requests": 0, "throttled": 0})
+        entry["requestCharge"] += float(operation.get("requestCharge", 0) or 0)
+        entry["requests"] += int(operation.get("count", 0) or 0)
+        entry["throttled"] += int(operation.get("throttled", 0) or 0)
+    return totals
+
+
+def _format_bytes(size: float) -> str:
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KB", "MB"):
+        size /= 1024
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+    return f"{size / 1024:.1f} GB"
+
+
+def print_report(report: Dict[str, Any], skew_threshold: float):
+    """コンテナ1つ分の分析結果を表示"""
+    label = f"{report['database']}/{report['container']}"
+    print(f"\n{'=' * 60}")
+    print(f"{label} (パーティションキー: {', '.join(report['partitionKeyPaths'])})")
+    print("=" * 60)
+    print(f"  ドキュメント数  : {report['documents']:,} "
+          f"({', '.join(f'{t}: {n:,}' for t, n in report['types'].items())})")
+    print(f"  論理パーティション: {report['partitions']:,} "
+          f"(平均 {report['meanDocuments']} 件, 中央値 {report['medianDocuments']} 件, "
+          f"最大 {report['maxDocuments']:,} 件)")
+    print(f"  推定サイズ      : {_format_bytes(report['estimatedBytes'])} "
+          f"(最大パーティション {_format_bytes(report['maxEstimatedBytes'])})")
+    if "requestCharge" in report:
+        print(f"  消費RU          : {report['requestCharge']:.1f} "
+              f"({report['requests']} リクエスト, 429: {report['throttled']} 回)")
+
+    mark = "⚠" if report["skew"] >= skew_threshold else "✓"
+    print(f"  {mark} skew (最大 / 平均): {report['skew']}")
+    if report["maxEstimatedBytes"] >= LOGICAL_PARTITION_LIMIT_BYTES * PARTITION_SIZE_WARNING_RATIO:
+        print("  ⚠ 論理パーティションの上限（20GB）の半分を超えるパーティションがあります")
+
+    if report["topByDocuments"]:
+        print("\n  ホットキー（件数順）:")
+        for entry in report["topByDocuments"]:
+            print(f"    {str(entry['partitionKey']):40s} {entry['documents']:>10,} 件 "
+                  f"{_format_bytes(entry['estimatedBytes']):>10s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="論理パーティションの偏りを分析")
+    parser.add_argument(
+        "--manifest",
+        default=str(DEFAULT_MANIFEST),
+        help=f"対象のスキーママニフェスト (デフォルト: {DEFAULT_MANIFEST.relative_to(project_root)})",
+    )
+    parser.add_argument("--database", action="append", help="対象のデータベース（複数指定可）")
+    parser.add_argument("--container", action="append", help="対象のコンテナ（複数指定可）")
+    parser.add_argument(
+        "--top", type=int, default=DEFAULT_TOP, help=f"表示するホットキー数（デフォルト: {DEFAULT_TOP}）")
+    parser.add_argument(
+        "--sample-size",
+        type=int,
+        default=DEFAULT_SAMPLE_SIZE,
+        help=f"サイズ推定に使う種別ごとのサンプル数（デフォルト: {DEFAULT_SAMPLE_SIZE}）",
+    )
+    parser.add_argument(
+        "--skew-threshold",
+        type=float,
+        default=DEFAULT_SKEW_THRESHOLD,
+        help=f"警告する skew（最大 / 平均）の閾値（デフォルト: {DEFAULT_SKEW_THRESHOLD}）",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help="MetricsRegistry.to_json() の出力（/metrics.json）を合わせて表示する",
+    )
+    parser.add_argument("--json", help="分析結果をJSONファイルに出力する")
+    args = parser.parse_args()
+
+    print("=== パーティション分布の分析開始 ===")
+
+    try:
+        manifest = load_manifest(args.manifest)
+        request_metrics = load_request_metrics(args.metrics_json) if args.metrics_json else {}
+        client = CosmosDBClient().client
+
+        reports = []
+        for database in manifest["databases"]:
+            if args.database and database["id"] not in args.database:
+                continue
+            for spec in database.get("containers", []):
+                if args.container and spec["id"] not in args.container:
+                    continue
+                report = analyze_container(
+                    client, database["id"], spec["id"],
+                    top=args.top, sample_size=args.sample_size)
+                report.update(request_metrics.get((database["id"], spec["id"]), {}))
+                print_report(report, args.skew_threshold)
+                reports.append(report)
+
+        if args.json:
+            Path(args.json).write_text(
+                json.dumps({"containers": reports}, ensure_ascii=False, indent=2),
+                encoding="utf-8")
+            print(f"\n✓ 分析結果を出力しました: {args.json}")
+
+        hot = [f"{r['database']}/{r['container']}"
+               for r in reports if r["skew"] >= args.skew_threshold]
+        if hot:
+            print(f"\n⚠ 偏りの大きいコンテナ: {', '.join(hot)}")
+        print("\n=== 分析完了 ===")
+    except Exception as e:
+        print(f"\n✗ エラー: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
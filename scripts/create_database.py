@@ -1,7 +1,15 @@
 #!/usr/bin/env python3
 """
 Cosmos DB データベースとコンテナを作成するスクリプト
+
+scripts/schema/cosmos_schema.json に宣言された構成と実環境の差分のみを作成します。
+
+Usage:
+    python scripts/create_database.py
+    python scripts/create_database.py --dry-run
+    python scripts/create_database.py --manifest path/to/schema.yaml
 """
+import argparse
 import sys
 import os
 from pathlib import Path
@@ -25,64 +33,60 @@ if not os.getenv("COSMOS_DB_ENDPOINT"):
 sys.path.append(str(project_root / 'src'))
 
 from shared.cosmos_client import CosmosDBClient
+from shared.provisioning import load_manifest, provision
 
+# スキーママニフェスト（データベース・コンテナ定義）
+DEFAULT_MANIFEST = project_root / "scripts" / "schema" / "cosmos_schema.json"
 
-def create_auth_database():
-    """認証認可データベース作成"""
-    print("\n=== auth_management データベース作成 ===")
-    
-    client = CosmosDBClient(database_name="auth_management")
-    client.create_database()
-    
-    # users コンテナ
-    client.create_container("users", partition_key_path="/id")
-    
-    # roles コンテナ
-    client.create_container("roles", partition_key_path="/serviceId")
-    
-    print("✓ auth_management セットアップ完了\n")
-
-
-def create_tenant_database():
-    """テナント管理データベース作成"""
-    print("=== tenant_management データベース作成 ===")
-    
-    client = CosmosDBClient(database_name="tenant_management")
-    client.create_database()
-    
-    # tenants コンテナ
-    client.create_container("tenants", partition_key_path="/id")
-    
-    print("✓ tenant_management セットアップ完了\n")
-
-
-def create_service_database():
-    """サービス設定データベース作成"""
-    print("=== service_management データベース作成 ===")
-    
-    client = CosmosDBClient(database_name="service_management")
-    client.create_database()
-    
-    # services コンテナ
-    client.create_container("services", partition_key_path="/id")
-    
-    # tenant_services コンテナ（テナント-サービス紐付け）
-    client.create_container("tenant_services", partition_key_path="/tenantId")
-    
-    print("✓ service_management セットアップ完了\n")
 
+def print_plan(actions):
+    """検出した差分を表示"""
+    if not actions:
+        print("✓ すべてのデータベース・コンテナは作成済みです")
+        return
+    for action in actions:
+        if action.kind == "create_database":
+            print(f"+ Database '{action.database}'")
+        elif action.kind == "create_container":
+            print(f"+ Container '{action.label}'")
+        elif action.kind == "update_indexing_policy":
+            print(f"~ Container '{action.label}' indexing policy: {action.detail}")
+        else:
+            print(f"⚠ Container '{action.label}': {action.detail}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cosmos DB データベースとコンテナを作成")
+    parser.add_argument(
+        "--manifest",
+        default=str(DEFAULT_MANIFEST),
+        help=f"スキーママニフェスト (デフォルト: {DEFAULT_MANIFEST.relative_to(project_root)})",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="差分の表示のみ行い、作成しない",
+    )
+    args = parser.parse_args()
 
-if __name__ == "__main__":
     print("=== Cosmos DB セットアップ開始 ===\n")
-    
+
     try:
-        create_auth_database()
-        create_tenant_database()
-        create_service_database()
-        
-        print("=== すべてのデータベースセットアップ完了 ===")
+        manifest = load_manifest(args.manifest)
+        client = CosmosDBClient()
+        actions = provision(client.client, manifest, dry_run=args.dry_run)
+        print_plan(actions)
+
+        if args.dry_run:
+            print("\n=== ドライラン完了（変更なし） ===")
+        else:
+            print("\n=== すべてのデータベースセットアップ完了 ===")
     except Exception as e:
         print(f"✗ エラー: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+メールアドレスのインデックス（auth_management/user_email_index）を検証・再構築するスクリプト
+
+users コンテナの user ドキュメントを id・userId・tenantId だけ射影してストリーミングし、
+インデックスコンテナと突き合わせる。
+
+- verify : 不足・内容の不一致・対応するユーザーのないエントリ・重複したメールアドレスを表示
+- rebuild: 不足と不一致のエントリだけを一括書き込み（--prune で対応するユーザーのない
+           エントリも削除）
+
+ユーザー側の期待値はメモリに保持する（1ユーザーあたり100バイト程度）。
+
+Usage:
+    python scripts/email_index.py verify
+    python scripts/email_index.py rebuild --prune --provisioned-ru 1000
+"""
+import argparse
+import sys
+import os
+import time
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List
+
+# .envファイルを自動読み込み
+from dotenv import load_dotenv
+
+# プロジェクトルート
+project_root = Path(__file__).resolve().parent.parent
+
+# .envファイルの読み込み
+if not os.getenv("COSMOS_DB_ENDPOINT"):
+    env_file = project_root / "src" / "auth-service" / ".env"
+    if env_file.exists():
+        load_dotenv(env_file)
+        print(f"📝 環境変数を読み込みました: {env_file}")
+
+# プロジェクトルートをパスに追加
+sys.path.append(str(project_root / 'src'))
+
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from shared.bulk import bulk_write
+from shared.cosmos_client import CosmosDBClient
+from shared.email_index import email_index_document
+from shared.pagination import stream_query
+from shared.throttle import RUBudgetController
+
+DATABASE = "auth_management"
+USERS_CONTAINER = "users"
+INDEX_CONTAINER = "user_email_index"
+SCAN_PAGE_SIZE = 1000
+WRITE_CHUNK_SIZE = 1000
+# 比較する項目（contentHash などシード時に付与される項目は比較しない）
+COMPARED_FIELDS = ("id", "type", "email", "userId", "tenantId", "partitionKey")
+# 不一致として表示する最大件数
+MAX_REPORTED_MISMATCHES = 10
+
+
+def _compared(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {field: document.get(field) for field in COMPARED_FIELDS}
+
+
+def expected_entries(users) -> Dict[str, Any]:
+    """users コンテナから期待するインデックスを組み立てる（重複したキーも返す）"""
+    expected: Dict[str, Dict[str, Any]] = {}
+    duplicates: Dict[str, List[str]] = {}
+    scanned = 0
+    for user in stream_query(
+            users, "SELECT c.id, c.userId, c.tenantId FROM c WHERE c.type = 'user' "
+            "AND (NOT IS_DEFINED(c.isDeleted) OR c.isDeleted = false)",
+            page_size=SCAN_PAGE_SIZE):
+        scanned += 1
+        if not user.get("userId"):
+            continue
+        entry = email_index_document(user)
+        current = expected.get(entry["id"])
+        if current is None:
+            expected[entry["id"]] = entry
+            continue
+        duplicates.setdefault(entry["id"], [current["userId"]]).append(user["id"])
+        # 重複時は id の小さいユーザーを指す（実行のたびに結果が変わらないように）
+        if user["id"] < current["userId"]:
+            expected[entry["id"]] = entry
+    print(f"✓ ユーザーを走査しました: {scanned:,} 件")
+    return {"entries": expected, "duplicates": duplicates}
+
+
+def verify(users, index) -> Dict[str, Any]:
+    """インデックスを期待値と突き合わせる"""
+    expected = expected_entries(users)
+    entries = expected["entries"]
+    seen = set()
+    result: Dict[str, Any] = {
+        "users": len(entries), "index": 0, "missing": [], "stale": [], "orphaned": [],
+        "duplicates": expected["duplicates"],
+    }
+    for entry in stream_query(index, "SELECT * FROM c", page_size=SCAN_PAGE_SIZE):
+        result["index"] += 1
+        seen.add(entry["id"])
+        wanted = entries.get(entry["id"])
+        if wanted is None:
+            result["orphaned"].append(entry)
+        elif _compared(entry) != _compared(wanted):
+            result["stale"].append(wanted)
+    result["missing"] = [entry for key, entry in entries.items() if key not in seen]
+    return result
+
+
+def print_verification(result: Dict[str, Any]):
+    """検証結果を表示"""
+    print(f"\n  ユーザー: {result['users']:,} 件 / インデックス: {result['index']:,} 件")
+    for key, label in (("missing", "インデックスにない"), ("stale", "内容が異なる"),
+                       ("orphaned", "対応するユーザーがない")):
+        entries = result[key]
+        if entries:
+            shown = ", ".join(entry["id"] for entry in entries[:MAX_REPORTED_MISMATCHES])
+            more = f" ほか {len(entries) - MAX_REPORTED_MISMATCHES} 件" \
+                if len(entries) > MAX_REPORTED_MISMATCHES else ""
+            print(f"  ⚠ {label}: {len(entries)} 件 ({shown}{more})")
+    for key, user_ids in list(result["duplicates"].items())[:MAX_REPORTED_MISMATCHES]:
+        print(f"  ⚠ メールアドレスの重複: {key} ({', '.join(user_ids)})")
+
+
+def is_consistent(result: Dict[str, Any]) -> bool:
+    return not (result["missing"] or result["stale"] or result["orphaned"])
+
+
+def rebuild(index, result: Dict[str, Any], args) -> Dict[str, int]:
+    """不足・不一致のエントリを書き込み、--prune なら孤立したエントリを削除"""
+    controller = RUBudgetController(args.provisioned_ru)
+    totals = {"written": 0, "failed": 0, "pruned": 0}
+    documents = iter(result["missing"] + result["stale"])
+    while True:
+        chunk = list(islice(documents, WRITE_CHUNK_SIZE))
+        if not chunk:
+            break
+        results = bulk_write(index, chunk, mode="upsert", max_workers=args.workers,
+                             partition_key_paths=["/id"], controller=controller)
+        for item in results:
+            totals["written" if item.success else "failed"] += 1
+        print(f"⏳ 書き込み中: {totals['written']:,} 件")
+    if args.prune:
+        for entry in result["orphaned"]:
+            try:
+                index.delete_item(item=entry["id"], partition_key=entry["id"])
+            except CosmosResourceNotFoundError:
+                pass
+            totals["pruned"] += 1
+    stats = controller.stats
+    print(f"✓ {totals['written']:,} 件書き込み, {totals['failed']:,} 件失敗, "
+          f"{totals['pruned']:,} 件削除 (消費RU {stats['request_charge']}, "
+          f"429: {stats['throttled']} 回)")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="メールアドレスのインデックスを検証・再構築")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("verify", help="インデックスを users コンテナと突き合わせる")
+    rebuild_parser = subparsers.add_parser("rebuild", help="不足・不一致のエントリを書き込む")
+    rebuild_parser.add_argument(
+        "--prune", action="store_true", help="対応するユーザーのないエントリを削除する")
+    rebuild_parser.add_argument(
+        "--workers", type=int, default=8, help="並列バッチ数（デフォルト: 8）")
+    rebuild_parser.add_argument(
+        "--provisioned-ru",
+        type=float,
+        default=None,
+        help="書き込みに使うRU/s（デフォルト: COSMOS_DB_PROVISIONED_RU または 400）",
+    )
+    args = parser.parse_args()
+
+    print(f"=== メールアドレスインデックスの{'検証' if args.command == 'verify' else '再構築'} ===")
+    try:
+        database = CosmosDBClient().client.get_database_client(DATABASE)
+        users = database.get_container_client(USERS_CONTAINER)
+        index = database.get_container_client(INDEX_CONTAINER)
+        started_at = time.monotonic()
+        result = verify(users, index)
+        print_verification(result)
+        if args.command == "rebuild":
+            totals = rebuild(index, result, args)
+            if totals["failed"]:
+                sys.exit(1)
+        elif not is_consistent(result):
+            print("\n✗ 不整合があります（rebuild で修復してください）")
+            sys.exit(1)
+        else:
+            print("\n✓ インデックスは users コンテナと一致しています")
+        print(f"  ({time.monotonic() - started_at:.2f} 秒)")
+    except Exception as e:
+        print(f"\n✗ エラー: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+コンテナのパーティションキーを無停止で変更するスクリプト
+
+パーティションキーは作成後に変更できないため、新しいパーティションキーのコンテナを作成し、
+次の手順でデータを移す。移行中も元のコンテナへの書き込みは止めなくてよい。
+
+1. copy    : コピー開始時刻を記録し、元のコンテナを全件ストリーミングして一括書き込み
+2. catch-up: 記録した時刻から変更フィードを読み、コピー中・コピー後の変更を反映（遅延を表示）
+3. verify  : 両コンテナを id 順に読み、件数と内容（システムプロパティを除く）を突き合わせる
+             不一致があれば catch-up からやり直す（--prune で移行先にだけある文書を削除）
+4. cutover : 検証が通ったらアプリケーションの接続先を新しいコンテナに切り替える
+             --follow を指定すると、切り替えが終わるまで（Ctrl-C まで）変更を反映し続ける
+
+進捗（フェーズ・開始時刻・変更フィードの継続トークン）は状態ファイルに保存し、
+中断しても再実行すれば続きから再開する。削除は変更フィードに現れないため verify で検出する。
+id の比較は文字列の順序に依存するため、id は ASCII を想定する。
+
+Usage:
+    python scripts/migrate_partition_key.py --database auth_management \\
+        --source users --target users_v2 --partition-key /userId
+    python scripts/migrate_partition_key.py --database tenant_management \\
+        --source tenants --target tenants_v2 --partition-key /tenantId --partition-key /id --follow
+"""
+import argparse
+import hashlib
+import json
+import sys
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+# .envファイルを自動読み込み
+from dotenv import load_dotenv
+
+# プロジェクトルート
+project_root = Path(__file__).resolve().parent.parent
+
+# .envファイルの読み込み
+if not os.getenv("COSMOS_DB_ENDPOINT"):
+    env_file = project_root / "src" / "auth-service" / ".env"
+    if env_file.exists():
+        load_dotenv(env_file)
+        print(f"📝 環境変数を読み込みました: {env_file}")
+
+# プロジェクトルートをパスに追加
+sys.path.append(str(project_root / 'src'))
+
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from shared.bulk import bulk_write
+from shared.change_feed import ChangeFeedReader, change_lag_seconds
+from shared.cosmos_client import CosmosDBClient
+from shared.pagination import stream_query
+from shared.partition_key import (
+    build_partition_key,
+    extract_partition_key,
+    get_partition_key_paths,
+    normalize_partition_key_paths,
+)
+from shared.throttle import RUBudgetController
+
+PHASE_COPY = "copy"
+PHASE_CATCH_UP = "catch-up"
+PHASE_VERIFIED = "verified"
+# 書き込み時にサービスが付与するため比較しないシステムプロパティ
+SYSTEM_PROPERTIES = ("_rid", "_self", "_etag", "_attachments", "_ts", "_lsn")
+# 変更フィードの開始時刻をコピー開始より前にずらす幅（クロックのずれ対策）
+START_TIME_MARGIN = timedelta(seconds=30)
+COPY_CHUNK_SIZE = 1000
+SCAN_PAGE_SIZE = 1000
+DEFAULT_VERIFY_ATTEMPTS = 3
+# 不一致として表示する最大件数
+MAX_REPORTED_MISMATCHES = 10
+
+
+def default_state_path(database: str, source: str, target: str) -> Path:
+    """状態ファイルの保存先（MIGRATION_STATE_DIR で変更可能）"""
+    directory = os.getenv("MIGRATION_STATE_DIR") or tempfile.gettempdir()
+    return Path(directory) / f"ws-demo-migrate-{database}-{source}-{target}.json"
+
+
+class MigrationState:
+    """フェーズ・変更フィードの開始時刻・継続トークンを保存する状態ファイル"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.data: Dict[str, Any] = {}
+        try:
+            self.data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"⚠ 状態ファイルを読み込めません（最初から移行します）: {e}")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+    def update(self, **values: Any):
+        """値を更新してアトミックに保存"""
+        self.data.update(values)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        temp_path.write_text(json.dumps(self.data, ensure_ascii=False), encoding="utf-8")
+        os.replace(temp_path, self.path)
+
+
+def _strip(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in document.items() if key not in SYSTEM_PROPERTIES}
+
+
+def document_digest(document: Dict[str, Any]) -> str:
+    """システムプロパティを除いた内容のハッシュ"""
+    encoded = json.dumps(_strip(document), sort_keys=True, ensure_ascii=False,
+                         separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def ensure_target(database, source, target_name: str, paths: List[str]):
+    """移行先コンテナを作成（インデックスポリシーと TTL は元のコンテナに合わせる）"""
+    target = database.get_container_client(target_name)
+    try:
+        live_paths = get_partition_key_paths(target)
+    except CosmosResourceNotFoundError:
+        properties = source.read()
+        options: Dict[str, Any] = {"indexing_policy": properties.get("indexingPolicy")}
+        if properties.get("defaultTtl") is not None:
+            options["default_ttl"] = properties["defaultTtl"]
+        database.create_container(
+            id=target_name, partition_key=build_partition_key(paths), **options)
+        print(f"✓ 移行先コンテナを作成しました: {target_name} ({', '.join(paths)})")
+        return target
+    if live_paths != paths:
+        raise ValueError(
+            f"target container '{target_name}' already exists with partition key {live_paths}")
+    print(f"✓ 移行先コンテナは作成済みです: {target_name}")
+    return target
+
+
+def write_documents(
+    target,
+    documents: List[Dict[str, Any]],
+    paths: List[str],
+    controller: RUBudgetController,
+    max_workers: int
+) -> int:
+    """移行先にアップサートし、失敗があれば例外を送出"""
+    results = bulk_write(target, [_strip(document) for document in documents], mode="upsert",
+                         max_workers=max_workers, partition_key_paths=paths,
+                         controller=controller)
+    failed = [result for result in results if not result.success]
+    if failed:
+        sample = ", ".join(f"{result.id} ({result.status_code})" for result in failed[:5])
+        raise RuntimeError(f"{len(failed)} document(s) failed to write: {sample}")
+    return len(results)
+
+
+def copy_documents(source, target, paths, controller, max_workers: int) -> int:
+    """元のコンテナを全件ストリーミングして移行先に書き込む"""
+    documents = stream_query(source, "SELECT * FROM c", page_size=SCAN_PAGE_SIZE)
+    copied = 0
+    started_at = time.monotonic()
+    while True:
+        chunk = list(islice(documents, COPY_CHUNK_SIZE))
+        if not chunk:
+            break
+        copied += write_documents(target, chunk, paths, controller, max_workers)
+        elapsed = time.monotonic() - started_at
+        print(f"⏳ コピー中: {copied:,} 件 ({copied / elapsed if elapsed else 0:.1f} 件/秒)")
+    return copied
+
+
+def catch_up(reader: ChangeFeedReader, target, paths, controller, state, max_workers) -> int:
+    """変更フィードを現時点まで反映し、反映した件数を返す"""
+    applied = 0
+    for items in reader.read_pages():
+        lag = change_lag_seconds(items)
+        applied += write_documents(target, items, paths, controller, max_workers)
+        print(f"⏳ 変更を反映: {applied:,} 件 (遅延 {lag:.1f} 秒)")
+        state.update(continuation=reader.pending_continuation)
+    state.update(continuation=reader.continuation)
+    return applied
+
+
+def _ordered(container) -> Iterator[Dict[str, Any]]:
+    return stream_query(container, "SELECT * FROM c ORDER BY c.id", page_size=SCAN_PAGE_SIZE)
+
+
+def verify(source, target, paths: List[str], prune: bool = False) -> Dict[str, Any]:
+    """両コンテナを id 順に突き合わせ、件数と不一致の id を返す"""
+    result: Dict[str, Any] = {"source": 0, "target": 0, "missing": [], "extra": [], "changed": []}
+    source_iter, target_iter = _ordered(source), _ordered(target)
+    left, right = next(source_iter, None), next(target_iter, None)
+    while left is not None or right is not None:
+        if right is None or (left is not None and left["id"] < right["id"]):
+            result["source"] += 1
+            result["missing"].append(left["id"])
+            left = next(source_iter, None)
+        elif left is None or right["id"] < left["id"]:
+            result["target"] += 1
+            result["extra"].append(right["id"])
+            if prune:
+                target.delete_item(item=right["id"],
+                                   partition_key=extract_partition_key(right, paths))
+            right = next(target_iter, None)
+        else:
+            result["source"] += 1
+            result["target"] += 1
+            if document_digest(left) != document_digest(right):
+                result["changed"].append(left["id"])
+            left, right = next(source_iter, None), next(target_iter, None)
+    return result
+
+
+def print_verification(result: Dict[str, Any], prune: bool):
+    """検証結果を表示"""
+    print(f"\n  元のコンテナ: {result['source']:,} 件 / 移行先: {result['target']:,} 件")
+    for key, label in (("missing", "移行先にない"), ("changed", "内容が異なる"),
+                       ("extra", "移行先にだけある")):
+        ids = result[key]
+        if ids:
+            suffix = "（削除しました）" if key == "extra" and prune else ""
+            shown = ", ".join(ids[:MAX_REPORTED_MISMATCHES])
+            more = f" ほか {len(ids) - MAX_REPORTED_MISMATCHES} 件" \
+                if len(ids) > MAX_REPORTED_MISMATCHES else ""
+            print(f"  ⚠ {label}: {len(ids)} 件{suffix} ({shown}{more})")
+
+
+def migrate(args):
+    """移行を実行（状態ファイルのフェーズから再開する）"""
+    paths = normalize_partition_key_paths(args.partition_key)
+    client = CosmosDBClient().client
+    database = client.get_database_client(args.database)
+    source = database.get_container_client(args.source)
+    source_paths = get_partition_key_paths(source)
+    print(f"  {args.source} ({', '.join(source_paths)}) → {args.target} ({', '.join(paths)})")
+
+    state_path = Path(args.state) if args.state else default_state_path(
+        args.database, args.source, args.target)
+    if args.restart and state_path.exists():
+        state_path.unlink()
+    state = MigrationState(state_path)
+    if state.get("partitionKey", paths) != paths:
+        raise ValueError(f"state file {state_path} was created for {state.get('partitionKey')}")
+
+    target = ensure_target(database, source, args.target, paths)
+    controller = RUBudgetController(args.provisioned_ru)
+
+    if state.get("phase", PHASE_COPY) == PHASE_COPY:
+        # コピー中の変更を取りこぼさないよう、開始時刻はコピー前に記録する
+        start_time = state.get("startTime") or (
+            datetime.now(timezone.utc) - START_TIME_MARGIN).isoformat()
+        state.update(phase=PHASE_COPY, startTime=start_time, partitionKey=paths)
+        print("\n=== copy ===")
+        copied = copy_documents(source, target, paths, controller, args.workers)
+        print(f"✓ {copied:,} 件をコピーしました")
+        state.update(phase=PHASE_CATCH_UP, continuation=None)
+    else:
+        print(f"\n⏳ 状態ファイルから再開します: {state_path} (フェーズ: {state.get('phase')})")
+
+    reader = ChangeFeedReader(
+        source, start_time=datetime.fromisoformat(state.get("startTime")),
+        continuation=state.get("continuation"), page_size=SCAN_PAGE_SIZE)
+
+    verified = False
+    for attempt in range(1, args.verify_attempts + 1):
+        print(f"\n=== catch-up ({attempt}/{args.verify_attempts}) ===")
+        applied = catch_up(reader, target, paths, controller, state, args.workers)
+        print(f"✓ 変更フィードに追いつきました（{applied:,} 件反映）")
+
+        print("\n=== verify ===")
+        result = verify(source, target, paths, prune=args.prune)
+        print_verification(result, args.prune)
+        mismatched = result["missing"] or result["changed"] or (
+            result["extra"] and not args.prune)
+        if not mismatched:
+            verified = True
+            break
+
+    if not verified:
+        raise RuntimeError("verification failed; rerun to continue from the change feed")
+
+    state.update(phase=PHASE_VERIFIED, verifiedAt=datetime.now(timezone.utc).isoformat())
+    stats = controller.stats
+    print(f"\n✓ 検証完了: 件数と内容が一致しました（消費RU {stats['request_charge']}, "
+          f"429: {stats['throttled']} 回）")
+    print("\n=== cutover ===")
+    print(f"  アプリケーションの接続先を '{args.target}' に切り替えてください。")
+    if not args.follow:
+        print("  切り替えまでの変更は --follow 付きで再実行すると反映されます。")
+        return
+
+    print("  切り替えが完了するまで変更を反映し続けます（Ctrl-C で終了）")
+    stop = threading.Event()
+
+    def on_poll(count: int, _reader: ChangeFeedReader):
+        state.update(continuation=_reader.continuation)
+        if count:
+            print(f"⏳ 変更を反映: {count:,} 件")
+
+    try:
+        reader.poll(lambda items: write_documents(target, items, paths, controller, args.workers),
+                    stop, interval=args.poll_interval, on_poll=on_poll)
+    except KeyboardInterrupt:
+        state.update(continuation=reader.continuation)
+        print("\n✓ 変更の反映を終了しました")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="コンテナのパーティションキーを無停止で変更")
+    parser.add_argument("--database", required=True, help="データベース名")
+    parser.add_argument("--source", required=True, help="元のコンテナ名")
+    parser.add_argument("--target", required=True, help="移行先のコンテナ名（なければ作成）")
+    parser.add_argument(
+        "--partition-key",
+        action="append",
+        required=True,
+        help="移行先のパーティションキーパス（複数指定で階層パーティションキー）",
+    )
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="検証後も Ctrl-C まで変更を反映し続ける（切り替え作業中に使う）",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="移行先にだけあるドキュメント（元のコンテナで削除されたもの）を削除する",
+    )
+    parser.add_argument(
+        "--verify-attempts",
+        type=int,
+        default=DEFAULT_VERIFY_ATTEMPTS,
+        help=f"不一致時に catch-up と検証を繰り返す回数（デフォルト: {DEFAULT_VERIFY_ATTEMPTS}）",
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=1.0, help="--follow 時のポーリング間隔（秒）")
+    parser.add_argument(
+        "--workers", type=int, default=8, help="並列バッチ数（デフォルト: 8）")
+    parser.add_argument(
+        "--provisioned-ru",
+        type=float,
+        default=None,
+        help="書き込みに使うRU/s（デフォルト: COSMOS_DB_PROVISIONED_RU または 400）",
+    )
+    parser.add_argument("--state", help="状態ファイルのパス（デフォルト: 一時ディレクトリ）")
+    parser.add_argument(
+        "--restart", action="store_true", help="状態ファイルを破棄して最初から移行する")
+    args = parser.parse_args()
+
+    print("=== パーティションキー移行開始 ===")
+    try:
+        migrate(args)
+        print("\n=== パーティションキー移行完了 ===")
+    except Exception as e:
+        print(f"\n✗ エラー: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
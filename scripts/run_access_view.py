@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+実効アクセス権ビュー（auth_management/effective_access）を維持するスクリプト
+
+users・roles・tenants・tenant_services の変更フィードを読み、変更のあったユーザーの
+effective_access ドキュメントを組み立て直す。リースは auth_management/leases に保存するため、
+複数のインスタンスで起動するとフィード範囲を分担して処理する。
+
+削除は変更フィードに現れないため、割り当てを物理削除した場合は --rebuild で補正する。
+
+Usage:
+    python scripts/run_access_view.py
+    python scripts/run_access_view.py --instance-id worker-1 --lease-duration 60
+    python scripts/run_access_view.py --rebuild
+"""
+import argparse
+import sys
+import os
+import time
+from pathlib import Path
+
+# .envファイルを自動読み込み
+from dotenv import load_dotenv
+
+# プロジェクトルート
+project_root = Path(__file__).resolve().parent.parent
+
+# .envファイルの読み込み
+if not os.getenv("COSMOS_DB_ENDPOINT"):
+    env_file = project_root / "src" / "auth-service" / ".env"
+    if env_file.exists():
+        load_dotenv(env_file)
+        print(f"📝 環境変数を読み込みました: {env_file}")
+
+# プロジェクトルートをパスに追加
+sys.path.append(str(project_root / 'src'))
+
+from shared.access_view import AccessViewBuilder
+from shared.change_feed_processor import DEFAULT_LEASE_DURATION, DEFAULT_POLL_INTERVAL
+from shared.cosmos_client import CosmosDBClient
+
+# 進捗を表示する間隔（秒）
+REPORT_INTERVAL = 30.0
+
+
+def create_builder() -> tuple:
+    """ビルダーとリースコンテナを生成"""
+    client = CosmosDBClient().client
+    auth = client.get_database_client("auth_management")
+    tenant = client.get_database_client("tenant_management")
+    service = client.get_database_client("service_management")
+    builder = AccessViewBuilder(
+        users=auth.get_container_client("users"),
+        roles=auth.get_container_client("roles"),
+        tenants=tenant.get_container_client("tenants"),
+        tenant_services=service.get_container_client("tenant_services"),
+        view=auth.get_container_client("effective_access"),
+    )
+    return builder, auth.get_container_client("leases")
+
+
+def rebuild(builder: AccessViewBuilder):
+    """全ユーザーのビューを組み立て直す"""
+    started_at = time.monotonic()
+    count = builder.rebuild_all()
+    print(f"✓ {count:,} ユーザーのビューを再構築しました ({time.monotonic() - started_at:.1f} 秒)")
+
+
+def run(builder: AccessViewBuilder, leases, args):
+    """Ctrl-C まで変更フィードを処理する"""
+    processors = builder.processors(
+        leases, instance_id=args.instance_id, lease_duration=args.lease_duration,
+        poll_interval=args.poll_interval)
+    for processor in processors:
+        processor.start()
+    print("  変更フィードを処理しています（Ctrl-C で終了）")
+    try:
+        while True:
+            time.sleep(REPORT_INTERVAL)
+            for processor in processors:
+                stats = processor.stats
+                print(f"⏳ {processor.name}: {stats['processed']:,} 件処理 "
+                      f"(エラー {stats['errors']}, リース喪失 {stats['leases_lost']})")
+    except KeyboardInterrupt:
+        print("\n⏳ 停止しています...")
+    finally:
+        for processor in processors:
+            processor.stop(timeout=args.lease_duration)
+    print("✓ 変更フィードの処理を停止しました")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="実効アクセス権ビューを変更フィードで維持")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="全ユーザーのビューを再構築して終了する")
+    parser.add_argument(
+        "--instance-id", help="リースの所有者として記録するID（デフォルト: ランダム）")
+    parser.add_argument(
+        "--lease-duration",
+        type=float,
+        default=DEFAULT_LEASE_DURATION,
+        help=f"リースの有効期間（秒、デフォルト: {DEFAULT_LEASE_DURATION:g}）",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help=f"変更がないときのポーリング間隔（秒、デフォルト: {DEFAULT_POLL_INTERVAL:g}）",
+    )
+    args = parser.parse_args()
+
+    print("=== 実効アクセス権ビュー ===")
+    try:
+        builder, leases = create_builder()
+        if args.rebuild:
+            rebuild(builder)
+        else:
+            run(builder, leases, args)
+    except Exception as e:
+        print(f"\n✗ エラー: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""シード投入のチェックポイント
+
+長時間の投入が中断（429の再試行超過、ネットワーク断、Ctrl-C）されても、
+完了済みの作業をやり直さずに再開できるよう進捗をローカルファイルに記録する。
+
+- 完了したステージ名
+- カテゴリごとのウォーターマーク（決定的な入力順で、先頭から連続して書き込みが
+  完了した件数。並行書き込みで順不同に完了した分は連続した時点で繰り上げる）
+
+ファイルは一時ファイルへの書き込みと os.replace でアトミックに更新し、
+一定間隔ごとと終了時（例外・中断を含む）に保存する。run_key が異なるチェックポイントは
+別の投入（プロファイル・シード・接続先の違い）とみなして破棄する。
+
+使用例:
+    checkpoint = open_checkpoint("sample", run_key="sample:42")
+    try:
+        ...
+    finally:
+        checkpoint.save()
+"""
+from pathlib import Path
+from typing import Dict, Set
+import json
+import os
+import tempfile
+import time
+
+CHECKPOINT_VERSION = 1
+# 自動保存の間隔（秒）
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+
+def default_checkpoint_path(name: str) -> Path:
+    """チェックポイントの保存先（SEED_CHECKPOINT_DIR で変更可能）"""
+    directory = os.getenv("SEED_CHECKPOINT_DIR") or tempfile.gettempdir()
+    return Path(directory) / f"ws-demo-seed-{name}.checkpoint.json"
+
+
+class _Watermark:
+    """先頭から連続して完了した件数と、それより先で完了済みの連番"""
+    __slots__ = ("offset", "done")
+
+    def __init__(self, offset: int = 0):
+        self.offset = offset
+        self.done: Set[int] = set()
+
+    def mark(self, sequence: int):
+        if sequence < self.offset:
+            return
+        self.done.add(sequence)
+        while self.offset in self.done:
+            self.done.discard(self.offset)
+            self.offset += 1
+
+
+class SeedCheckpoint:
+    """ステージ完了とカテゴリごとの進捗を記録するチェックポイント"""
+
+    def __init__(
+        self,
+        path: Path,
+        run_key: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ):
+        self.path = Path(path)
+        self.run_key = run_key
+        self.flush_interval = flush_interval
+        self.completed_stages: Set[str] = set()
+        self._watermarks: Dict[str, _Watermark] = {}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        run_key: str,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ) -> "SeedCheckpoint":
+        """保存済みのチェックポイントを読み込む（なければ、または別の投入なら空で開始）"""
+        checkpoint = cls(path, run_key, flush_interval)
+        try:
+            data = json.loads(checkpoint.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return checkpoint
+        except (OSError, ValueError) as e:
+            print(f"⚠ チェックポイントを読み込めません（最初から投入します）: {e}")
+            return checkpoint
+
+        if data.get("version") != CHECKPOINT_VERSION or data.get("runKey") != run_key:
+            print(f"⚠ 別の投入のチェックポイントを破棄します: {checkpoint.path}")
+            return checkpoint
+        checkpoint.completed_stages = set(data.get("completedStages", []))
+        checkpoint._watermarks = {
+            category: _Watermark(offset)
+            for category, offset in data.get("offsets", {}).items()
+        }
+        return checkpoint
+
+    @property
+    def resumed(self) -> bool:
+        """前回の進捗が残っているか"""
+        return bool(self.completed_stages or any(
+            watermark.offset for watermark in self._watermarks.values()))
+
+    def is_stage_completed(self, stage: str) -> bool:
+        return stage in self.completed_stages
+
+    def complete_stage(self, stage: str):
+        """ステージの完了を記録して保存"""
+        self.completed_stages.add(stage)
+        self._dirty = True
+        self.save()
+
+    def offset(self, category: str) -> int:
+        """カテゴリの入力のうち、先頭から完了済みの件数"""
+        watermark = self._watermarks.get(category)
+        return watermark.offset if watermark else 0
+
+    def mark(self, category: str, sequence: int):
+        """入力順で sequence 番目（0始まり）の書き込み完了を記録（一定間隔で保存）"""
+        self._watermarks.setdefault(category, _Watermark()).mark(sequence)
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= self.flush_interval:
+            self.save()
+
+    def save(self):
+        """変更があればアトミックに書き出す（失敗しても処理は継続）"""
+        if not self._dirty:
+            return
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "runKey": self.run_key,
+            "completedStages": sorted(self.completed_stages),
+            "offsets": {
+                category: watermark.offset for category, watermark in self._watermarks.items()
+            },
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            temp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(temp_path, self.path)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        except OSError as e:
+            print(f"⚠ チェックポイントを保存できません: {e}")
+
+    def clear(self):
+        """投入が完了したらチェックポイントを削除"""
+        self.completed_stages.clear()
+        self._watermarks.clear()
+        self._dirty = False
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"⚠ チェックポイントを削除できません: {e}")
+
+    def print_status(self):
+        """再開時に前回の進捗を表示"""
+        if not self.resumed:
+            return
+        print(f"\n⏳ 前回の進捗から再開します: {self.path}")
+        for stage in sorted(self.completed_stages):
+            print(f"  ✓ {stage:20s}: 完了済み")
+        for category, watermark in self._watermarks.items():
+            if watermark.offset:
+                print(f"  ⏳ {category:20s}: {watermark.offset} 件まで完了")
+
+
+def open_checkpoint(name: str, run_key: str, restart: bool = False) -> SeedCheckpoint:
+    """スクリプト用に既定の保存先から読み込む（restart なら前回の進捗を破棄する）"""
+    path = default_checkpoint_path(name)
+    if restart:
+        SeedCheckpoint(path, run_key).clear()
+    checkpoint = SeedCheckpoint.load(path, run_key)
+    checkpoint.print_status()
+    return checkpoint
@@ -0,0 +1,43 @@
+"""シードドキュメントのコンテンツハッシュ
+
+ドキュメントの内容から安定したハッシュを計算し contentHash フィールドに記録する。
+再投入時は既存ドキュメントのハッシュと比較し、変更のあったものだけを書き込む。
+
+次のフィールドはハッシュに含めない:
+- システムプロパティ（_rid, _etag, _ts 等）と contentHash 自身
+- 実行のたびに変わる値（投入時刻、ソルト付きの passwordHash）
+
+passwordHash がシードでハッシュ化した値（fingerprint 属性を持つ）の場合は、
+ハッシュの代わりにパスワードとコストの指紋を含める（パスワードの変更を反映するため）。
+指紋は Cosmos DB に保存しない秘密鍵による HMAC のため、contentHash からパスワードは推測できない。
+"""
+from typing import Any, Mapping, MutableMapping
+import hashlib
+import json
+
+CONTENT_HASH_FIELD = "contentHash"
+PASSWORD_FIELD = "passwordHash"
+
+VOLATILE_FIELDS = frozenset({
+    CONTENT_HASH_FIELD,
+    "_rid", "_self", "_etag", "_attachments", "_ts", "_lsn",
+    PASSWORD_FIELD,
+    "createdAt", "updatedAt", "addedAt", "assignedAt", "assigned_at", "lastLoginAt",
+})
+
+
+def content_hash(document: Mapping[str, Any]) -> str:
+    """ドキュメントの内容ハッシュ（キー順・空白に依存しない SHA-256 の先頭32桁）"""
+    stable = {key: value for key, value in document.items() if key not in VOLATILE_FIELDS}
+    fingerprint = getattr(document.get(PASSWORD_FIELD), "fingerprint", None)
+    if fingerprint is not None:
+        stable[PASSWORD_FIELD] = fingerprint
+    encoded = json.dumps(stable, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+def stamp(document: MutableMapping[str, Any]) -> str:
+    """contentHash を設定して返す"""
+    value = content_hash(document)
+    document[CONTENT_HASH_FIELD] = value
+    return value
@@ -0,0 +1,280 @@
+"""非同期シードエンジン
+
+1つの非同期クライアントを全データベースで共有し、コンテナごとに同時実行数を制限して
+ドキュメントを並行に書き込む。全体の流量は RUBudgetController で
+プロビジョニング済みRU/sに収め、429は retry-after に従って再試行する。
+
+incremental=True の場合は、入力を HASH_LOOKUP_BATCH_SIZE 件ずつ取り出して
+既存ドキュメントの id と contentHash を射影クエリで取得し、新規または内容が変わった
+ドキュメントだけを書き込む（メモリ使用量はバッチサイズのみに依存する）。
+checkpoint を渡すと入力順の進捗を記録し、再実行時は完了済みの件数を読み飛ばす。
+
+使用例:
+    async with SeedEngine() as engine:
+        await engine.write("tenants", "tenant_management", "tenants", SAMPLE_TENANTS)
+        engine.print_summary()
+"""
+from azure.cosmos.exceptions import CosmosHttpResponseError, CosmosResourceExistsError
+from dataclasses import dataclass, field
+from typing import (
+    Any, Callable, Dict, Iterable, Mapping, MutableMapping, Optional, Sequence, Tuple
+)
+import asyncio
+import itertools
+import time
+
+from shared.async_cosmos_client import AsyncCosmosDBClient
+from shared.throttle import RUBudgetController
+
+from .checkpoint import SeedCheckpoint
+from .content_hash import CONTENT_HASH_FIELD, stamp
+
+WRITE_MODES = ("create", "upsert")
+# コンテナごとの同時書き込み数の既定値
+DEFAULT_CONTAINER_CONCURRENCY = 16
+# incremental 時に1回のクエリで contentHash を照合する件数
+HASH_LOOKUP_BATCH_SIZE = 100
+
+
+class SeedWriteError(RuntimeError):
+    """strict モードで書き込みに失敗したドキュメントがあった"""
+
+    def __init__(self, category: str, failed: int):
+        super().__init__(f"{failed} document(s) failed to write in '{category}'")
+        self.category = category
+        self.failed = failed
+
+
+@dataclass
+class SeedStats:
+    """カテゴリごとの投入結果"""
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    failed: int = 0
+    # チェックポイントから再開して読み飛ばした件数（total には含めない）
+    resumed: int = 0
+    elapsed: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return self.created + self.updated + self.unchanged + self.skipped + self.failed
+
+    @property
+    def items_per_second(self) -> float:
+        return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class SeedEngine:
+    """コンテナ単位の並行数制限とRUバジェットに従ってシードデータを書き込むエンジン
+
+    strict=True の場合、書き込みに失敗したドキュメント（409以外）があると
+    write() の最後に SeedWriteError を送出する（後続ステージを実行させないため）。
+    書き込むドキュメントには常に contentHash を設定する。
+    """
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        key: Optional[str] = None,
+        controller: Optional[RUBudgetController] = None,
+        container_concurrency: int = DEFAULT_CONTAINER_CONCURRENCY,
+        strict: bool = False,
+        incremental: bool = False,
+        checkpoint: Optional[SeedCheckpoint] = None,
+        credential: Optional[Any] = None
+    ):
+        self._connection = AsyncCosmosDBClient(
+            endpoint=endpoint, key=key, credential=credential)
+        self.controller = controller or RUBudgetController()
+        self.container_concurrency = container_concurrency
+        self.strict = strict
+        self.incremental = incremental
+        self.checkpoint = checkpoint
+        self.stats: Dict[str, SeedStats] = {}
+        self._containers: Dict[Tuple[str, str], Any] = {}
+        self._semaphores: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+        self._started_at: Optional[float] = None
+
+    async def __aenter__(self) -> "SeedEngine":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect(self):
+        """接続確立"""
+        await self._connection.connect()
+        self._started_at = time.monotonic()
+
+    async def close(self):
+        """接続を閉じる"""
+        await self._connection.close()
+        self._containers.clear()
+        self._semaphores.clear()
+
+    def container(self, database_name: str, container_name: str):
+        """コンテナクライアントを取得（共有クライアントから生成しキャッシュする）"""
+        key = (database_name, container_name)
+        if key not in self._containers:
+            if self._connection.client is None:
+                raise RuntimeError("SeedEngine is not connected; use 'async with' or connect()")
+            self._containers[key] = self._connection.client \
+                .get_database_client(database_name).get_container_client(container_name)
+            self._semaphores[key] = asyncio.Semaphore(self.container_concurrency)
+        return self._containers[key]
+
+    async def existing_hashes(
+        self,
+        database_name: str,
+        container_name: str,
+        ids: Sequence[str]
+    ) -> Dict[str, Optional[str]]:
+        """ids のうち既存のドキュメントについて id → contentHash を取得"""
+        if not ids:
+            return {}
+        container = self.container(database_name, container_name)
+        query = (f"SELECT c.id, c.{CONTENT_HASH_FIELD} FROM c "
+                 "WHERE ARRAY_CONTAINS(@ids, c.id)")
+        existing: Dict[str, Optional[str]] = {}
+        async for row in container.query_items(
+                query=query, parameters=[{"name": "@ids", "value": list(ids)}],
+                max_item_count=len(ids)):
+            existing[row["id"]] = row.get(CONTENT_HASH_FIELD)
+        return existing
+
+    async def write(
+        self,
+        category: str,
+        database_name: str,
+        container_name: str,
+        items: Iterable[Mapping[str, Any]],
+        mode: str = "create",
+        label: Optional[Callable[[Mapping[str, Any]], str]] = None
+    ) -> SeedStats:
+        """ドキュメントを並行に書き込み、カテゴリの集計結果を返す
+
+        items はイテレーターでもよく、必要な分だけ順に取り出す。
+        作成済み（409）は skipped として数える。label を指定すると1件ごとに結果を表示する。
+        incremental 時は contentHash が一致するドキュメントを unchanged として書き込まず、
+        内容が変わったドキュメントは upsert する。contentHash のない既存ドキュメントは
+        mode="create" なら skipped、mode="upsert" なら上書きする。
+        checkpoint がある場合、items は毎回同じ順序で渡すこと（先頭から完了済みの件数を読み飛ばす）。
+        """
+        if mode not in WRITE_MODES:
+            raise ValueError(f"mode must be one of {WRITE_MODES}: {mode!r}")
+
+        container = self.container(database_name, container_name)
+        semaphore = self._semaphores[(database_name, container_name)]
+        stats = self.stats.setdefault(category, SeedStats())
+        source = enumerate(items)
+        if self.checkpoint is not None:
+            offset = self.checkpoint.offset(category)
+            if offset:
+                source = itertools.islice(source, offset, None)
+                stats.resumed += offset
+                print(f"⊘ {category}: 前回完了済みの {offset} 件を読み飛ばします")
+        failed_before = stats.failed
+        started_at = time.monotonic()
+
+        async def worker():
+            # 共有イテレーターからバッチ単位で取り出す（イベントループ内では競合しない）
+            while True:
+                batch = list(itertools.islice(source, HASH_LOOKUP_BATCH_SIZE))
+                if not batch:
+                    return
+                existing = None
+                if self.incremental:
+                    existing = await self.existing_hashes(
+                        database_name, container_name, [str(item.get("id")) for _, item in batch])
+                for sequence, item in batch:
+                    async with semaphore:
+                        written = await self._write_one(
+                            container, item, mode, stats, label, existing)
+                    if written and self.checkpoint is not None:
+                        self.checkpoint.mark(category, sequence)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.container_concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            # 例外・中断時は残りのワーカーも止める（チェックポイントより先に書き込ませない）
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            stats.elapsed += time.monotonic() - started_at
+        if self.strict and stats.failed > failed_before:
+            raise SeedWriteError(category, stats.failed - failed_before)
+        return stats
+
+    async def _write_one(
+        self,
+        container,
+        item: MutableMapping[str, Any],
+        mode: str,
+        stats: SeedStats,
+        label: Optional[Callable[[Mapping[str, Any]], str]],
+        existing: Optional[Dict[str, Optional[str]]]
+    ) -> bool:
+        """1件書き込み、失敗しなかったか（作成・更新・変更なし・スキップ）を返す"""
+        item_hash = stamp(item)
+        item_id = str(item.get("id"))
+        update = False
+        if existing is not None and item_id in existing:
+            if existing[item_id] == item_hash:
+                stats.unchanged += 1
+                return True
+            if existing[item_id] is None and mode == "create":
+                # シード管理外（contentHash なし）の既存ドキュメントは上書きしない
+                stats.skipped += 1
+                return True
+            update = True
+
+        write = container.upsert_item if update or mode == "upsert" else container.create_item
+        try:
+            await self.controller.arun(write, item, kind="upsert" if update else mode)
+        except CosmosResourceExistsError:
+            stats.skipped += 1
+            if label:
+                print(f"⊘ スキップ: {label(item)} (既に存在)")
+        except CosmosHttpResponseError as e:
+            stats.failed += 1
+            stats.errors[str(item.get("id"))] = f"{e.status_code} {e.message}"
+            print(f"✗ エラー: {label(item) if label else item.get('id')} - {e.status_code}")
+            return False
+        else:
+            if update:
+                stats.updated += 1
+            else:
+                stats.created += 1
+            if existing is not None:
+                existing[item_id] = item_hash
+            if label:
+                print(f"✓ {label(item)}{' (更新)' if update else ''}")
+        return True
+
+    @property
+    def failed(self) -> int:
+        """失敗件数の合計"""
+        return sum(stats.failed for stats in self.stats.values())
+
+    def print_summary(self):
+        """カテゴリごとの投入結果とスループットを表示"""
+        print("\n投入結果:")
+        for category, stats in self.stats.items():
+            print(
+                f"  {category:20s}: {stats.created} 件作成, {stats.updated} 件更新, "
+                f"{stats.unchanged} 件変更なし, {stats.skipped} 件スキップ, "
+                f"{stats.failed} 件失敗 ({stats.items_per_second:.1f} 件/秒)"
+                + (f", 前回完了済み {stats.resumed} 件" if stats.resumed else ""))
+
+        total = sum(stats.total for stats in self.stats.values())
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        controller = self.controller.stats
+        rate = total / elapsed if elapsed > 0 else 0.0
+        print(f"\n  合計 {total} 件 / {elapsed:.2f} 秒 ({rate:.1f} 件/秒)")
+        print(f"  消費RU: {controller['request_charge']} "
+              f"({controller['ru_per_second']} RU/秒, 429: {controller['throttled']} 回)")
@@ -0,0 +1,349 @@
+"""決定的な合成データセットの生成
+
+シード値とサイズプロファイルから、テナント・ユーザー・紐付け・ロール割り当て・
+サービス割り当てのドキュメントを遅延生成する。
+
+- テナントを chunk_size 件ずつ処理し、乱数はチャンクごとに NumPy でまとめて生成する
+  （メモリ使用量はチャンクサイズのみに依存し、データセット全体の件数には依存しない）
+- 乱数生成器は (シード, 用途, チャンク番号) から導出するため、各ストリームを
+  個別に・何度生成しても同じ結果になる
+- ID は構成要素から決まり（紐付けは "<親ID>_<子ID>"）、タイムスタンプは固定の基準日時から
+  数えるため、実行日時に依存しない
+
+使用例:
+    generator = DatasetGenerator(PROFILES["10k"], seed=42)
+    for user in generator.users():
+        ...
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .password_hashing import PendingPasswordHash
+
+# タイムスタンプの基準日時（「n日前」はこの日時から数える）
+REFERENCE_TIME = datetime(2025, 1, 1)
+DEFAULT_PASSWORD = "Password@123"
+DEFAULT_SEED = 20250101
+DEFAULT_CHUNK_SIZE = 10_000
+
+# テナント名・ドメインのテンプレート（先頭10テナントはこの名前を使う）
+TENANT_TEMPLATES = [
+    ("株式会社サンプルコーポレーション", ["sample-corp.co.jp", "sample-corp.com"]),
+    ("テックイノベーション株式会社", ["tech-innovation.jp"]),
+    ("グローバルソリューションズ", ["global-solutions.com", "gs-japan.co.jp"]),
+    ("デジタルマーケティングパートナーズ", ["dmp.co.jp"]),
+    ("クラウドシステムズ株式会社", ["cloud-systems.jp", "cloudsys.com"]),
+    ("エンタープライズソリューション", ["enterprise-sol.co.jp"]),
+    ("スマートデータ株式会社", ["smart-data.jp"]),
+    ("ビジネスアクセラレータ", ["biz-accel.com"]),
+    ("フューチャーテクノロジーズ", ["future-tech.co.jp", "ft-japan.jp"]),
+    ("インテグレーションワークス", ["integration-works.com"]),
+]
+
+# ユーザー名のテンプレート
+USER_TEMPLATES = [
+    ("山田太郎", "taro.yamada"),
+    ("佐藤花子", "hanako.sato"),
+    ("鈴木一郎", "ichiro.suzuki"),
+    ("田中美咲", "misaki.tanaka"),
+    ("伊藤健太", "kenta.ito"),
+    ("渡辺麻衣", "mai.watanabe"),
+    ("高橋大輔", "daisuke.takahashi"),
+    ("中村陽子", "yoko.nakamura"),
+    ("小林真司", "shinji.kobayashi"),
+    ("加藤愛", "ai.kato"),
+]
+
+# サービスIDの定義（initial_data.pyから）
+SERVICE_IDS = {
+    "tenant_management": "service-001",
+    "auth": "service-002",
+    "service_settings": "service-003",
+    "file_management": "service-004",
+    "messaging": "service-005",
+    "api_usage": "service-006",
+    "backup": "service-007"
+}
+
+# ロールIDの定義（initial_data.pyから）
+ROLE_IDS = {
+    "tenant_management": {"global_admin": "role-001", "admin": "role-002", "viewer": "role-003"},
+    "auth": {"global_admin": "role-004", "viewer": "role-005"},
+    "service_settings": {"global_admin": "role-006", "viewer": "role-007"},
+    "file_management": {"admin": "role-008", "user": "role-009"},
+    "messaging": {"admin": "role-010", "user": "role-011"},
+    "api_usage": {"admin": "role-012", "user": "role-013"},
+    "backup": {"admin": "role-014", "viewer": "role-015"},
+}
+
+# ロール割り当てパターン
+ROLE_PATTERNS = [
+    # パターン1: 管理者系
+    [("tenant_management", "admin"), ("auth", "viewer"), ("service_settings", "viewer")],
+    # パターン2: ファイル管理中心
+    [("file_management", "admin"), ("messaging", "user")],
+    # パターン3: 一般ユーザー
+    [("file_management", "user"), ("messaging", "user"), ("api_usage", "user")],
+    # パターン4: 閲覧者
+    [("tenant_management", "viewer"), ("auth", "viewer"),
+     ("service_settings", "viewer"), ("backup", "viewer")],
+]
+
+# サービス割り当てパターン
+SERVICE_PACKAGES = [
+    # 基本パッケージ
+    ["file_management", "messaging"],
+    # ビジネスパッケージ
+    ["file_management", "messaging", "api_usage"],
+    # エンタープライズパッケージ
+    ["file_management", "messaging", "api_usage", "backup"],
+    # フルパッケージ
+    ["file_management", "messaging", "api_usage", "backup"],
+]
+
+# 乱数の用途（チャンクごとの乱数生成器の導出に使う）
+_USER_COUNTS, _TENANT_TIMES, _USER_TIMES, _ROLE_CHOICES, _ROLE_TIMES, _SERVICE_CHOICES = range(6)
+
+
+@dataclass(frozen=True)
+class SizeProfile:
+    """データセットの規模と分布"""
+    name: str
+    tenants: int
+    users_per_tenant: Tuple[int, int] = (3, 5)
+    role_pattern_weights: Tuple[float, ...] = (0.2, 0.3, 0.3, 0.2)
+    service_package_weights: Tuple[float, ...] = (0.25, 0.25, 0.25, 0.25)
+    # ユーザー数の上限（到達後のテナントにはユーザーを作成しない）
+    max_users: Optional[int] = None
+
+    def __post_init__(self):
+        low, high = self.users_per_tenant
+        if not 0 <= low <= high:
+            raise ValueError(f"invalid users_per_tenant: {self.users_per_tenant}")
+        if len(self.role_pattern_weights) != len(ROLE_PATTERNS):
+            raise ValueError(f"role_pattern_weights requires {len(ROLE_PATTERNS)} weights")
+        if len(self.service_package_weights) != len(SERVICE_PACKAGES):
+            raise ValueError(f"service_package_weights requires {len(SERVICE_PACKAGES)} weights")
+
+
+PROFILES = {
+    # 従来のサンプルデータ（10テナント、最大40ユーザー）
+    "sample": SizeProfile("sample", tenants=10, max_users=40),
+    "10": SizeProfile("10", tenants=10),
+    "10k": SizeProfile("10k", tenants=10_000),
+    # 約100万ユーザー（ベンチマーク用）
+    "1m-users": SizeProfile("1m-users", tenants=250_000),
+    "1m": SizeProfile("1m", tenants=1_000_000),
+}
+
+
+def _normalized(weights: Sequence[float]) -> np.ndarray:
+    array = np.asarray(weights, dtype=float)
+    return array / array.sum()
+
+
+def _timestamps(days_ago: np.ndarray, reference: datetime) -> List[Any]:
+    """基準日時から days_ago 日前の ISO 8601 文字列をまとめて生成（配列と同じ形のリスト）"""
+    moments = np.datetime64(reference, "s") - days_ago.astype("timedelta64[D]")
+    return np.char.add(np.datetime_as_string(moments, unit="s"), "Z").tolist()
+
+
+def tenant_id(index: int) -> str:
+    return f"tenant-sample-{index + 1:03d}"
+
+
+class DatasetGenerator:
+    """シード値とサイズプロファイルから決定的にドキュメントを遅延生成する"""
+
+    def __init__(
+        self,
+        profile: SizeProfile,
+        seed: int = DEFAULT_SEED,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        reference_time: datetime = REFERENCE_TIME,
+        password_hash: Optional[str] = None
+    ):
+        self.profile = profile
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.reference_time = reference_time
+        # 未指定の場合はユーザーごとに PendingPasswordHash を設定する
+        self.password_hash = password_hash
+
+    # ------------------------------------------------------------------
+    # 内部ヘルパー
+    # ------------------------------------------------------------------
+
+    def _rng(self, purpose: int, chunk: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, purpose, chunk])
+
+    def _chunks(self) -> Iterator[Tuple[int, int, int]]:
+        """(チャンク番号, 先頭テナント番号, テナント数)"""
+        for chunk, start in enumerate(range(0, self.profile.tenants, self.chunk_size)):
+            yield chunk, start, min(self.chunk_size, self.profile.tenants - start)
+
+    def _user_counts(self) -> Iterator[Tuple[int, int, np.ndarray, int]]:
+        """チャンクごとのテナント別ユーザー数と、チャンク先頭のユーザー通し番号"""
+        low, high = self.profile.users_per_tenant
+        user_offset = 0
+        for chunk, start, size in self._chunks():
+            counts = self._rng(_USER_COUNTS, chunk).integers(low, high + 1, size=size)
+            if self.profile.max_users is not None:
+                # 上限を超える分は切り捨てる（従来のサンプルデータと同じ挙動）
+                remaining = max(self.profile.max_users - user_offset, 0)
+                capped = np.minimum(np.cumsum(counts), remaining)
+                counts = np.diff(capped, prepend=0)
+            yield chunk, start, counts, user_offset
+            user_offset += int(counts.sum())
+
+    def _tenant_profile(self, index: int) -> Tuple[str, List[str]]:
+        if index < len(TENANT_TEMPLATES):
+            name, domains = TENANT_TEMPLATES[index]
+            return name, list(domains)
+        return f"サンプルテナント{index + 1}", [f"tenant-{index + 1}.example.com"]
+
+    def _user_chunks(self) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+        """チャンクごとのユーザー一覧（メモリ上に保持するのは1チャンク分のみ）"""
+        for chunk, start, counts, user_offset in self._user_counts():
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            rng = self._rng(_USER_TIMES, chunk)
+            created = _timestamps(rng.integers(20, 151, size=total), self.reference_time)
+            updated = _timestamps(rng.integers(0, 21, size=total), self.reference_time)
+            last_login = _timestamps(rng.integers(0, 11, size=total), self.reference_time)
+
+            users: List[Dict[str, Any]] = []
+            for offset, count in enumerate(counts):
+                index = start + offset
+                name, domains = self._tenant_profile(index)
+                for slot in range(int(count)):
+                    template_name, username = USER_TEMPLATES[slot % len(USER_TEMPLATES)]
+                    if slot >= len(USER_TEMPLATES):
+                        # テンプレートが一巡した後は番号を付けてテナント内のメールアドレスを一意にする
+                        username = f"{username}.{slot + 1}"
+                    position = len(users)
+                    user_id = f"user-sample-{user_offset + position + 1:03d}"
+                    users.append({
+                        "id": user_id,
+                        "type": "user",
+                        "userId": f"{username}{index + 1}@{domains[0]}",
+                        "name": f"{template_name}（{name}）",
+                        "passwordHash": self.password_hash or PendingPasswordHash(DEFAULT_PASSWORD),
+                        "tenantId": tenant_id(index),
+                        "isActive": True,
+                        "createdAt": created[position],
+                        "updatedAt": updated[position],
+                        "lastLoginAt": last_login[position],
+                        "partitionKey": user_id
+                    })
+            yield chunk, users
+
+    # ------------------------------------------------------------------
+    # ドキュメントストリーム
+    # ------------------------------------------------------------------
+
+    def tenants(self) -> Iterator[Dict[str, Any]]:
+        """テナント"""
+        for chunk, start, size in self._chunks():
+            rng = self._rng(_TENANT_TIMES, chunk)
+            created = _timestamps(rng.integers(30, 181, size=size), self.reference_time)
+            updated = _timestamps(rng.integers(0, 31, size=size), self.reference_time)
+            for offset in range(size):
+                index = start + offset
+                name, domains = self._tenant_profile(index)
+                yield {
+                    "id": tenant_id(index),
+                    "type": "tenant",
+                    "name": name,
+                    "domains": domains,
+                    "isPrivileged": False,
+                    "createdAt": created[offset],
+                    "updatedAt": updated[offset],
+                    "partitionKey": tenant_id(index)
+                }
+
+    def users(self) -> Iterator[Dict[str, Any]]:
+        """ユーザー"""
+        for _, users in self._user_chunks():
+            yield from users
+
+    def tenant_users(self) -> Iterator[Dict[str, Any]]:
+        """テナント-ユーザー紐付け"""
+        for user in self.users():
+            yield {
+                "id": f"{user['tenantId']}_{user['id']}",
+                "type": "tenant_user",
+                "tenantId": user["tenantId"],
+                "userId": user["id"],
+                "addedAt": user["createdAt"],
+                "addedBy": "admin-user-001",
+                "partitionKey": user["tenantId"]
+            }
+
+    def user_roles(self) -> Iterator[Dict[str, Any]]:
+        """ユーザーロール割り当て（ユーザーごとに重み付きでパターンを選択）"""
+        weights = _normalized(self.profile.role_pattern_weights)
+        widest = max(len(pattern) for pattern in ROLE_PATTERNS)
+        for chunk, users in self._user_chunks():
+            # チャンク内の全ユーザー分のパターンと日数をまとめて抽選
+            patterns = self._rng(_ROLE_CHOICES, chunk).choice(
+                len(ROLE_PATTERNS), size=len(users), p=weights)
+            assigned = _timestamps(
+                self._rng(_ROLE_TIMES, chunk).integers(0, 101, size=(len(users), widest)),
+                self.reference_time)
+            for position, user in enumerate(users):
+                for slot, (service_key, role_key) in enumerate(ROLE_PATTERNS[patterns[position]]):
+                    role_id = ROLE_IDS[service_key][role_key]
+                    yield {
+                        "id": f"{user['id']}_{role_id}",
+                        "type": "user_role",
+                        "userId": user["id"],
+                        "roleId": role_id,
+                        "serviceId": SERVICE_IDS[service_key],
+                        "assignedAt": assigned[position][slot],
+                        "assignedBy": "admin-user-001",
+                        "partitionKey": user["id"]
+                    }
+
+    def tenant_services(self) -> Iterator[Dict[str, Any]]:
+        """テナント-サービス割り当て（テナントごとに重み付きでパッケージを選択）"""
+        weights = _normalized(self.profile.service_package_weights)
+        for chunk, start, size in self._chunks():
+            rng = self._rng(_SERVICE_CHOICES, chunk)
+            packages = rng.choice(len(SERVICE_PACKAGES), size=size, p=weights)
+            assigned = _timestamps(
+                rng.integers(10, 151, size=(size, max(map(len, SERVICE_PACKAGES)))),
+                self.reference_time)
+            for offset in range(size):
+                tenant = tenant_id(start + offset)
+                for slot, service_key in enumerate(SERVICE_PACKAGES[packages[offset]]):
+                    service_id = SERVICE_IDS[service_key]
+                    yield {
+                        "id": f"{tenant}_{service_id}",
+                        "tenant_id": tenant,
+                        "service_id": service_id,
+                        "tenantId": tenant,  # パーティションキー用
+                        "assigned_at": assigned[offset][slot],
+                        "assigned_by": "admin-user-001",
+                    }
+
+    def estimated_counts(self) -> Dict[str, float]:
+        """プロファイルから見積もった件数（上限なしの場合の期待値）"""
+        low, high = self.profile.users_per_tenant
+        users = self.profile.tenants * (low + high) / 2
+        if self.profile.max_users is not None:
+            users = min(users, self.profile.max_users)
+        role_weights = _normalized(self.profile.role_pattern_weights)
+        service_weights = _normalized(self.profile.service_package_weights)
+        return {
+            "tenants": self.profile.tenants,
+            "users": users,
+            "tenant_users": users,
+            "user_roles": users * float(np.dot(role_weights, [len(p) for p in ROLE_PATTERNS])),
+            "tenant_services": self.profile.tenants * float(
+                np.dot(service_weights, [len(p) for p in SERVICE_PACKAGES])),
+        }
@@ -1,12 +1,6 @@
 """初期シードデータ定義"""
 from datetime import datetime
-import uuid
-from passlib.hash import bcrypt
-
-
-def generate_id():
-    """UUID生成"""
-    return str(uuid.uuid4())
+from .password_hashing import PendingPasswordHash
 
 
 # 特権テナント
@@ -26,7 +20,7 @@ ADMIN_USER = {
     "type": "user",
     "userId": "admin@system.local",
     "name": "システム管理者",
-    "passwordHash": bcrypt.hash("Admin@12345"),  # 初期パスワード
+    "passwordHash": PendingPasswordHash("Admin@12345"),  # 初期パスワード（シード時にハッシュ化）
     "tenantId": "privileged-tenant-001",
     "isActive": True,
     "createdAt": datetime.utcnow().isoformat() + "Z",
@@ -35,7 +29,7 @@ ADMIN_USER = {
 
 # テナント-ユーザー紐付け
 TENANT_USER_RELATION = {
-    "id": generate_id(),
+    "id": "privileged-tenant-001_admin-user-001",
     "type": "tenant_user",
     "tenantId": "privileged-tenant-001",
     "userId": "admin-user-001",
@@ -326,7 +320,7 @@ ROLES = [
 # 管理者ユーザーのロール割り当て
 ADMIN_USER_ROLES = [
     {
-        "id": generate_id(),
+        "id": "admin-user-001_role-001",
         "type": "user_role",
         "userId": "admin-user-001",
         "roleId": "role-001",  # テナント管理 - 全体管理者
@@ -336,7 +330,7 @@ ADMIN_USER_ROLES = [
         "partitionKey": "admin-user-001"
     },
     {
-        "id": generate_id(),
+        "id": "admin-user-001_role-004",
         "type": "user_role",
         "userId": "admin-user-001",
         "roleId": "role-004",  # 認証認可 - 全体管理者
@@ -346,7 +340,7 @@ ADMIN_USER_ROLES = [
         "partitionKey": "admin-user-001"
     },
     {
-        "id": generate_id(),
+        "id": "admin-user-001_role-006",
         "type": "user_role",
         "userId": "admin-user-001",
         "roleId": "role-006",  # サービス設定 - 全体管理者
@@ -0,0 +1,248 @@
+"""シードデータのパスワードハッシュ生成
+
+bcrypt はコスト12で1件あたり数百ミリ秒のCPUを消費するため、モジュール読み込み時には
+ハッシュ化せず PendingPasswordHash を置いておき、シードのステージとして一括で解決する。
+
+- 同じパスワード・コストの組み合わせは1回だけハッシュ化する
+- 未計算のハッシュは ProcessPoolExecutor で全コアを使って並列に計算する
+- 計算済みのハッシュはパスワードとコストをキーにユーザー専用のディレクトリへキャッシュし、
+  次回以降は再利用する（キャッシュのハッシュは使う前に必ずパスワードと照合する）
+- 非本番データでは SEED_BCRYPT_ROUNDS（または low_cost=True）でコストを下げられる
+- キャッシュのキーと contentHash 用の指紋は、Cosmos DB に保存しない秘密鍵による HMAC で求める
+  （SEED_HASH_SECRET、なければユーザー専用のディレクトリに生成した鍵ファイル）。
+  保存されたハッシュからパスワードを高速に総当たりできないようにするため
+
+使用例:
+    user = {"id": "user-001", "passwordHash": PendingPasswordHash("Password@123")}
+    hash_passwords([user])
+"""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, MutableMapping, Optional
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import secrets
+
+DEFAULT_ROUNDS = 12
+# bcrypt の最小コスト（非本番データ向け）
+LOW_COST_ROUNDS = 4
+PASSWORD_FIELD = "passwordHash"
+SECRET_FILE_NAME = "seed-hash-secret"
+
+
+class SeedPasswordHash(str):
+    """ハッシュ化済みのパスワード（文字列としては bcrypt ハッシュそのもの）
+
+    fingerprint は (コスト, パスワード) の HMAC で、ソルトによって毎回変わる
+    ハッシュの代わりに contentHash の計算に使う（パスワードやコストの変更を検出するため）。
+    """
+
+    def __new__(cls, password_hash: str, fingerprint: str):
+        value = super().__new__(cls, password_hash)
+        value.fingerprint = fingerprint
+        return value
+
+    def __reduce__(self):
+        return SeedPasswordHash, (str(self), self.fingerprint)
+
+
+class PendingPasswordHash:
+    """ハッシュ化前のパスワード（JSONに変換できないため、未解決のまま書き込まれることはない）"""
+    __slots__ = ("password",)
+
+    def __init__(self, password: str):
+        self.password = password
+
+    def __repr__(self) -> str:
+        return "PendingPasswordHash(***)"
+
+
+def resolve_rounds(low_cost: bool = False) -> int:
+    """使用するコストを決定（SEED_BCRYPT_ROUNDS が最優先）"""
+    configured = os.getenv("SEED_BCRYPT_ROUNDS")
+    if configured:
+        return int(configured)
+    return LOW_COST_ROUNDS if low_cost else DEFAULT_ROUNDS
+
+
+def default_cache_path() -> Path:
+    """ハッシュキャッシュの保存先（SEED_PASSWORD_HASH_CACHE で変更可能）
+
+    共有の一時ディレクトリは他のユーザーが書き込めるため使わず、
+    ユーザーごとのキャッシュディレクトリ（XDG_CACHE_HOME または ~/.cache）に置く。
+    """
+    configured = os.getenv("SEED_PASSWORD_HASH_CACHE")
+    if configured:
+        return Path(configured)
+    return _user_cache_dir() / "seed-password-hashes.json"
+
+
+def _user_cache_dir() -> Path:
+    cache_home = os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "ws-demo"
+
+
+_secret: Optional[bytes] = None
+
+
+def _hash_secret() -> bytes:
+    """HMAC の秘密鍵（SEED_HASH_SECRET、なければ鍵ファイルを読み込むか 0600 で生成する）"""
+    global _secret
+    if _secret is not None:
+        return _secret
+    configured = os.getenv("SEED_HASH_SECRET")
+    if configured:
+        _secret = configured.encode("utf-8")
+        return _secret
+    path = _user_cache_dir() / SECRET_FILE_NAME
+    path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        _secret = path.read_bytes().strip()
+    else:
+        with os.fdopen(fd, "wb") as f:
+            f.write(secrets.token_hex(32).encode("ascii"))
+        _secret = path.read_bytes().strip()
+    return _secret
+
+
+def _cache_key(password: str, rounds: int) -> str:
+    return hmac.new(
+        _hash_secret(), f"{rounds}:{password}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def password_fingerprint(password: str, rounds: int) -> str:
+    """パスワードとコストの指紋（contentHash 用。キャッシュのキーと同じ秘密鍵付きの導出）"""
+    return _cache_key(password, rounds)
+
+
+def _hash_password(password: str, rounds: int) -> str:
+    """ワーカープロセスで実行するハッシュ化"""
+    from passlib.hash import bcrypt
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def _resolve_hash(password: str, rounds: int, cached: Optional[str]) -> str:
+    """キャッシュのハッシュがパスワードと一致すれば再利用し、そうでなければ計算する
+
+    キャッシュファイルを書き換えられても、別のパスワードのハッシュが使われることはない。
+    """
+    if cached is not None:
+        from passlib.hash import bcrypt
+        try:
+            if bcrypt.verify(password, cached):
+                return cached
+        except (TypeError, ValueError):
+            pass
+    return _hash_password(password, rounds)
+
+
+class PasswordHashCache:
+    """パスワードとコストをキーにしたハッシュのディスクキャッシュ"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path is not None else default_cache_path()
+        self._entries: Dict[str, str] = {}
+        self._dirty = False
+        try:
+            self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, password: str, rounds: int) -> Optional[str]:
+        return self._entries.get(_cache_key(password, rounds))
+
+    def put(self, password: str, rounds: int, password_hash: str):
+        self._entries[_cache_key(password, rounds)] = password_hash
+        self._dirty = True
+
+    def save(self):
+        """変更があればアトミックに書き出す（ディレクトリ 0700・ファイル 0600。失敗しても処理は継続）"""
+        if not self._dirty:
+            return
+        try:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.chmod(temp_path, 0o600)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"⚠ パスワードハッシュのキャッシュを保存できません: {e}")
+
+
+def hash_passwords(
+    documents: Iterable[MutableMapping[str, Any]],
+    rounds: Optional[int] = None,
+    cache: Optional[PasswordHashCache] = None,
+    max_workers: Optional[int] = None,
+    field: str = PASSWORD_FIELD,
+    use_cache: bool = True
+) -> Dict[str, int]:
+    """documents の PendingPasswordHash をハッシュに置き換え、計算件数を返す
+
+    戻り値は {"documents": 置換したドキュメント数, "cached": キャッシュ利用数, "computed": 計算数}。
+    use_cache=False の場合はキャッシュを読み書きせず、常にハッシュを計算する。
+    """
+    rounds = rounds if rounds is not None else resolve_rounds()
+    if use_cache and cache is None:
+        cache = PasswordHashCache()
+
+    pending: List[MutableMapping[str, Any]] = [
+        document for document in documents
+        if isinstance(document.get(field), PendingPasswordHash)
+    ]
+    passwords = list({document[field].password for document in pending})
+    candidates = [cache.get(password, rounds) if use_cache else None for password in passwords]
+
+    # キャッシュの照合（bcrypt.verify）も計算と同じコストのため、まとめて並列に処理する
+    if len(passwords) == 1:
+        # 1件だけならプロセス起動のコストを避ける
+        resolved = [_resolve_hash(passwords[0], rounds, candidates[0])]
+    elif passwords:
+        workers = max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(passwords))) as executor:
+            resolved = list(executor.map(
+                _resolve_hash, passwords, [rounds] * len(passwords), candidates))
+    else:
+        resolved = []
+    hashes: Dict[str, str] = dict(zip(passwords, resolved))
+
+    reused = 0
+    for password, candidate, password_hash in zip(passwords, candidates, resolved):
+        if password_hash == candidate:
+            reused += 1
+        elif use_cache:
+            cache.put(password, rounds, password_hash)
+    if use_cache:
+        cache.save()
+
+    for document in pending:
+        password = document[field].password
+        document[field] = SeedPasswordHash(hashes[password], password_fingerprint(password, rounds))
+    return {
+        "documents": len(pending),
+        "cached": reused,
+        "computed": len(passwords) - reused,
+    }
+
+
+async def async_hash_passwords(
+    documents: Iterable[MutableMapping[str, Any]],
+    rounds: Optional[int] = None,
+    cache: Optional[PasswordHashCache] = None,
+    max_workers: Optional[int] = None,
+    use_cache: bool = True
+) -> Dict[str, int]:
+    """hash_passwords() をイベントループをブロックせずに実行（シードのステージ用）"""
+    documents = list(documents)
+    return await asyncio.get_running_loop().run_in_executor(
+        None, lambda: hash_passwords(documents, rounds, cache, max_workers,
+                                     use_cache=use_cache))
+
@@ -0,0 +1,195 @@
+"""依存関係を考慮したシードステージのスケジューラー
+
+各ステージに依存先を宣言し、依存先がすべて完了したステージから並行に実行する。
+全体の所要時間は全ステージの合計ではなく、最も長い依存チェーン（クリティカルパス）で決まる。
+
+- 存在しない依存先・循環依存は実行前に検出して ValueError を送出する
+- いずれかのステージが失敗した時点で残りのステージを中止し、StageFailedError を送出する
+- checkpoint を渡すと完了したステージを記録し、再実行時は前回完了済みのステージを実行しない
+  （メモリ上の状態を作るだけのステージは checkpointed=False にして毎回実行する）
+
+使用例:
+    scheduler = StageScheduler([
+        Stage("role", seed_roles),
+        Stage("user", seed_users),
+        Stage("user_role", seed_user_roles, depends_on=("role", "user")),
+    ])
+    await scheduler.run()
+    scheduler.print_report()
+"""
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+import asyncio
+import time
+
+from .checkpoint import SeedCheckpoint
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+RESUMED = "resumed"
+
+
+@dataclass
+class Stage:
+    """シードステージの定義"""
+    name: str
+    run: Callable[[], Awaitable[Any]]
+    depends_on: Sequence[str] = ()
+    checkpointed: bool = True
+
+
+@dataclass
+class StageResult:
+    """ステージの実行結果（時刻はスケジューラー開始からの経過秒）"""
+    name: str
+    status: str
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+class StageFailedError(RuntimeError):
+    """ステージの失敗により実行を中止した"""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class StageScheduler:
+    """ステージを依存関係に従って並行実行するスケジューラー"""
+
+    def __init__(self, stages: Sequence[Stage], checkpoint: Optional[SeedCheckpoint] = None):
+        self.stages = list(stages)
+        self.checkpoint = checkpoint
+        self.results: Dict[str, StageResult] = {}
+        self._by_name = {stage.name: stage for stage in self.stages}
+        self.validate()
+
+    def validate(self):
+        """重複・存在しない依存先・循環依存を検出"""
+        if len(self._by_name) != len(self.stages):
+            names = [stage.name for stage in self.stages]
+            duplicates = sorted({name for name in names if names.count(name) > 1})
+            raise ValueError(f"duplicate stage names: {duplicates}")
+        for stage in self.stages:
+            missing = [name for name in stage.depends_on if name not in self._by_name]
+            if missing:
+                raise ValueError(f"stage '{stage.name}' depends on unknown stages: {missing}")
+
+        # 深さ優先探索で循環を検出
+        visiting, done = set(), set()
+
+        def visit(name: str, path: List[str]):
+            if name in done:
+                return
+            if name in visiting:
+                cycle = path[path.index(name):] + [name]
+                raise ValueError(f"dependency cycle: {' -> '.join(cycle)}")
+            visiting.add(name)
+            for dependency in self._by_name[name].depends_on:
+                visit(dependency, path + [name])
+            visiting.discard(name)
+            done.add(name)
+
+        for stage in self.stages:
+            visit(stage.name, [])
+
+    async def run(self) -> Dict[str, StageResult]:
+        """全ステージを実行し、結果を返す"""
+        origin = time.monotonic()
+        tasks: Dict[str, asyncio.Task] = {}
+        self.results = {stage.name: StageResult(stage.name, CANCELLED) for stage in self.stages}
+
+        async def execute(stage: Stage):
+            if stage.depends_on:
+                await asyncio.gather(*(tasks[name] for name in stage.depends_on))
+            result = self.results[stage.name]
+            checkpointed = self.checkpoint is not None and stage.checkpointed
+            if checkpointed and self.checkpoint.is_stage_completed(stage.name):
+                result.status = RESUMED
+                return
+            result.started_at = time.monotonic() - origin
+            try:
+                await stage.run()
+            except asyncio.CancelledError:
+                result.finished_at = time.monotonic() - origin
+                raise
+            except Exception as e:
+                result.status, result.error = FAILED, e
+                result.finished_at = time.monotonic() - origin
+                raise
+            result.status = SUCCEEDED
+            result.finished_at = time.monotonic() - origin
+            if checkpointed:
+                self.checkpoint.complete_stage(stage.name)
+
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.ensure_future(execute(stage))
+
+        pending = set(tasks.values())
+        failure: Optional[StageResult] = None
+        while pending and failure is None:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+            failure = next(
+                (result for result in self.results.values() if result.status == FAILED), None)
+
+        if failure is not None:
+            # 失敗したら残りを中止（依存先の失敗を待っているステージも含む）
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in tasks.values():
+                if task.done() and not task.cancelled():
+                    task.exception()
+            raise StageFailedError(failure.name, failure.error)
+        return self.results
+
+    def critical_path(self) -> List[StageResult]:
+        """最後に完了したステージから、最も遅く完了した依存先を辿った経路"""
+        finished = [
+            result for result in self.results.values() if result.finished_at is not None]
+        if not finished:
+            return []
+        current = max(finished, key=lambda result: result.finished_at)
+        path = [current]
+        while True:
+            dependencies = [
+                self.results[name] for name in self._by_name[current.name].depends_on
+                if self.results[name].finished_at is not None
+            ]
+            if not dependencies:
+                break
+            current = max(dependencies, key=lambda result: result.finished_at)
+            path.append(current)
+        return list(reversed(path))
+
+    def print_report(self):
+        """ステージごとの所要時間とクリティカルパスを表示"""
+        symbols = {SUCCEEDED: "✓", FAILED: "✗", CANCELLED: "⊘", RESUMED: "⊘"}
+        print("\nステージ実行時間:")
+        for stage in self.stages:
+            result = self.results.get(stage.name)
+            if result is None:
+                continue
+            timing = (f"{result.started_at:7.2f}s → {result.finished_at:7.2f}s "
+                      f"({result.duration:.2f}s)") if result.finished_at is not None else (
+                          "前回完了済み" if result.status == RESUMED else "未実行")
+            dependencies = f" [after {', '.join(stage.depends_on)}]" if stage.depends_on else ""
+            print(f"  {symbols[result.status]} {stage.name:16s} {timing}{dependencies}")
+
+        path = self.critical_path()
+        if path:
+            total = path[-1].finished_at
+            sequential = sum(result.duration for result in self.results.values())
+            print("\nクリティカルパス:")
+            print("  " + " → ".join(f"{result.name} ({result.duration:.2f}s)" for result in path))
+            print(f"  全体: {total:.2f}s (逐次実行した場合: {sequential:.2f}s)")
@@ -1,10 +1,17 @@
 #!/usr/bin/env python3
 """
 初期データを投入するスクリプト
+
+Usage:
+    python scripts/seed_database.py
+    python scripts/seed_database.py --provisioned-ru 1000
 """
+import argparse
+import asyncio
 import sys
 import os
 from pathlib import Path
+from typing import List
 
 # .envファイルを自動読み込み
 from dotenv import load_dotenv
@@ -22,7 +29,12 @@ if not os.getenv("COSMOS_DB_ENDPOINT"):
 # プロジェクトルートをパスに追加
 sys.path.append(str(project_root / 'src'))
 
-from shared.cosmos_client import CosmosDBClient
+from shared.email_index import email_index_document
+from shared.throttle import RUBudgetController
+from seed_data.checkpoint import open_checkpoint
+from seed_data.engine import SeedEngine
+from seed_data.password_hashing import async_hash_passwords
+from seed_data.scheduler import Stage, StageScheduler
 from seed_data.initial_data import (
     PRIVILEGED_TENANT,
     ADMIN_USER,
@@ -33,101 +45,131 @@ from seed_data.initial_data import (
 )
 
 
-def seed_tenant_data():
+async def seed_tenant_data(engine: SeedEngine):
     """テナントデータ投入"""
-    print("\n=== テナントデータ投入 ===")
-    
-    client = CosmosDBClient(database_name="tenant_management")
-    client.create_database()
-    container = client.get_container("tenants")
-    
-    # 特権テナント
-    try:
-        container.create_item(PRIVILEGED_TENANT)
-        print(f"✓ 特権テナント作成: {PRIVILEGED_TENANT['name']}")
-    except Exception as e:
-        print(f"⚠ 特権テナントは既に存在: {e}")
-    
-    # テナント-ユーザー紐付け
-    try:
-        container.create_item(TENANT_USER_RELATION)
-        print(f"✓ テナント-ユーザー紐付け作成")
-    except Exception as e:
-        print(f"⚠ 紐付けは既に存在: {e}")
+    await engine.write(
+        "tenants", "tenant_management", "tenants", [PRIVILEGED_TENANT],
+        label=lambda tenant: f"特権テナント: {tenant['name']}")
+
+
+async def seed_tenant_user_data(engine: SeedEngine):
+    """テナント-ユーザー紐付け投入"""
+    await engine.write(
+        "tenant_users", "tenant_management", "tenants", [TENANT_USER_RELATION],
+        label=lambda relation: "テナント-ユーザー紐付け")
+
 
+async def hash_user_passwords():
+    """ユーザーのパスワードをハッシュ化"""
+    result = await async_hash_passwords([ADMIN_USER])
+    print(f"✓ パスワードハッシュ生成: {result['computed']} 件計算, {result['cached']} 件キャッシュ")
 
-def seed_user_data():
+
+async def seed_user_data(engine: SeedEngine):
     """ユーザーデータ投入"""
-    print("\n=== ユーザーデータ投入 ===")
-    
-    client = CosmosDBClient(database_name="auth_management")
-    client.create_database()
-    container = client.get_container("users")
-    
-    # 管理者ユーザー
-    try:
-        container.create_item(ADMIN_USER)
-        print(f"✓ 管理者ユーザー作成: {ADMIN_USER['userId']}")
-    except Exception as e:
-        print(f"⚠ ユーザーは既に存在: {e}")
-    
-    # ユーザーロール
-    for user_role in ADMIN_USER_ROLES:
-        try:
-            container.create_item(user_role)
-            print(f"✓ ユーザーロール割り当て: {user_role['roleId']}")
-        except Exception as e:
-            print(f"⚠ ロール割り当ては既に存在")
+    await engine.write(
+        "users", "auth_management", "users", [ADMIN_USER],
+        label=lambda user: f"管理者ユーザー: {user['userId']}")
+
+
+async def seed_email_index_data(engine: SeedEngine):
+    """メールアドレスのインデックス投入"""
+    await engine.write(
+        "email_index", "auth_management", "user_email_index",
+        [email_index_document(ADMIN_USER)], mode="upsert")
+
 
+async def seed_user_role_data(engine: SeedEngine):
+    """ユーザーロール割り当て投入"""
+    await engine.write(
+        "user_roles", "auth_management", "users", ADMIN_USER_ROLES,
+        label=lambda user_role: f"ユーザーロール割り当て: {user_role['roleId']}")
 
-def seed_role_data():
+
+async def seed_role_data(engine: SeedEngine):
     """ロールデータ投入"""
-    print("\n=== ロールデータ投入 ===")
-    
-    client = CosmosDBClient(database_name="auth_management")
-    client.create_database()
-    container = client.get_container("roles")
-    
-    for role in ROLES:
-        try:
-            container.create_item(role)
-            print(f"✓ ロール作成: {role['serviceName']} - {role['roleName']}")
-        except Exception as e:
-            print(f"⚠ ロールは既に存在: {role['roleName']}")
+    await engine.write(
+        "roles", "auth_management", "roles", ROLES,
+        label=lambda role: f"ロール: {role['serviceName']} - {role['roleName']}")
 
 
-def seed_service_data():
+async def seed_service_data(engine: SeedEngine):
     """サービスデータ投入"""
-    print("\n=== サービスデータ投入 ===")
-    
-    client = CosmosDBClient(database_name="service_management")
-    client.create_database()
-    container = client.get_container("services")
-    
-    for service in SERVICES:
+    await engine.write(
+        "services", "service_management", "services", SERVICES,
+        label=lambda service: f"サービス: {service['name']}")
+
+
+def build_stages(engine: SeedEngine) -> List[Stage]:
+    """シードステージと依存関係"""
+    return [
+        Stage("tenant", lambda: seed_tenant_data(engine)),
+        Stage("password_hash", hash_user_passwords, checkpointed=False),
+        Stage("user", lambda: seed_user_data(engine), depends_on=("password_hash",)),
+        Stage("email_index", lambda: seed_email_index_data(engine), depends_on=("user",)),
+        Stage("role", lambda: seed_role_data(engine)),
+        Stage("service", lambda: seed_service_data(engine)),
+        Stage("user_role", lambda: seed_user_role_data(engine), depends_on=("role", "user")),
+        Stage("tenant_user", lambda: seed_tenant_user_data(engine),
+              depends_on=("tenant", "user")),
+    ]
+
+
+async def seed(provisioned_ru=None, incremental: bool = True, restart: bool = False):
+    """依存関係に従って全ステージを投入（incremental なら変更のあったドキュメントのみ）"""
+    checkpoint = open_checkpoint(
+        "initial", run_key=f"initial:{os.getenv('COSMOS_DB_ENDPOINT')}", restart=restart)
+    engine = SeedEngine(
+        controller=RUBudgetController(provisioned_ru), strict=True,
+        incremental=incremental, checkpoint=checkpoint)
+    async with engine:
+        scheduler = StageScheduler(build_stages(engine), checkpoint=checkpoint)
         try:
-            container.create_item(service)
-            print(f"✓ サービス作成: {service['name']}")
-        except Exception as e:
-            print(f"⚠ サービスは既に存在: {service['name']}")
+            await scheduler.run()
+            checkpoint.clear()
+        finally:
+            checkpoint.save()
+            scheduler.print_report()
+            engine.print_summary()
 
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Cosmos DBに初期データを投入")
+    parser.add_argument(
+        "--provisioned-ru",
+        type=float,
+        default=None,
+        help="書き込みに使うRU/s（デフォルト: COSMOS_DB_PROVISIONED_RU または 400）",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="既存ドキュメントとの差分を取らず全件を書き込む（デフォルトは変更分のみ）",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="前回中断した投入のチェックポイントを破棄して最初から投入する",
+    )
+    args = parser.parse_args()
+
     print("=== シードデータ投入開始 ===\n")
-    
+
     try:
-        seed_tenant_data()
-        seed_user_data()
-        seed_role_data()
-        seed_service_data()
-        
+        asyncio.run(seed(
+            args.provisioned_ru, incremental=not args.full, restart=args.restart))
+
         print("\n=== シードデータ投入完了 ===")
         print("\n初期ログイン情報:")
         print(f"  ユーザーID: {ADMIN_USER['userId']}")
         print(f"  パスワード: Admin@12345")
-        
+
     except Exception as e:
         print(f"\n✗ エラー: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
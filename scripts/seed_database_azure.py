@@ -7,17 +7,24 @@ Usage:
     python scripts/seed_database_azure.py --endpoint https://cosmos-xxx.documents.azure.com:443/ --include-sample
 """
 import argparse
+import asyncio
 import sys
 from pathlib import Path
+from typing import List
 
 # プロジェクトルート
 project_root = Path(__file__).resolve().parent.parent
 sys.path.append(str(project_root / "scripts"))
+sys.path.append(str(project_root / "src"))
 
-from azure.cosmos import CosmosClient, PartitionKey
-from azure.cosmos.exceptions import CosmosResourceExistsError
-from azure.identity import DefaultAzureCredential
+from azure.identity.aio import DefaultAzureCredential
 
+from shared.email_index import email_index_document
+from shared.throttle import RUBudgetController
+from seed_data.checkpoint import open_checkpoint
+from seed_data.engine import SeedEngine
+from seed_data.password_hashing import async_hash_passwords
+from seed_data.scheduler import Stage, StageScheduler
 from seed_data.initial_data import (
     ADMIN_USER,
     ADMIN_USER_ROLES,
@@ -28,81 +35,143 @@ from seed_data.initial_data import (
 )
 
 
-def get_client(endpoint: str) -> CosmosClient:
-    """Azure AD認証でCosmosClientを生成"""
-    credential = DefaultAzureCredential()
-    return CosmosClient(endpoint, credential=credential)
+async def seed_tenant_data(engine: SeedEngine):
+    """テナントデータ投入"""
+    await engine.write(
+        "tenants", "tenant_management", "tenants", [PRIVILEGED_TENANT], mode="upsert",
+        label=lambda tenant: f"特権テナント: {tenant['name']}")
 
 
-def upsert_item(container, item, label: str):
-    """アイテムをupsert（存在すれば更新、なければ作成）"""
-    try:
-        container.upsert_item(item)
-        print(f"  ✓ {label}")
-    except Exception as e:
-        print(f"  ✗ {label}: {e}")
+async def seed_tenant_user_data(engine: SeedEngine):
+    """テナント-ユーザー紐付け投入"""
+    await engine.write(
+        "tenant_users", "tenant_management", "tenants", [TENANT_USER_RELATION], mode="upsert",
+        label=lambda relation: "テナント-ユーザー紐付け")
 
 
-def seed_tenant_data(client: CosmosClient):
-    """テナントデータ投入"""
-    print("\n=== テナントデータ投入 ===")
-    db = client.get_database_client("tenant_management")
-    container = db.get_container_client("tenants")
+async def hash_user_passwords(users, use_cache: bool = False):
+    """ユーザーのパスワードをハッシュ化（デプロイ環境向けのためキャッシュは既定で使わない）"""
+    result = await async_hash_passwords(users, use_cache=use_cache)
+    print(f"✓ パスワードハッシュ生成: {result['computed']} 件計算, {result['cached']} 件キャッシュ")
 
-    upsert_item(container, PRIVILEGED_TENANT, f"特権テナント: {PRIVILEGED_TENANT['name']}")
-    upsert_item(container, TENANT_USER_RELATION, "テナント-ユーザー紐付け")
 
-
-def seed_user_data(client: CosmosClient):
+async def seed_user_data(engine: SeedEngine):
     """ユーザーデータ投入"""
-    print("\n=== ユーザーデータ投入 ===")
-    db = client.get_database_client("auth_management")
-    container = db.get_container_client("users")
+    await engine.write(
+        "users", "auth_management", "users", [ADMIN_USER], mode="upsert",
+        label=lambda user: f"管理者ユーザー: {user['userId']}")
 
-    upsert_item(container, ADMIN_USER, f"管理者ユーザー: {ADMIN_USER['userId']}")
-    for user_role in ADMIN_USER_ROLES:
-        upsert_item(container, user_role, f"ユーザーロール割り当て: {user_role['roleId']}")
 
+async def seed_user_role_data(engine: SeedEngine):
+    """ユーザーロール割り当て投入"""
+    await engine.write(
+        "user_roles", "auth_management", "users", ADMIN_USER_ROLES, mode="upsert",
+        label=lambda user_role: f"ユーザーロール割り当て: {user_role['roleId']}")
 
-def seed_role_data(client: CosmosClient):
-    """ロールデータ投入"""
-    print("\n=== ロールデータ投入 ===")
-    db = client.get_database_client("auth_management")
-    container = db.get_container_client("roles")
 
-    for role in ROLES:
-        upsert_item(container, role, f"ロール: {role['serviceName']} - {role['roleName']}")
+async def seed_role_data(engine: SeedEngine):
+    """ロールデータ投入"""
+    await engine.write(
+        "roles", "auth_management", "roles", ROLES, mode="upsert",
+        label=lambda role: f"ロール: {role['serviceName']} - {role['roleName']}")
 
 
-def seed_service_data(client: CosmosClient):
+async def seed_service_data(engine: SeedEngine):
     """サービスデータ投入"""
-    print("\n=== サービスデータ投入 ===")
-    db = client.get_database_client("service_management")
-    container = db.get_container_client("services")
-
-    for service in SERVICES:
-        upsert_item(container, service, f"サービス: {service['name']}")
-
-
-def seed_sample_data(client: CosmosClient):
-    """サンプルデータ投入"""
-    print("\n=== サンプルデータ投入 ===")
-    try:
-        from seed_data.sample_data import SAMPLE_TENANTS, SAMPLE_USERS
-
-        db_tenant = client.get_database_client("tenant_management")
-        container_tenants = db_tenant.get_container_client("tenants")
-        for tenant in SAMPLE_TENANTS:
-            upsert_item(container_tenants, tenant, f"サンプルテナント: {tenant['name']}")
-
-        db_auth = client.get_database_client("auth_management")
-        container_users = db_auth.get_container_client("users")
-        for user in SAMPLE_USERS:
-            upsert_item(container_users, user, f"サンプルユーザー: {user['userId']}")
-
-        print(f"\n  サンプルテナント: {len(SAMPLE_TENANTS)}件, サンプルユーザー: {len(SAMPLE_USERS)}件")
-    except ImportError:
-        print("  ⚠ サンプルデータモジュールが見つかりません。スキップします。")
+    await engine.write(
+        "services", "service_management", "services", SERVICES, mode="upsert",
+        label=lambda service: f"サービス: {service['name']}")
+
+
+async def seed_sample_tenant_data(engine: SeedEngine, tenants):
+    """サンプルテナント投入"""
+    await engine.write(
+        "sample_tenants", "tenant_management", "tenants", tenants, mode="upsert",
+        label=lambda tenant: f"サンプルテナント: {tenant['name']}")
+
+
+async def seed_sample_user_data(engine: SeedEngine, users):
+    """サンプルユーザー投入"""
+    await engine.write(
+        "sample_users", "auth_management", "users", users, mode="upsert",
+        label=lambda user: f"サンプルユーザー: {user['userId']}")
+
+
+async def seed_email_index_data(engine: SeedEngine, category: str, users):
+    """メールアドレスのインデックス投入"""
+    await engine.write(
+        category, "auth_management", "user_email_index",
+        (email_index_document(user) for user in users), mode="upsert")
+
+
+def build_stages(
+    engine: SeedEngine,
+    include_sample: bool,
+    password_cache: bool = False
+) -> List[Stage]:
+    """シードステージと依存関係"""
+    stages = [
+        Stage("tenant", lambda: seed_tenant_data(engine)),
+        Stage("password_hash", lambda: hash_user_passwords([ADMIN_USER], password_cache),
+              checkpointed=False),
+        Stage("user", lambda: seed_user_data(engine), depends_on=("password_hash",)),
+        Stage("email_index", lambda: seed_email_index_data(engine, "email_index", [ADMIN_USER]),
+              depends_on=("user",)),
+        Stage("role", lambda: seed_role_data(engine)),
+        Stage("service", lambda: seed_service_data(engine)),
+        Stage("user_role", lambda: seed_user_role_data(engine), depends_on=("role", "user")),
+        Stage("tenant_user", lambda: seed_tenant_user_data(engine),
+              depends_on=("tenant", "user")),
+    ]
+    if include_sample:
+        try:
+            from seed_data.sample_data import SAMPLE_TENANTS, SAMPLE_USERS
+        except ImportError:
+            print("  ⚠ サンプルデータモジュールが見つかりません。スキップします。")
+            return stages
+        stages += [
+            Stage("sample_tenant", lambda: seed_sample_tenant_data(engine, SAMPLE_TENANTS)),
+            Stage("sample_password_hash",
+                  lambda: hash_user_passwords(SAMPLE_USERS, password_cache),
+                  checkpointed=False),
+            Stage("sample_user", lambda: seed_sample_user_data(engine, SAMPLE_USERS),
+                  depends_on=("sample_password_hash",)),
+            Stage("sample_email_index",
+                  lambda: seed_email_index_data(engine, "sample_email_index", SAMPLE_USERS),
+                  depends_on=("sample_user",)),
+        ]
+    return stages
+
+
+async def seed(
+    endpoint: str,
+    include_sample: bool,
+    provisioned_ru=None,
+    incremental: bool = True,
+    restart: bool = False,
+    password_cache: bool = False
+):
+    """依存関係に従って全ステージを投入（Azure AD 認証で接続）
+
+    資格情報を明示的に渡し、環境変数 COSMOS_DB_KEY によるキー認証には切り替えない。
+    """
+    checkpoint = open_checkpoint(
+        "azure", run_key=f"azure:{endpoint}:{include_sample}", restart=restart)
+    async with DefaultAzureCredential() as credential:
+        engine = SeedEngine(
+            endpoint=endpoint, controller=RUBudgetController(provisioned_ru),
+            strict=True, incremental=incremental, checkpoint=checkpoint,
+            credential=credential)
+        async with engine:
+            scheduler = StageScheduler(
+                build_stages(engine, include_sample, password_cache), checkpoint=checkpoint)
+            try:
+                await scheduler.run()
+                checkpoint.clear()
+            finally:
+                checkpoint.save()
+                scheduler.print_report()
+                engine.print_summary()
 
 
 def main():
@@ -117,6 +186,27 @@ def main():
         action="store_true",
         help="サンプルデータも投入する",
     )
+    parser.add_argument(
+        "--provisioned-ru",
+        type=float,
+        default=None,
+        help="書き込みに使うRU/s（デフォルト: COSMOS_DB_PROVISIONED_RU または 400）",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="既存ドキュメントとの差分を取らず全件を書き込む（デフォルトは変更分のみ）",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="前回中断した投入のチェックポイントを破棄して最初から投入する",
+    )
+    parser.add_argument(
+        "--password-cache",
+        action="store_true",
+        help="ローカルのパスワードハッシュキャッシュを使う（デフォルトは毎回計算）",
+    )
     args = parser.parse_args()
 
     print("=== Azure CosmosDB シードデータ投入開始 ===")
@@ -124,15 +214,10 @@ def main():
     print(f"  認証方式: Azure AD (DefaultAzureCredential)")
 
     try:
-        client = get_client(args.endpoint)
-
-        seed_tenant_data(client)
-        seed_user_data(client)
-        seed_role_data(client)
-        seed_service_data(client)
-
-        if args.include_sample:
-            seed_sample_data(client)
+        asyncio.run(seed(
+            args.endpoint, args.include_sample, args.provisioned_ru,
+            incremental=not args.full, restart=args.restart,
+            password_cache=args.password_cache))
 
         print("\n=== シードデータ投入完了 ===")
         print("\n初期ログイン情報:")
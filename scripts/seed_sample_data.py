@@ -7,24 +7,20 @@
 
 実行方法:
     python scripts/seed_sample_data.py
+    python scripts/seed_sample_data.py --profile 10k --seed 42
+    python scripts/seed_sample_data.py --profile 1m-users --low-cost-hash
 
 必要な環境変数:
     COSMOS_DB_ENDPOINT: CosmosDBのエンドポイント
     COSMOS_DB_KEY: CosmosDBのアクセスキー
 """
-from seed_data.sample_data import (
-    SAMPLE_TENANTS,
-    SAMPLE_USERS,
-    SAMPLE_TENANT_USERS,
-    SAMPLE_USER_ROLES,
-    SAMPLE_TENANT_SERVICES,
-    TEST_ACCOUNTS
-)
-from shared.cosmos_client import CosmosDBClient
+import argparse
+import asyncio
+import dataclasses
 import sys
 import os
-from typing import List, Dict, Any
 from pathlib import Path
+from typing import List
 
 # .envファイルを自動読み込み
 from dotenv import load_dotenv
@@ -42,119 +38,97 @@ if not os.getenv("COSMOS_DB_ENDPOINT"):
 # プロジェクトルートをパスに追加
 sys.path.append(str(project_root / 'src'))
 
+from shared.email_index import email_index_document
+from shared.throttle import RUBudgetController
+from seed_data.checkpoint import open_checkpoint
+from seed_data.engine import SeedEngine
+from seed_data.generator import DEFAULT_PASSWORD, PROFILES, DatasetGenerator
+from seed_data.password_hashing import PendingPasswordHash, async_hash_passwords, resolve_rounds
+from seed_data.scheduler import Stage, StageScheduler
+from seed_data.sample_data import SAMPLE_SEED, TEST_ACCOUNTS
+
 
 class SampleDataSeeder:
-    """サンプルデータ投入クラス"""
-
-    def __init__(self):
-        self.stats = {
-            "tenants": {"created": 0, "skipped": 0},
-            "users": {"created": 0, "skipped": 0},
-            "tenant_users": {"created": 0, "skipped": 0},
-            "user_roles": {"created": 0, "skipped": 0},
-            "tenant_services": {"created": 0, "skipped": 0},
-        }
-
-    def seed_tenant_data(self):
+    """サンプルデータ投入クラス
+
+    ドキュメントは DatasetGenerator から遅延生成し、エンジンへ順に渡す。
+    既定の "sample" プロファイル以外では1件ごとの表示を省略する。
+    """
+
+    def __init__(
+        self,
+        engine: SeedEngine,
+        generator: DatasetGenerator,
+        low_cost_hash: bool = False
+    ):
+        self.engine = engine
+        self.generator = generator
+        self.hash_rounds = resolve_rounds(low_cost=low_cost_hash)
+        self.verbose = generator.profile.name == "sample"
+
+    @property
+    def stats(self):
+        """カテゴリごとの投入結果（created / updated / unchanged / skipped / failed）"""
+        return self.engine.stats
+
+    async def seed_tenant_data(self):
         """テナントデータ投入"""
-        print("\n" + "=" * 60)
-        print("テナントデータ投入")
-        print("=" * 60)
-
-        client = CosmosDBClient(database_name="tenant_management")
-        container = client.get_container("tenants")
-
-        # サンプルテナント
-        for tenant in SAMPLE_TENANTS:
-            try:
-                container.create_item(tenant)
-                print(f"✓ テナント作成: {tenant['name']}")
-                self.stats["tenants"]["created"] += 1
-            except Exception as e:
-                if "Conflict" in str(e):
-                    print(f"⊘ スキップ: {tenant['name']} (既に存在)")
-                    self.stats["tenants"]["skipped"] += 1
-                else:
-                    print(f"✗ エラー: {tenant['name']} - {e}")
-
-        # テナント-ユーザー紐付け
-        print("\nテナント-ユーザー紐付け:")
-        for tenant_user in SAMPLE_TENANT_USERS:
-            try:
-                container.create_item(tenant_user)
-                print(
-                    f"✓ 紐付け作成: Tenant={tenant_user['tenantId'][:12]}..., User={tenant_user['userId'][:12]}...")
-                self.stats["tenant_users"]["created"] += 1
-            except Exception as e:
-                if "Conflict" in str(e):
-                    self.stats["tenant_users"]["skipped"] += 1
-                else:
-                    print(f"✗ エラー: {e}")
-
-    def seed_user_data(self):
+        await self.engine.write(
+            "tenants", "tenant_management", "tenants", self.generator.tenants(),
+            label=(lambda tenant: f"テナント作成: {tenant['name']}") if self.verbose else None)
+
+    async def hash_user_passwords(self):
+        """共通パスワードをハッシュ化（全ユーザーで同じハッシュを使う）"""
+        holder = {"passwordHash": PendingPasswordHash(DEFAULT_PASSWORD)}
+        result = await async_hash_passwords([holder], rounds=self.hash_rounds)
+        self.generator.password_hash = holder["passwordHash"]
+        print(f"✓ パスワードハッシュ生成 (コスト {self.hash_rounds}): "
+              f"{result['computed']} 件計算, {result['cached']} 件キャッシュ")
+
+    async def seed_user_data(self):
         """ユーザーデータ投入"""
-        print("\n" + "=" * 60)
-        print("ユーザーデータ投入")
-        print("=" * 60)
-
-        client = CosmosDBClient(database_name="auth_management")
-        container = client.get_container("users")
-
-        # サンプルユーザー
-        for user in SAMPLE_USERS:
-            try:
-                container.create_item(user)
-                print(f"✓ ユーザー作成: {user['userId']} ({user['name']})")
-                self.stats["users"]["created"] += 1
-            except Exception as e:
-                if "Conflict" in str(e):
-                    print(f"⊘ スキップ: {user['userId']} (既に存在)")
-                    self.stats["users"]["skipped"] += 1
-                else:
-                    print(f"✗ エラー: {user['userId']} - {e}")
-
-        # ユーザーロール割り当て
-        print("\nユーザーロール割り当て:")
-        role_count = 0
-        for user_role in SAMPLE_USER_ROLES:
-            try:
-                container.create_item(user_role)
-                role_count += 1
-                if role_count % 10 == 0:
-                    print(f"✓ {role_count}件のロール割り当て完了")
-                self.stats["user_roles"]["created"] += 1
-            except Exception as e:
-                if "Conflict" in str(e):
-                    self.stats["user_roles"]["skipped"] += 1
-                else:
-                    print(f"✗ エラー: {e}")
-
-        print(f"✓ 合計 {role_count}件のロール割り当て完了")
-
-    def seed_tenant_service_data(self):
+        await self.engine.write(
+            "users", "auth_management", "users", self.generator.users(),
+            label=(lambda user: f"ユーザー作成: {user['userId']} ({user['name']})")
+            if self.verbose else None)
+
+    async def seed_email_index_data(self):
+        """メールアドレスのインデックス投入"""
+        stats = await self.engine.write(
+            "email_index", "auth_management", "user_email_index",
+            (email_index_document(user) for user in self.generator.users()), mode="upsert")
+        print(f"✓ 合計 {stats.created}件のインデックス作成")
+
+    async def seed_tenant_user_data(self):
+        """テナント-ユーザー紐付け投入"""
+        stats = await self.engine.write(
+            "tenant_users", "tenant_management", "tenants", self.generator.tenant_users())
+        print(f"✓ 合計 {stats.created}件の紐付け作成")
+
+    async def seed_user_role_data(self):
+        """ユーザーロール割り当て投入"""
+        stats = await self.engine.write(
+            "user_roles", "auth_management", "users", self.generator.user_roles())
+        print(f"✓ 合計 {stats.created}件のロール割り当て完了")
+
+    async def seed_tenant_service_data(self):
         """テナント-サービス紐付けデータ投入"""
-        print("\n" + "=" * 60)
-        print("テナント-サービス紐付けデータ投入")
-        print("=" * 60)
-
-        client = CosmosDBClient(database_name="service_management")
-        container = client.get_container("tenant_services")
-
-        service_count = 0
-        for tenant_service in SAMPLE_TENANT_SERVICES:
-            try:
-                container.create_item(tenant_service)
-                service_count += 1
-                if service_count % 5 == 0:
-                    print(f"✓ {service_count}件のサービス割り当て完了")
-                self.stats["tenant_services"]["created"] += 1
-            except Exception as e:
-                if "Conflict" in str(e):
-                    self.stats["tenant_services"]["skipped"] += 1
-                else:
-                    print(f"✗ エラー: {e}")
-
-        print(f"✓ 合計 {service_count}件のサービス割り当て完了")
+        stats = await self.engine.write(
+            "tenant_services", "service_management", "tenant_services",
+            self.generator.tenant_services())
+        print(f"✓ 合計 {stats.created}件のサービス割り当て完了")
+
+    def build_stages(self) -> List[Stage]:
+        """シードステージと依存関係"""
+        return [
+            Stage("tenants", self.seed_tenant_data),
+            Stage("password_hash", self.hash_user_passwords, checkpointed=False),
+            Stage("users", self.seed_user_data, depends_on=("password_hash",)),
+            Stage("email_index", self.seed_email_index_data, depends_on=("users",)),
+            Stage("tenant_users", self.seed_tenant_user_data, depends_on=("tenants", "users")),
+            Stage("user_roles", self.seed_user_role_data, depends_on=("users",)),
+            Stage("tenant_services", self.seed_tenant_service_data, depends_on=("tenants",)),
+        ]
 
     def print_summary(self):
         """投入結果のサマリーを表示"""
@@ -162,16 +136,16 @@ class SampleDataSeeder:
         print("サンプルデータ投入完了")
         print("=" * 60)
 
-        print("\n投入結果:")
-        for category, counts in self.stats.items():
-            print(
-                f"  {category:20s}: {counts['created']} 件作成, {counts['skipped']} 件スキップ")
+        self.engine.print_summary()
 
         print("\n" + "=" * 60)
         print("テストアカウント一覧")
         print("=" * 60)
 
-        for idx, account in enumerate(TEST_ACCOUNTS, start=1):
+        if self.generator.profile.name != "sample" or self.generator.seed != SAMPLE_SEED:
+            print(f"\n  全ユーザー共通パスワード: {DEFAULT_PASSWORD}")
+        accounts = TEST_ACCOUNTS if self.verbose and self.generator.seed == SAMPLE_SEED else []
+        for idx, account in enumerate(accounts, start=1):
             print(f"\n【アカウント {idx}】")
             print(f"  テナント: {account['tenant']}")
             print(f"  メール  : {account['email']}")
@@ -189,8 +163,80 @@ class SampleDataSeeder:
         print("\n" + "=" * 60)
 
 
+async def seed(
+    generator: DatasetGenerator,
+    provisioned_ru=None,
+    low_cost_hash: bool = False,
+    incremental: bool = True,
+    restart: bool = False
+):
+    """依存関係に従ってサンプルデータを投入（incremental なら変更のあったドキュメントのみ）
+
+    中断した場合は同じプロファイル・シードで再実行すると、完了済みのステージと
+    各カテゴリの完了済みの件数を読み飛ばして続きから投入する。
+    """
+    profile = generator.profile
+    run_key = (f"sample:{os.getenv('COSMOS_DB_ENDPOINT')}:{profile.name}:{generator.seed}:"
+               f"{profile.users_per_tenant[0]}-{profile.users_per_tenant[1]}")
+    checkpoint = open_checkpoint("sample", run_key=run_key, restart=restart)
+    engine = SeedEngine(
+        controller=RUBudgetController(provisioned_ru), strict=True,
+        incremental=incremental, checkpoint=checkpoint)
+    async with engine:
+        seeder = SampleDataSeeder(engine, generator, low_cost_hash=low_cost_hash)
+        scheduler = StageScheduler(seeder.build_stages(), checkpoint=checkpoint)
+        try:
+            await scheduler.run()
+            checkpoint.clear()
+        finally:
+            checkpoint.save()
+            scheduler.print_report()
+            seeder.print_summary()
+
+
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description="デモンストレーション用サンプルデータを投入")
+    parser.add_argument(
+        "--provisioned-ru",
+        type=float,
+        default=None,
+        help="書き込みに使うRU/s（デフォルト: COSMOS_DB_PROVISIONED_RU または 400）",
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(PROFILES),
+        default="sample",
+        help="データセットの規模（デフォルト: sample = 10テナント・最大40ユーザー）",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=SAMPLE_SEED,
+        help=f"乱数シード（同じシード・プロファイルなら同じデータ、デフォルト: {SAMPLE_SEED}）",
+    )
+    parser.add_argument(
+        "--users-per-tenant",
+        default=None,
+        help="テナントあたりのユーザー数の範囲（例: 3-5、デフォルトはプロファイルの値）",
+    )
+    parser.add_argument(
+        "--low-cost-hash",
+        action="store_true",
+        help="パスワードハッシュのコストを下げる（非本番データ向け、SEED_BCRYPT_ROUNDS が優先）",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="既存ドキュメントとの差分を取らず全件を書き込む（デフォルトは変更分のみ）",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="前回中断した投入のチェックポイントを破棄して最初から投入する",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("サンプルデータ投入スクリプト")
     print("=" * 60)
@@ -208,15 +254,19 @@ def main():
         sys.exit(1)
 
     try:
-        seeder = SampleDataSeeder()
-
-        # データ投入
-        seeder.seed_tenant_data()
-        seeder.seed_user_data()
-        seeder.seed_tenant_service_data()
-
-        # サマリー表示
-        seeder.print_summary()
+        profile = PROFILES[args.profile]
+        if args.users_per_tenant:
+            low, _, high = args.users_per_tenant.partition("-")
+            profile = dataclasses.replace(
+                profile, users_per_tenant=(int(low), int(high or low)))
+        generator = DatasetGenerator(profile, seed=args.seed)
+        counts = generator.estimated_counts()
+        print(f"\nプロファイル: {profile.name} (シード {args.seed}, "
+              f"テナント {counts['tenants']:,} 件, ユーザー 約{int(counts['users']):,} 件)")
+
+        asyncio.run(seed(
+            generator, args.provisioned_ru, args.low_cost_hash,
+            incremental=not args.full, restart=args.restart))
 
         print("\n✓ すべてのサンプルデータ投入が完了しました！")
 
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Cosmos DB のスナップショットをエクスポート / インポートするスクリプト
+
+コンテナごとに gzip 圧縮した NDJSON（1行1ドキュメント）と manifest.json を出力し、
+別の環境へ復元する。負荷試験用の環境複製や障害の再現に使う。
+
+- エクスポートは継続トークンでページングしながら1ページずつ書き出す
+- インポートはファイルを一定件数ずつ読み込み、パーティションキーごとのバッチで並列に書き込む
+- どちらもメモリ使用量はページ / チャンク1つ分に収まる
+
+manifest.json は scripts/schema/cosmos_schema.json と同じ形式のため、インポート時に
+不足しているデータベース・コンテナを作成できる。
+スキーママニフェストで "excludeFromSnapshot": true としたコンテナ（変更フィードのリースなど、
+環境固有の状態を持つもの）はエクスポートしない。
+
+Usage:
+    python scripts/snapshot.py export --output snapshots/2025-01-01
+    python scripts/snapshot.py export --output snapshots/auth --database auth_management
+    python scripts/snapshot.py import --input snapshots/2025-01-01
+    python scripts/snapshot.py import --input snapshots/2025-01-01 --provisioned-ru 1000
+"""
+import argparse
+import gzip
+import json
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# .envファイルを自動読み込み
+from dotenv import load_dotenv
+
+# プロジェクトルート
+project_root = Path(__file__).resolve().parent.parent
+
+# .envファイルの読み込み
+if not os.getenv("COSMOS_DB_ENDPOINT"):
+    env_file = project_root / "src" / "auth-service" / ".env"
+    if env_file.exists():
+        load_dotenv(env_file)
+        print(f"📝 環境変数を読み込みました: {env_file}")
+
+# プロジェクトルートをパスに追加
+sys.path.append(str(project_root / 'src'))
+
+from shared.bulk import bulk_write
+from shared.cosmos_client import CosmosDBClient
+from shared.pagination import stream_query
+from shared.partition_key import get_partition_key_paths
+from shared.provisioning import load_manifest, partition_key_paths, provision
+from shared.throttle import RUBudgetController
+
+# スキーママニフェスト（エクスポート対象のデータベース・コンテナ定義）
+DEFAULT_MANIFEST = project_root / "scripts" / "schema" / "cosmos_schema.json"
+SNAPSHOT_MANIFEST = "manifest.json"
+SNAPSHOT_VERSION = 1
+# スナップショットの対象外とするコンテナに付けるマニフェストの項目
+EXCLUDE_FIELD = "excludeFromSnapshot"
+# 書き込み時にサービスが付与するため保存しないシステムプロパティ
+SYSTEM_PROPERTIES = ("_rid", "_self", "_etag", "_attachments", "_ts", "_lsn")
+EXPORT_PAGE_SIZE = 1000
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def snapshot_file(database: str, container: str) -> str:
+    """manifest.json からの相対パス"""
+    return f"{database}/{container}.ndjson.gz"
+
+
+def iter_targets(manifest: Dict[str, Any], databases: Optional[List[str]] = None):
+    """マニフェストの (データベース, コンテナ定義) を列挙（databases 指定時は絞り込む）
+
+    excludeFromSnapshot が true のコンテナは対象外。
+    """
+    for database in manifest["databases"]:
+        if databases and database["id"] not in databases:
+            continue
+        for container in database.get("containers", []):
+            if container.get(EXCLUDE_FIELD):
+                continue
+            yield database["id"], container
+
+
+def export_container(client, output: Path, database: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    """1コンテナを gzip 圧縮の NDJSON に書き出し、manifest.json 用のコンテナ定義を返す"""
+    container_name = spec["id"]
+    container = client.get_database_client(database).get_container_client(container_name)
+    paths = get_partition_key_paths(container)
+    relative = snapshot_file(database, container_name)
+    target = output / relative
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target.with_suffix(target.suffix + ".tmp")
+
+    started_at = time.monotonic()
+    count = 0
+    with gzip.open(temp_path, "wt", encoding="utf-8") as stream:
+        for document in stream_query(container, "SELECT * FROM c", page_size=EXPORT_PAGE_SIZE):
+            for name in SYSTEM_PROPERTIES:
+                document.pop(name, None)
+            stream.write(json.dumps(document, ensure_ascii=False, separators=(",", ":")))
+            stream.write("\n")
+            count += 1
+    os.replace(temp_path, target)
+
+    elapsed = time.monotonic() - started_at
+    print(f"✓ {database}/{container_name}: {count} 件 ({elapsed:.2f} 秒)")
+    # パーティションキーはマニフェストではなく実環境の値を記録する
+    return {
+        **spec,
+        "partitionKey": paths[0] if len(paths) == 1 else paths,
+        "snapshot": {"file": relative, "count": count},
+    }
+
+
+def export_snapshot(
+    client,
+    manifest: Dict[str, Any],
+    output: Path,
+    databases: Optional[List[str]] = None,
+    max_workers: int = 4
+) -> Dict[str, Any]:
+    """マニフェストのコンテナをすべて書き出し、manifest.json を作成"""
+    output.mkdir(parents=True, exist_ok=True)
+    targets = list(iter_targets(manifest, databases))
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as executor:
+        futures = [
+            (database, executor.submit(export_container, client, output, database, spec))
+            for database, spec in targets
+        ]
+        exported: Dict[str, List[Dict[str, Any]]] = {}
+        for database, future in futures:
+            exported.setdefault(database, []).append(future.result())
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "createdAt": datetime.utcnow().isoformat() + "Z",
+        "databases": [
+            {"id": database, "containers": containers}
+            for database, containers in exported.items()
+        ],
+    }
+    (output / SNAPSHOT_MANIFEST).write_text(
+        json.dumps(snapshot, ensure_ascii=False, indent=2), encoding="utf-8")
+    return snapshot
+
+
+def read_documents(path: Path) -> Iterator[Dict[str, Any]]:
+    """gzip 圧縮の NDJSON から1件ずつ読み込む"""
+    with gzip.open(path, "rt", encoding="utf-8") as stream:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def import_container(
+    client,
+    input_dir: Path,
+    database: str,
+    spec: Dict[str, Any],
+    mode: str,
+    chunk_size: int,
+    max_workers: int,
+    controller: RUBudgetController
+) -> Dict[str, int]:
+    """1コンテナ分のファイルをチャンクごとに一括書き込み"""
+    container = client.get_database_client(database).get_container_client(spec["id"])
+    paths = partition_key_paths(spec["partitionKey"])
+    documents = read_documents(input_dir / spec["snapshot"]["file"])
+
+    counts = {"written": 0, "skipped": 0, "failed": 0}
+    started_at = time.monotonic()
+    while True:
+        chunk = list(islice(documents, chunk_size))
+        if not chunk:
+            break
+        results = bulk_write(container, chunk, mode=mode, max_workers=max_workers,
+                             partition_key_paths=paths, controller=controller)
+        for result in results:
+            if result.success:
+                counts["written"] += 1
+            elif result.conflict and mode == "create":
+                counts["skipped"] += 1
+            else:
+                counts["failed"] += 1
+                print(f"✗ {database}/{spec['id']}: {result.id} - "
+                      f"{result.status_code} {result.error or ''}".rstrip())
+
+    elapsed = time.monotonic() - started_at
+    expected = spec["snapshot"]["count"]
+    total = sum(counts.values())
+    mark = "✓" if counts["failed"] == 0 and total == expected else "⚠"
+    print(f"{mark} {database}/{spec['id']}: {counts['written']} 件書き込み, "
+          f"{counts['skipped']} 件スキップ, {counts['failed']} 件失敗 "
+          f"(スナップショット {expected} 件, {elapsed:.2f} 秒)")
+    return counts
+
+
+def import_snapshot(
+    client,
+    input_dir: Path,
+    mode: str = "upsert",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: int = 8,
+    container_workers: int = 3,
+    controller: Optional[RUBudgetController] = None,
+    create_missing: bool = True
+) -> Dict[str, int]:
+    """manifest.json に従って全コンテナを復元し、合計件数を返す"""
+    snapshot = load_manifest(input_dir / SNAPSHOT_MANIFEST)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"unsupported snapshot version: {snapshot.get('version')}")
+    if create_missing:
+        for action in provision(client, snapshot):
+            if action.kind in ("create_database", "create_container"):
+                print(f"+ {action.label}")
+            elif action.kind == "update_indexing_policy":
+                print(f"~ {action.label} indexing policy: {action.detail}")
+            else:
+                print(f"⚠ {action.label}: {action.detail}")
+
+    controller = controller or RUBudgetController()
+    targets = list(iter_targets(snapshot))
+    totals = {"written": 0, "skipped": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max(1, min(container_workers, len(targets)))) as executor:
+        futures = [
+            executor.submit(import_container, client, input_dir, database, spec,
+                            mode, chunk_size, max_workers, controller)
+            for database, spec in targets
+        ]
+        for future in futures:
+            for key, value in future.result().items():
+                totals[key] += value
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cosmos DB のスナップショットをエクスポート / インポート")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="全コンテナを NDJSON に書き出す")
+    export_parser.add_argument("--output", required=True, help="出力ディレクトリ")
+    export_parser.add_argument(
+        "--manifest",
+        default=str(DEFAULT_MANIFEST),
+        help=f"対象のスキーママニフェスト (デフォルト: {DEFAULT_MANIFEST.relative_to(project_root)})",
+    )
+    export_parser.add_argument(
+        "--database",
+        action="append",
+        help="対象のデータベース（複数指定可、デフォルト: マニフェストのすべて）",
+    )
+    export_parser.add_argument(
+        "--workers", type=int, default=4, help="並列に書き出すコンテナ数（デフォルト: 4）")
+
+    import_parser = subparsers.add_parser("import", help="スナップショットから復元する")
+    import_parser.add_argument("--input", required=True, help="スナップショットのディレクトリ")
+    import_parser.add_argument(
+        "--mode",
+        choices=("upsert", "create"),
+        default="upsert",
+        help="upsert: 上書き（デフォルト）, create: 既存ドキュメントはスキップ",
+    )
+    import_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"一度に読み込む件数（デフォルト: {DEFAULT_CHUNK_SIZE}）",
+    )
+    import_parser.add_argument(
+        "--workers", type=int, default=8, help="コンテナあたりの並列バッチ数（デフォルト: 8）")
+    import_parser.add_argument(
+        "--container-workers",
+        type=int,
+        default=3,
+        help="並列に復元するコンテナ数（デフォルト: 3）",
+    )
+    import_parser.add_argument(
+        "--provisioned-ru",
+        type=float,
+        default=None,
+        help="書き込みに使うRU/s（デフォルト: COSMOS_DB_PROVISIONED_RU または 400）",
+    )
+    import_parser.add_argument(
+        "--no-create",
+        action="store_true",
+        help="不足しているデータベース・コンテナを作成しない",
+    )
+    args = parser.parse_args()
+
+    try:
+        client = CosmosDBClient().client
+        started_at = time.monotonic()
+        if args.command == "export":
+            print(f"=== スナップショットのエクスポート開始: {args.output} ===\n")
+            snapshot = export_snapshot(
+                client, load_manifest(args.manifest), Path(args.output),
+                databases=args.database, max_workers=args.workers)
+            total = sum(
+                container["snapshot"]["count"]
+                for database in snapshot["databases"] for container in database["containers"])
+            print(f"\n=== エクスポート完了: {total} 件 "
+                  f"({time.monotonic() - started_at:.2f} 秒) ===")
+        else:
+            print(f"=== スナップショットのインポート開始: {args.input} ===\n")
+            controller = RUBudgetController(args.provisioned_ru)
+            totals = import_snapshot(
+                client, Path(args.input), mode=args.mode, chunk_size=args.chunk_size,
+                max_workers=args.workers, container_workers=args.container_workers,
+                controller=controller, create_missing=not args.no_create)
+            stats = controller.stats
+            print(f"\n=== インポート完了: {totals['written']} 件書き込み, "
+                  f"{totals['skipped']} 件スキップ, {totals['failed']} 件失敗 "
+                  f"({time.monotonic() - started_at:.2f} 秒) ===")
+            print(f"  消費RU: {stats['request_charge']} "
+                  f"({stats['ru_per_second']} RU/秒, 429: {stats['throttled']} 回)")
+            if totals["failed"]:
+                sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ エラー: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
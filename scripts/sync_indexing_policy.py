@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Cosmos DB コンテナのインデックスポリシーを同期するスクリプト
+
+scripts/schema/cosmos_schema.json の indexingPolicy と実環境のポリシーを比較し、
+差分があるコンテナのポリシーを置き換えます。インデックス変換はサービス側で
+オンラインに実行されるため、--wait で完了まで進捗を表示できます。
+
+Usage:
+    python scripts/sync_indexing_policy.py --dry-run
+    python scripts/sync_indexing_policy.py
+    python scripts/sync_indexing_policy.py --wait
+"""
+import argparse
+import sys
+import os
+import time
+from pathlib import Path
+
+# .envファイルを自動読み込み
+from dotenv import load_dotenv
+
+# プロジェクトルート
+project_root = Path(__file__).resolve().parent.parent
+
+if not os.getenv("COSMOS_DB_ENDPOINT"):
+    env_file = project_root / "src" / "auth-service" / ".env"
+    if env_file.exists():
+        load_dotenv(env_file)
+        print(f"📝 環境変数を読み込みました: {env_file}")
+
+# プロジェクトルートをパスに追加
+sys.path.append(str(project_root / 'src'))
+
+from shared.cosmos_client import CosmosDBClient
+from shared.indexing import index_transformation_progress
+from shared.provisioning import apply, load_manifest, plan
+
+DEFAULT_MANIFEST = project_root / "scripts" / "schema" / "cosmos_schema.json"
+
+
+def wait_for_transformations(client, actions, interval: float = 5.0):
+    """インデックス変換が100%になるまで進捗を表示"""
+    pending = {action.label: action for action in actions}
+    while pending:
+        for label, action in list(pending.items()):
+            container = client.get_database_client(action.database) \
+                .get_container_client(action.container)
+            progress = index_transformation_progress(container)
+            if progress is None or progress >= 100:
+                print(f"✓ {label}: インデックス変換完了")
+                del pending[label]
+            else:
+                print(f"⏳ {label}: インデックス変換中 {progress}%")
+        if pending:
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="インデックスポリシーをマニフェストに同期")
+    parser.add_argument(
+        "--manifest",
+        default=str(DEFAULT_MANIFEST),
+        help=f"スキーママニフェスト (デフォルト: {DEFAULT_MANIFEST.relative_to(project_root)})",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="差分の表示のみ行う")
+    parser.add_argument("--wait", action="store_true", help="インデックス変換の完了を待つ")
+    args = parser.parse_args()
+
+    print("=== インデックスポリシー同期開始 ===\n")
+
+    try:
+        manifest = load_manifest(args.manifest)
+        client = CosmosDBClient().client
+        actions = [
+            action for action in plan(client, manifest)
+            if action.kind == "update_indexing_policy"
+        ]
+        if not actions:
+            print("✓ すべてのインデックスポリシーはマニフェストと一致しています")
+            return
+
+        for action in actions:
+            print(f"~ {action.label}")
+            for change in action.detail.split("; "):
+                print(f"    {change}")
+
+        if args.dry_run:
+            print("\n=== ドライラン完了（変更なし） ===")
+            return
+
+        for label, outcome in apply(client, actions).items():
+            print(f"✓ {label}: {outcome}")
+        if args.wait:
+            wait_for_transformations(client, actions)
+        print("\n=== インデックスポリシー同期完了 ===")
+    except Exception as e:
+        print(f"✗ エラー: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,6 @@ Cosmos DB Emulator接続テストスクリプト
 
 import os
 import sys
-import time
 import urllib3
 from pathlib import Path
 from azure.cosmos import CosmosClient, exceptions
@@ -23,6 +22,11 @@ if not os.getenv("COSMOS_DB_ENDPOINT"):
     if env_file.exists():
         load_dotenv(env_file)
 
+# プロジェクトルートをパスに追加
+sys.path.append(str(project_root / 'src'))
+
+from shared import readiness
+
 # SSL警告を無効化（エミュレーター使用時のみ）
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -39,41 +43,29 @@ def test_connection():
     print("=" * 60)
     print()
 
-    # ステップ1: クライアント作成（リトライロジック付き）
+    # ステップ1: クライアント作成（期限付きレディネスプローブ）
     print("1. Cosmos DBクライアントを作成中...")
-    max_retries = 12
-    retry_delay = 10
-    client = None
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            client = CosmosClient(
-                ENDPOINT, KEY,
-                connection_verify=False,
-                connection_mode="Gateway",
-                enable_endpoint_discovery=False
-            )
-            # 接続確認のために軽い操作を実行
-            list(client.list_databases())
-            print("   ✓ クライアント作成成功")
-            break
-        except Exception as e:
-            error_msg = str(e)
-            if "still starting" in error_msg or "ServiceUnavailable" in error_msg:
-                if attempt < max_retries:
-                    print(f"   ⏳ エミュレーター起動中... (試行 {attempt}/{max_retries})")
-                    print(f"      {retry_delay}秒待機してから再試行します...")
-                    time.sleep(retry_delay)
-                else:
-                    print(f"   ✗ クライアント作成失敗: エミュレーターが起動しませんでした")
-                    print(f"      エラー: {e}")
-                    return False
-            else:
-                print(f"   ✗ クライアント作成失敗: {e}")
-                return False
-
-    if client is None:
-        print("   ✗ クライアント作成失敗: 予期しないエラー")
+
+    def create_client():
+        client = CosmosClient(
+            ENDPOINT, KEY,
+            connection_verify=False,
+            connection_mode="Gateway",
+            enable_endpoint_discovery=False
+        )
+        # 接続確認のために軽い操作を実行
+        list(client.list_databases())
+        return client
+
+    try:
+        client = readiness.wait_until_ready(ENDPOINT, create_client)
+        print("   ✓ クライアント作成成功")
+    except readiness.CosmosNotReadyError as e:
+        print(f"   ✗ クライアント作成失敗: エミュレーターが起動しませんでした")
+        print(f"      エラー: {e.last_error}")
+        return False
+    except Exception as e:
+        print(f"   ✗ クライアント作成失敗: {e}")
         return False
 
     # ステップ2: データベース操作
@@ -0,0 +1,223 @@
+"""ユーザーごとの実効アクセス権ビュー
+
+「ユーザーXがテナントYで持つロールと権限」を求めるには、users（user / user_role）・roles・
+tenants（tenant_user）・tenant_services を横断して読む必要がある。これを変更フィードで
+1ユーザー1ドキュメントの effective_access ビューに非正規化しておき、認可のホットパスを
+ポイントリード1回（read_effective_access）にする。
+
+- 変更があったユーザーだけを元データから組み立て直す（冪等なので再配信されてもよい）
+- ロール定義・テナントのサービス割り当ての変更は、影響するユーザーをまとめて組み立て直す
+- 削除は変更フィードに現れないため、割り当ての取り消しは論理削除（isDeleted: true）で行うか、
+  削除後に refresh_user() を呼ぶ。rebuild_all() で全ユーザーを組み立て直せる
+
+使用例:
+    builder = AccessViewBuilder(users, roles, tenants, tenant_services, view)
+    processors = builder.processors(leases)
+    for processor in processors:
+        processor.start()
+"""
+from azure.cosmos.exceptions import CosmosResourceNotFoundError
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+import threading
+import zlib
+
+from .change_feed_processor import ChangeFeedProcessor
+from .pagination import stream_query
+
+VIEW_TYPE = "effective_access"
+# 論理削除されていないドキュメントだけを対象にする条件
+_NOT_DELETED = "(NOT IS_DEFINED(c.isDeleted) OR c.isDeleted = false)"
+# 同じユーザーの組み立てを直列化するロックの数
+_LOCK_STRIPES = 64
+
+
+def read_effective_access(view_container, user_id: str) -> Optional[Dict[str, Any]]:
+    """ユーザーの実効アクセス権をポイントリードで取得（ビューがなければ None）"""
+    try:
+        return view_container.read_item(item=user_id, partition_key=user_id)
+    except CosmosResourceNotFoundError:
+        return None
+
+
+def _service_id(assignment: Dict[str, Any]) -> Optional[str]:
+    return assignment.get("serviceId") or assignment.get("service_id")
+
+
+class AccessViewBuilder:
+    """元データから effective_access ビューを組み立てて書き込む"""
+
+    def __init__(self, users, roles, tenants, tenant_services, view):
+        self.users = users
+        self.roles = roles
+        self.tenants = tenants
+        self.tenant_services = tenant_services
+        self.view = view
+        self._roles: Optional[Dict[str, Dict[str, Any]]] = None
+        self._roles_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+    # ------------------------------------------------------------------
+    # 元データの読み取り
+    # ------------------------------------------------------------------
+
+    def role_definitions(self, reload: bool = False) -> Dict[str, Dict[str, Any]]:
+        """ロール定義（件数が少ないため全件をメモリに保持する）"""
+        with self._roles_lock:
+            if self._roles is None or reload:
+                self._roles = {
+                    role["id"]: role for role in stream_query(
+                        self.roles, f"SELECT * FROM c WHERE c.type = 'role' AND {_NOT_DELETED}")
+                }
+            return self._roles
+
+    def _user_roles(self, user_id: str) -> List[Dict[str, Any]]:
+        return list(stream_query(
+            self.users,
+            f"SELECT * FROM c WHERE c.type = 'user_role' AND c.userId = @userId AND {_NOT_DELETED}",
+            parameters=[{"name": "@userId", "value": user_id}]))
+
+    def _tenant_ids(self, user: Dict[str, Any]) -> List[str]:
+        tenant_ids = {user["tenantId"]} if user.get("tenantId") else set()
+        tenant_ids.update(relation["tenantId"] for relation in stream_query(
+            self.tenants,
+            f"SELECT c.tenantId FROM c WHERE c.type = 'tenant_user' AND c.userId = @userId "
+            f"AND {_NOT_DELETED}",
+            parameters=[{"name": "@userId", "value": user["id"]}]))
+        return sorted(tenant_ids)
+
+    def _tenant_service_ids(self, tenant_id: str) -> List[str]:
+        assignments = stream_query(
+            self.tenant_services, f"SELECT * FROM c WHERE {_NOT_DELETED}",
+            partition_key=tenant_id)
+        return sorted({_service_id(a) for a in assignments if _service_id(a)})
+
+    # ------------------------------------------------------------------
+    # ビューの組み立て
+    # ------------------------------------------------------------------
+
+    def build(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """ユーザーの実効アクセス権ドキュメントを組み立てる（ユーザーがいなければ None）"""
+        try:
+            user = self.users.read_item(item=user_id, partition_key=user_id)
+        except CosmosResourceNotFoundError:
+            return None
+        if user.get("isDeleted"):
+            return None
+
+        definitions = self.role_definitions()
+        assignments = self._user_roles(user_id)
+        roles = []
+        permissions: Dict[str, Set[str]] = {}
+        for assignment in assignments:
+            role = definitions.get(assignment.get("roleId"))
+            if role is None:
+                continue
+            roles.append({
+                "roleId": role["id"],
+                "roleCode": role.get("roleCode"),
+                "roleName": role.get("roleName"),
+                "serviceId": role.get("serviceId"),
+            })
+            permissions.setdefault(role.get("serviceId"), set()).update(
+                role.get("permissions", []))
+
+        timestamps = [user.get("_ts", 0)] + [a.get("_ts", 0) for a in assignments]
+        return {
+            "id": user_id,
+            "type": VIEW_TYPE,
+            "userId": user.get("userId"),
+            "name": user.get("name"),
+            "isActive": user.get("isActive", True),
+            "tenants": [
+                {"tenantId": tenant_id, "services": self._tenant_service_ids(tenant_id)}
+                for tenant_id in self._tenant_ids(user)
+            ],
+            "roles": sorted(roles, key=lambda role: role["roleId"]),
+            "permissions": {
+                service_id: sorted(values) for service_id, values in sorted(permissions.items())
+            },
+            "sourceTimestamp": max(timestamps),
+            "builtAt": datetime.utcnow().isoformat() + "Z",
+            "partitionKey": user_id,
+        }
+
+    def refresh_user(self, user_id: str) -> str:
+        """1ユーザー分のビューを組み立て直す（戻り値は "upserted" / "deleted"）"""
+        lock = self._locks[zlib.crc32(user_id.encode("utf-8")) % _LOCK_STRIPES]
+        with lock:
+            document = self.build(user_id)
+            if document is None:
+                try:
+                    self.view.delete_item(item=user_id, partition_key=user_id)
+                except CosmosResourceNotFoundError:
+                    pass
+                return "deleted"
+            self.view.upsert_item(document)
+            return "upserted"
+
+    def refresh_users(self, user_ids: Iterable[str]) -> int:
+        """重複を除いて組み立て直し、件数を返す"""
+        unique = sorted({user_id for user_id in user_ids if user_id})
+        for user_id in unique:
+            self.refresh_user(user_id)
+        return len(unique)
+
+    def rebuild_all(self) -> int:
+        """全ユーザーのビューを組み立て直す（削除の取りこぼしを補正する定期実行用）"""
+        return self.refresh_users(
+            user_id for user_id in stream_query(
+                self.users, "SELECT VALUE c.id FROM c WHERE c.type = 'user'", page_size=1000))
+
+    # ------------------------------------------------------------------
+    # 変更フィードのハンドラー
+    # ------------------------------------------------------------------
+
+    def handle_user_changes(self, items: List[Dict[str, Any]]):
+        """users コンテナの変更（user / user_role）"""
+        self.refresh_users(
+            item["id"] if item.get("type") == "user" else item.get("userId") for item in items)
+
+    def handle_role_changes(self, items: List[Dict[str, Any]]):
+        """roles コンテナの変更（ロールを持つ全ユーザーが対象）"""
+        self.role_definitions(reload=True)
+        for role_id in {item["id"] for item in items}:
+            self.refresh_users(stream_query(
+                self.users,
+                "SELECT VALUE c.userId FROM c WHERE c.type = 'user_role' AND c.roleId = @roleId",
+                parameters=[{"name": "@roleId", "value": role_id}], page_size=1000))
+
+    def handle_tenant_changes(self, items: List[Dict[str, Any]]):
+        """tenants コンテナの変更（tenant_user）"""
+        self.refresh_users(item.get("userId") for item in items)
+
+    def handle_tenant_service_changes(self, items: List[Dict[str, Any]]):
+        """tenant_services コンテナの変更（テナントに所属する全ユーザーが対象）"""
+        for tenant_id in {item.get("tenantId") for item in items if item.get("tenantId")}:
+            parameters = [{"name": "@tenantId", "value": tenant_id}]
+            members = list(stream_query(
+                self.tenants,
+                "SELECT VALUE c.userId FROM c WHERE c.type = 'tenant_user' "
+                "AND c.tenantId = @tenantId",
+                parameters=parameters, page_size=1000))
+            members += list(stream_query(
+                self.users,
+                "SELECT VALUE c.id FROM c WHERE c.type = 'user' AND c.tenantId = @tenantId",
+                parameters=parameters, page_size=1000))
+            self.refresh_users(members)
+
+    def processors(self, lease_container, **options: Any) -> List[ChangeFeedProcessor]:
+        """4つの元コンテナを監視するプロセッサーを生成（options はプロセッサーの引数）"""
+        wiring = [
+            ("access-view.users", self.users, self.handle_user_changes, ("user", "user_role")),
+            ("access-view.roles", self.roles, self.handle_role_changes, ("role",)),
+            ("access-view.tenants", self.tenants, self.handle_tenant_changes, ("tenant_user",)),
+            ("access-view.tenant_services", self.tenant_services,
+             self.handle_tenant_service_changes, None),
+        ]
+        processors = []
+        for name, container, handler, doc_types in wiring:
+            processor = ChangeFeedProcessor(name, container, lease_container, **options)
+            processor.register(handler, doc_types=doc_types)
+            processors.append(processor)
+        return processors
@@ -0,0 +1,184 @@
+"""Cosmos DB非同期接続クライアント（azure.cosmos.aio）"""
+from azure.cosmos.aio import CosmosClient
+from azure.cosmos.exceptions import CosmosResourceExistsError
+from . import readiness
+from .partition_key import build_partition_key
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Union
+import os
+import urllib3
+
+# SSL警告を無効化（エミュレーター使用時のみ）
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+class AsyncCosmosDBClient:
+    """Cosmos DB 非同期接続クライアント
+
+    CosmosDBClient と同じ操作を async/await で提供する。
+    イベントループをブロックしないため、1ワーカーで多数のリクエストを並行処理できる。
+
+    使用例:
+        async with AsyncCosmosDBClient(database_name="tenant_management") as db:
+            async for tenant in db.query_items("tenants", "SELECT * FROM c"):
+                ...
+    """
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        key: Optional[str] = None,
+        database_name: Optional[str] = None,
+        client: Optional[CosmosClient] = None,
+        credential: Optional[Any] = None
+    ):
+        self.endpoint = endpoint or os.getenv("COSMOS_DB_ENDPOINT")
+        # credential（トークン資格情報）を渡された場合は環境変数のキーにフォールバックしない
+        self.key = key or (None if credential is not None else os.getenv("COSMOS_DB_KEY"))
+        # 呼び出し側が渡した資格情報（close() しない）
+        self._external_credential = credential
+        self.database_name = database_name or os.getenv("COSMOS_DB_DATABASE")
+
+        # 既存の非同期クライアントを渡された場合は共有し、close() しない
+        self.client = client
+        self._owns_client = client is None
+        self._credential = None
+        self.database = None
+
+    async def __aenter__(self) -> "AsyncCosmosDBClient":
+        try:
+            await self.connect()
+        except BaseException:
+            # 作成した DefaultAzureCredential（aiohttp セッション）を閉じてから送出する
+            await self.close()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def connect(self):
+        """接続確立（起動中のエミュレーターに対しては期限付きで再試行する）"""
+        if self.client is not None:
+            return
+
+        # SSL検証を開発環境では無効化（Emulator用）
+        connection_verify = os.getenv(
+            "COSMOS_DB_CONNECTION_VERIFY", "true").lower() == "true"
+
+        # 資格情報を渡されていればそれを使い、キーが設定されていればキー認証、
+        # どちらもなければAzure AD認証（マネージドID）
+        if self._external_credential is not None:
+            credential = self._external_credential
+        elif self.key:
+            credential = self.key
+        else:
+            from azure.identity.aio import DefaultAzureCredential
+            self._credential = DefaultAzureCredential()
+            credential = self._credential
+
+        client = CosmosClient(
+            self.endpoint,
+            credential,
+            connection_verify=connection_verify,
+            connection_mode="Gateway",
+            enable_endpoint_discovery=False,
+        )
+
+        async def probe():
+            # 接続確認のために軽い操作を実行
+            async for _ in client.list_databases():
+                pass
+
+        try:
+            if not readiness.is_ready(self.endpoint):
+                await readiness.async_wait_until_ready(self.endpoint, probe)
+        except Exception:
+            await client.close()
+            if self._credential is not None:
+                await self._credential.close()
+                self._credential = None
+            raise
+        self.client = client
+
+    async def close(self):
+        """接続を閉じる"""
+        if self.client is not None and self._owns_client:
+            await self.client.close()
+            self.client = None
+        if self._credential is not None:
+            await self._credential.close()
+            self._credential = None
+        self.database = None
+
+    async def create_database(self):
+        """データベース作成"""
+        await self.connect()
+        try:
+            self.database = await self.client.create_database(self.database_name)
+            print(f"✓ Database '{self.database_name}' created")
+        except CosmosResourceExistsError:
+            self.database = self.client.get_database_client(self.database_name)
+            print(f"✓ Database '{self.database_name}' already exists")
+
+    async def create_container(
+        self,
+        container_name: str,
+        partition_key_path: Union[str, Sequence[str]],
+        indexing_policy: Optional[Dict[str, Any]] = None
+    ):
+        """コンテナ作成
+
+        partition_key_path にパスのリスト（例: ["/tenantId", "/userId"]）を指定すると
+        階層パーティションキーとなる。
+        indexing_policy を省略した場合は既定ポリシー（全パスをインデックス）。
+        ポリシーの組み立ては shared.indexing.build_indexing_policy を参照。
+        """
+        options: Dict[str, Any] = {}
+        if indexing_policy is not None:
+            options["indexing_policy"] = indexing_policy
+        try:
+            container = await self.database.create_container(
+                id=container_name,
+                partition_key=build_partition_key(partition_key_path),
+                **options
+            )
+            print(f"✓ Container '{container_name}' created")
+            return container
+        except CosmosResourceExistsError:
+            print(f"✓ Container '{container_name}' already exists")
+            return self.database.get_container_client(container_name)
+
+    def get_container(self, container_name: str):
+        """コンテナ取得"""
+        if self.client is None:
+            raise RuntimeError(
+                "AsyncCosmosDBClient is not connected; use 'async with' or await connect()")
+        if self.database is None:
+            self.database = self.client.get_database_client(self.database_name)
+        return self.database.get_container_client(container_name)
+
+    async def query_items(
+        self,
+        container_name: str,
+        query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        partition_key: Optional[Any] = None,
+        max_item_count: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """クエリ結果を非同期イテレーション
+
+        partition_key を省略した場合はクロスパーティションクエリとなる。
+        階層パーティションキーのコンテナでは先頭からの一部の値（例: [tenantId]）を指定でき、
+        そのプレフィックスに属するパーティションのみを対象とする。
+        """
+        container = self.get_container(container_name)
+        kwargs: Dict[str, Any] = {}
+        if parameters:
+            kwargs["parameters"] = parameters
+        if partition_key is not None:
+            kwargs["partition_key"] = partition_key
+        if max_item_count is not None:
+            kwargs["max_item_count"] = max_item_count
+
+        async for item in container.query_items(query=query, **kwargs):
+            yield item
@@ -0,0 +1,194 @@
+"""パーティションキー単位のトランザクショナルバッチによる一括書き込み"""
+from azure.cosmos.exceptions import CosmosBatchOperationError, CosmosHttpResponseError
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+import json
+
+from .partition_key import get_partition_key_paths, group_by_partition_key
+from .throttle import RUBudgetController
+
+# トランザクショナルバッチのサービス上限
+MAX_BATCH_OPERATIONS = 100
+MAX_BATCH_BYTES = 2 * 1024 * 1024
+# リクエストヘッダー等のオーバーヘッド分を差し引いたペイロード上限
+_BATCH_PAYLOAD_BUDGET = MAX_BATCH_BYTES - 64 * 1024
+
+WRITE_MODES = ("create", "upsert")
+
+
+@dataclass
+class BulkItemResult:
+    """一括書き込みの1件ごとの結果"""
+    id: Optional[str]
+    partition_key: Any
+    status_code: int
+    request_charge: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return 200 <= self.status_code < 300
+
+    @property
+    def conflict(self) -> bool:
+        return self.status_code == 409
+
+
+def _item_size(item: Mapping[str, Any]) -> int:
+    return len(json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _chunk_group(
+    items: Sequence[Mapping[str, Any]],
+    indexes: List[int]
+) -> Iterable[List[int]]:
+    """1パーティションキー分のインデックスを操作数・サイズ上限で分割"""
+    chunk: List[int] = []
+    chunk_bytes = 0
+    for idx in indexes:
+        size = _item_size(items[idx])
+        if chunk and (len(chunk) >= MAX_BATCH_OPERATIONS
+                      or chunk_bytes + size > _BATCH_PAYLOAD_BUDGET):
+            yield chunk
+            chunk, chunk_bytes = [], 0
+        chunk.append(idx)
+        chunk_bytes += size
+    if chunk:
+        yield chunk
+
+
+def _sdk_partition_key(group_key: Any) -> Any:
+    return list(group_key) if isinstance(group_key, tuple) else group_key
+
+
+def _request_charge(headers: Optional[Mapping[str, str]]) -> float:
+    try:
+        return float((headers or {}).get("x-ms-request-charge", 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _invoke(
+    controller: Optional[RUBudgetController],
+    kind: str,
+    units: int,
+    fn,
+    *args,
+    **kwargs
+):
+    """controller 指定時は流量制御下で実行"""
+    if controller is None:
+        return fn(*args, **kwargs)
+    return controller.run(fn, *args, kind=kind, units=units, **kwargs)
+
+
+def _write_single(
+    container,
+    item: Mapping[str, Any],
+    mode: str,
+    partition_key: Any,
+    controller: Optional[RUBudgetController] = None
+) -> BulkItemResult:
+    captured: Dict[str, Any] = {}
+
+    def hook(headers, result):
+        captured["headers"] = headers
+
+    write = container.create_item if mode == "create" else container.upsert_item
+    try:
+        _invoke(controller, mode, 1, write, item, response_hook=hook)
+    except CosmosHttpResponseError as e:
+        return BulkItemResult(item.get("id"), partition_key, e.status_code or 500,
+                              _request_charge(e.headers), e.message)
+    status_code = 201 if mode == "create" else 200
+    return BulkItemResult(item.get("id"), partition_key, status_code,
+                          _request_charge(captured.get("headers")))
+
+
+def _write_chunk(
+    container,
+    items: Sequence[Mapping[str, Any]],
+    chunk: List[int],
+    mode: str,
+    partition_key: Any,
+    controller: Optional[RUBudgetController] = None
+) -> Dict[int, BulkItemResult]:
+    """1チャンクをトランザクショナルバッチで書き込む
+
+    バッチはアトミックなため1件でも失敗（作成時の409等）すると全件ロールバックされる。
+    その場合は1件ずつ書き込み直して、アイテムごとの結果を返す。
+    """
+    if len(chunk) == 1:
+        idx = chunk[0]
+        return {idx: _write_single(container, items[idx], mode, partition_key, controller)}
+
+    operations = [(mode, (items[idx],)) for idx in chunk]
+    try:
+        responses = _invoke(
+            controller, mode, len(chunk), container.execute_item_batch,
+            batch_operations=operations, partition_key=partition_key)
+    except CosmosBatchOperationError:
+        return {
+            idx: _write_single(container, items[idx], mode, partition_key, controller)
+            for idx in chunk
+        }
+    except CosmosHttpResponseError as e:
+        return {
+            idx: BulkItemResult(items[idx].get("id"), partition_key, e.status_code or 500,
+                                error=e.message)
+            for idx in chunk
+        }
+
+    results = {}
+    for idx, response in zip(chunk, responses):
+        results[idx] = BulkItemResult(
+            items[idx].get("id"),
+            partition_key,
+            int(response.get("statusCode", 200)),
+            float(response.get("requestCharge", 0) or 0),
+        )
+    return results
+
+
+def bulk_write(
+    container,
+    items: Iterable[Mapping[str, Any]],
+    mode: str = "create",
+    max_workers: int = 8,
+    partition_key_paths: Optional[List[str]] = None,
+    controller: Optional[RUBudgetController] = None
+) -> List[BulkItemResult]:
+    """ドキュメントをパーティションキーごとにまとめてバッチ書き込みする
+
+    - 同一パーティションキー値のドキュメントを最大100件/2MBのバッチにまとめる
+    - バッチは max_workers 並列で実行する
+    - controller を指定した場合はRUバジェットに従って流量制御し、429は再試行する
+    - 戻り値は入力順のアイテムごとの結果（作成済みの場合は status_code=409）
+    """
+    if mode not in WRITE_MODES:
+        raise ValueError(f"mode must be one of {WRITE_MODES}: {mode!r}")
+
+    items = list(items)
+    if not items:
+        return []
+    paths = partition_key_paths or get_partition_key_paths(container)
+    groups = group_by_partition_key(items, paths)
+
+    tasks = [
+        (chunk, _sdk_partition_key(group_key))
+        for group_key, indexes in groups.items()
+        for chunk in _chunk_group(items, indexes)
+    ]
+
+    results: Dict[int, BulkItemResult] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+        futures = [
+            executor.submit(
+                _write_chunk, container, items, chunk, mode, partition_key, controller)
+            for chunk, partition_key in tasks
+        ]
+        for future in futures:
+            results.update(future.result())
+
+    return [results[idx] for idx in range(len(items))]
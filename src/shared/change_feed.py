@@ -0,0 +1,133 @@
+"""変更フィードの読み取り
+
+コンテナの変更フィード（最新バージョンモード）を継続トークンで読み進める。
+継続トークンを保存しておけば、プロセスを再起動しても続きから読める。
+
+- 同じドキュメントへの複数回の更新は最新の内容1件にまとめて届く
+- 削除は変更フィードに現れないため、削除を伝播させる場合は論理削除（フラグ + TTL）を使う
+- handler が成功した後に継続トークンを進める（少なくとも1回の配信。handler は冪等にする）
+
+使用例:
+    reader = ChangeFeedReader(container, start_time=START_FROM_NOW)
+    while True:
+        reader.drain(lambda items: apply(items))
+        time.sleep(1)
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+import threading
+import time
+
+START_FROM_BEGINNING = "Beginning"
+START_FROM_NOW = "Now"
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_POLL_INTERVAL = 1.0
+
+StartTime = Union[str, datetime]
+
+
+def _continuation_token(pages) -> Optional[str]:
+    """ページイテレーター自身の継続トークン（変更がなかった場合も位置を進めるため）
+
+    共有クライアントの last_response_headers は他スレッドのリクエストのものである可能性が
+    あるため使わない。取得できなければ None（呼び出し側は直前の継続トークンを維持する）。
+    """
+    return getattr(pages, "continuation_token", None) or None
+
+
+def change_lag_seconds(items: List[Dict[str, Any]], now: Optional[float] = None) -> float:
+    """変更の書き込み時刻（_ts）から現在までの最大経過秒"""
+    timestamps = [item["_ts"] for item in items if "_ts" in item]
+    if not timestamps:
+        return 0.0
+    return max(0.0, (now if now is not None else time.time()) - min(timestamps))
+
+
+class ChangeFeedReader:
+    """継続トークンで変更フィードを読み進めるリーダー
+
+    continuation を指定した場合は start_time より優先する。
+    feed_range を指定すると、その範囲（物理パーティション）の変更だけを読む。
+    """
+
+    def __init__(
+        self,
+        container,
+        start_time: StartTime = START_FROM_BEGINNING,
+        continuation: Optional[str] = None,
+        feed_range: Optional[Dict[str, Any]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ):
+        self.container = container
+        self.start_time = start_time
+        self.continuation = continuation
+        self.feed_range = feed_range
+        self.page_size = page_size
+        # 直近に読んだ変更の _ts（遅延の推定に使う）
+        self.last_timestamp: Optional[float] = None
+        # read_pages() が直前に返したページを処理し終えた時点の継続トークン
+        self.pending_continuation: Optional[str] = None
+        self.caught_up = False
+
+    def _query_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"max_item_count": self.page_size}
+        if self.continuation:
+            kwargs["continuation"] = self.continuation
+        else:
+            kwargs["start_time"] = self.start_time
+        if self.feed_range is not None:
+            kwargs["feed_range"] = self.feed_range
+        return kwargs
+
+    def read_pages(self) -> Iterator[List[Dict[str, Any]]]:
+        """現時点までの変更をページ単位で返す
+
+        ページを受け取った側の処理が終わってから（次のページを要求した時点で）継続トークンを進める。
+        ページの処理直後にチェックポイントを保存する場合は pending_continuation を使う。
+        """
+        pager = self.container.query_items_change_feed(**self._query_kwargs())
+        pages = pager.by_page(self.continuation)
+        self.caught_up = False
+        for page in pages:
+            items = list(page)
+            token = _continuation_token(pages)
+            if not items:
+                continue
+            self.pending_continuation = token or self.continuation
+            yield items
+            self.continuation = token or self.continuation
+            timestamps = [item["_ts"] for item in items if "_ts" in item]
+            if timestamps:
+                self.last_timestamp = max(timestamps)
+        self.continuation = _continuation_token(pages) or self.continuation
+        self.caught_up = True
+
+    def drain(self, handler: Callable[[List[Dict[str, Any]]], Any]) -> int:
+        """現時点までの変更をすべて handler に渡し、処理した件数を返す"""
+        count = 0
+        for items in self.read_pages():
+            handler(items)
+            count += len(items)
+        return count
+
+    @property
+    def lag_seconds(self) -> float:
+        """最後に読んだ変更の書き込み時刻からの経過秒（追いついていれば 0）"""
+        if self.caught_up or self.last_timestamp is None:
+            return 0.0
+        return max(0.0, time.time() - self.last_timestamp)
+
+    def poll(
+        self,
+        handler: Callable[[List[Dict[str, Any]]], Any],
+        stop: threading.Event,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        on_poll: Optional[Callable[[int, "ChangeFeedReader"], Any]] = None
+    ):
+        """stop がセットされるまで一定間隔で drain() を繰り返す（on_poll に件数を通知）"""
+        while not stop.is_set():
+            count = self.drain(handler)
+            if on_poll is not None:
+                on_poll(count, self)
+            if count == 0:
+                stop.wait(interval)
@@ -0,0 +1,324 @@
+"""リース管理付きの変更フィードプロセッサー
+
+監視するコンテナの変更フィードを物理パーティション（フィード範囲）ごとに並列に読み、
+登録したハンドラーへ渡す。フィード範囲ごとの担当と継続トークンはリースコンテナ
+（パーティションキー /id）のドキュメントとして保存する。
+
+- リースの取得・更新・チェックポイントは ETag による楽観的同時実行制御で行い、
+  412（他のインスタンスが更新済み）ならリースを失ったとみなして読み取りを止める
+- 期限切れのリースは他のインスタンスが引き継ぐ。各インスタンスは稼働中のインスタンス数で
+  均等に割った件数までリースを取得する。空きがなければ最も多く持つインスタンスから1件ずつ
+  引き取り、引き取られた側は次の更新で 412 を受けてそのリースの読み取りを止める
+- ハンドラーの処理が成功したページごとに継続トークンを保存する（少なくとも1回の配信）
+- リースはハンドラーの進捗とは独立したハートビートスレッドが lease_duration / 3 ごとに延長する
+  （ページの処理に lease_duration 以上かかっても、他のインスタンスに引き継がれない）
+
+使用例:
+    processor = ChangeFeedProcessor("access-view", users_container, leases_container)
+    processor.register(builder.handle_user_changes, doc_types=("user", "user_role"))
+    processor.start()
+    ...
+    processor.stop()
+"""
+from azure.core import MatchConditions
+from azure.cosmos.exceptions import (
+    CosmosAccessConditionFailedError,
+    CosmosHttpResponseError,
+    CosmosResourceExistsError,
+    CosmosResourceNotFoundError,
+)
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import hashlib
+import json
+import math
+import threading
+import time
+import uuid
+
+from .change_feed import START_FROM_BEGINNING, ChangeFeedReader, StartTime
+
+DEFAULT_LEASE_DURATION = 30.0
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_PAGE_SIZE = 100
+# read_feed_ranges とフィード範囲指定の変更フィードを提供する azure-cosmos の最小バージョン
+MIN_SDK_VERSION = "4.8.0"
+
+Handler = Callable[[List[Dict[str, Any]]], Any]
+
+
+class LeaseLostError(RuntimeError):
+    """リースが他のインスタンスに更新された（または削除された）"""
+
+
+def feed_range_key(feed_range: Any) -> str:
+    """フィード範囲からリースIDに使う安定したキーを生成"""
+    encoded = json.dumps(feed_range, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+class _LeaseHolder:
+    """ワーカーとハートビートが共有するリース（更新は常にロック内で行う）"""
+
+    def __init__(self, processor: "ChangeFeedProcessor", lease: Dict[str, Any]):
+        self._processor = processor
+        self._lock = threading.Lock()
+        self.lease = lease
+        self.lost = False
+
+    def update(self, **changes: Any) -> Dict[str, Any]:
+        """リースを延長（changes があれば同時に反映）。失っていれば LeaseLostError"""
+        with self._lock:
+            if self.lost:
+                raise LeaseLostError(self.lease["id"])
+            try:
+                self.lease = self._processor._write_lease(self.lease, **changes)
+            except LeaseLostError:
+                self.lost = True
+                raise
+            return self.lease
+
+    def heartbeat(self, interval: float, stopped: threading.Event):
+        """stopped が立つかリースを失うまで一定間隔でリースを延長する"""
+        while not stopped.wait(interval):
+            try:
+                self.update()
+            except LeaseLostError:
+                return
+            except CosmosHttpResponseError as e:
+                # 一時的な障害は次の周期で再試行する（期限内に延長できなければ失う）
+                print(f"⚠ リースを延長できません ({self.lease['id']}): {e.status_code}")
+
+
+class _Registration:
+    __slots__ = ("handler", "doc_types")
+
+    def __init__(self, handler: Handler, doc_types: Optional[Sequence[str]]):
+        self.handler = handler
+        self.doc_types = frozenset(doc_types) if doc_types else None
+
+    def dispatch(self, items: List[Dict[str, Any]]):
+        if self.doc_types is not None:
+            items = [item for item in items if item.get("type") in self.doc_types]
+        if items:
+            self.handler(items)
+
+
+class ChangeFeedProcessor:
+    """フィード範囲ごとのワーカーで変更フィードを処理するプロセッサー"""
+
+    def __init__(
+        self,
+        name: str,
+        container,
+        lease_container,
+        instance_id: Optional[str] = None,
+        start_time: StartTime = START_FROM_BEGINNING,
+        lease_duration: float = DEFAULT_LEASE_DURATION,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        page_size: int = DEFAULT_PAGE_SIZE
+    ):
+        self.name = name
+        self.container = container
+        self.lease_container = lease_container
+        self.instance_id = instance_id or f"{name}-{uuid.uuid4().hex[:8]}"
+        self.start_time = start_time
+        self.lease_duration = lease_duration
+        self.poll_interval = poll_interval
+        self.page_size = page_size
+        self.stats = {"processed": 0, "errors": 0, "leases_lost": 0}
+        self._registrations: List[_Registration] = []
+        self._workers: Dict[str, threading.Thread] = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._coordinator: Optional[threading.Thread] = None
+
+    def register(self, handler: Handler, doc_types: Optional[Sequence[str]] = None):
+        """ハンドラーを登録（doc_types 指定時はその type のドキュメントだけを渡す）"""
+        self._registrations.append(_Registration(handler, doc_types))
+        return handler
+
+    # ------------------------------------------------------------------
+    # リース
+    # ------------------------------------------------------------------
+
+    def _lease_id(self, feed_range: Any) -> str:
+        return f"{self.name}.{feed_range_key(feed_range)}"
+
+    def ensure_leases(self) -> int:
+        """フィード範囲ごとのリースを作成（作成済みはそのまま）し、範囲の数を返す"""
+        if not hasattr(self.container, "read_feed_ranges"):
+            raise RuntimeError(
+                f"ChangeFeedProcessor requires azure-cosmos>={MIN_SDK_VERSION} "
+                "(read_feed_ranges / feed_range change feed); upgrade azure-cosmos")
+        feed_ranges = list(self.container.read_feed_ranges())
+        for feed_range in feed_ranges:
+            try:
+                self.lease_container.create_item({
+                    "id": self._lease_id(feed_range),
+                    "type": "lease",
+                    "processor": self.name,
+                    "feedRange": feed_range,
+                    "continuation": None,
+                    "owner": None,
+                    "expiresAt": 0,
+                })
+            except CosmosResourceExistsError:
+                pass
+        return len(feed_ranges)
+
+    def _list_leases(self) -> List[Dict[str, Any]]:
+        return list(self.lease_container.query_items(
+            query="SELECT * FROM c WHERE c.processor = @name",
+            parameters=[{"name": "@name", "value": self.name}],
+            enable_cross_partition_query=True,
+        ))
+
+    def _write_lease(self, lease: Dict[str, Any], **changes: Any) -> Dict[str, Any]:
+        """ETag が一致する場合だけリースを更新（不一致・削除済みなら LeaseLostError）"""
+        body = {**lease, **changes, "expiresAt": time.time() + self.lease_duration}
+        try:
+            return self.lease_container.replace_item(
+                item=lease["id"], body=body, etag=lease["_etag"],
+                match_condition=MatchConditions.IfNotModified)
+        except (CosmosAccessConditionFailedError, CosmosResourceNotFoundError) as e:
+            raise LeaseLostError(lease["id"]) from e
+
+    def _acquire(self) -> List[Dict[str, Any]]:
+        """未担当・期限切れのリースを均等割りの件数まで取得（足りなければ1件引き取る）"""
+        now = time.time()
+        leases = self._list_leases()
+        counts: Dict[str, int] = {}
+        for lease in leases:
+            if lease.get("owner") and lease.get("expiresAt", 0) > now:
+                counts[lease["owner"]] = counts.get(lease["owner"], 0) + 1
+        counts.setdefault(self.instance_id, 0)
+        target = math.ceil(len(leases) / len(counts)) if leases else 0
+
+        with self._lock:
+            owned = len([key for key, thread in self._workers.items() if thread.is_alive()])
+        acquired = []
+        available = [lease for lease in leases
+                     if not lease.get("owner") or lease.get("expiresAt", 0) <= now]
+        if owned < target and not available:
+            # 空きがなければ均等割りを超えて持っているインスタンスから1件だけ引き取る
+            busiest = max((owner for owner in counts if owner != self.instance_id),
+                          key=counts.get, default=None)
+            if busiest is not None and counts[busiest] > target:
+                available = [lease for lease in leases if lease.get("owner") == busiest][:1]
+        for lease in available:
+            if owned >= target:
+                break
+            try:
+                acquired.append(self._write_lease(lease, owner=self.instance_id))
+                owned += 1
+            except LeaseLostError:
+                continue
+        return acquired
+
+    # ------------------------------------------------------------------
+    # ワーカー
+    # ------------------------------------------------------------------
+
+    def _dispatch(self, items: List[Dict[str, Any]]):
+        for registration in self._registrations:
+            registration.dispatch(items)
+
+    def _run_worker(self, lease: Dict[str, Any]):
+        """1つのフィード範囲を読み続ける（リースの延長はハートビートスレッドが行う）"""
+        reader = ChangeFeedReader(
+            self.container, start_time=self.start_time, continuation=lease.get("continuation"),
+            feed_range=lease["feedRange"], page_size=self.page_size)
+        holder = _LeaseHolder(self, lease)
+        stopped = threading.Event()
+        heartbeat = threading.Thread(
+            target=holder.heartbeat, args=(self.lease_duration / 3, stopped),
+            name=f"{lease['id']}-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            while not self._stop.is_set():
+                if holder.lost:
+                    # ハートビートがリースを失った場合は次のページを読まずに止める
+                    raise LeaseLostError(lease["id"])
+                processed = 0
+                for items in reader.read_pages():
+                    self._dispatch(items)
+                    processed += len(items)
+                    holder.update(continuation=reader.pending_continuation)
+                    if self._stop.is_set():
+                        break
+                # 最後まで読んだ場合は空ページの分も位置を進める
+                continuation = holder.lease.get("continuation")
+                checkpoint = reader.continuation if reader.caught_up else continuation
+                if checkpoint != continuation:
+                    holder.update(continuation=checkpoint)
+                with self._lock:
+                    self.stats["processed"] += processed
+                if processed == 0:
+                    self._stop.wait(self.poll_interval)
+        except LeaseLostError:
+            with self._lock:
+                self.stats["leases_lost"] += 1
+            print(f"⚠ リースを失いました: {lease['id']}")
+            return
+        except Exception as e:
+            # ハンドラーの失敗時はチェックポイントを進めずにリースを手放し、再取得後に再処理する
+            with self._lock:
+                self.stats["errors"] += 1
+            print(f"✗ 変更フィードの処理に失敗しました ({lease['id']}): {e}")
+            self._stop.wait(self.poll_interval)
+        finally:
+            stopped.set()
+            heartbeat.join()
+        if not holder.lost:
+            self._release(holder.lease)
+
+    def _release(self, lease: Dict[str, Any]):
+        try:
+            body = {**lease, "owner": None, "expiresAt": 0}
+            self.lease_container.replace_item(
+                item=lease["id"], body=body, etag=lease["_etag"],
+                match_condition=MatchConditions.IfNotModified)
+        except CosmosHttpResponseError:
+            pass
+
+    def _start_worker(self, lease: Dict[str, Any]):
+        thread = threading.Thread(
+            target=self._run_worker, args=(lease,), name=f"{lease['id']}", daemon=True)
+        with self._lock:
+            self._workers[lease["id"]] = thread
+        thread.start()
+
+    # ------------------------------------------------------------------
+    # ライフサイクル
+    # ------------------------------------------------------------------
+
+    def _coordinate(self):
+        while not self._stop.is_set():
+            try:
+                for lease in self._acquire():
+                    self._start_worker(lease)
+            except Exception as e:
+                # 一時的な障害で調整スレッドが止まらないよう、次の周期で再試行する
+                print(f"⚠ リースの取得に失敗しました ({self.name}): {e}")
+            self._stop.wait(self.lease_duration / 3)
+
+    def start(self):
+        """リースを用意し、取得とワーカーの起動をバックグラウンドで開始"""
+        self._stop.clear()
+        ranges = self.ensure_leases()
+        print(f"✓ 変更フィードプロセッサー開始: {self.name} ({ranges} フィード範囲, "
+              f"インスタンス {self.instance_id})")
+        self._coordinator = threading.Thread(
+            target=self._coordinate, name=f"{self.name}-coordinator", daemon=True)
+        self._coordinator.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """ワーカーを停止してリースを手放す"""
+        self._stop.set()
+        threads: Iterable[threading.Thread] = list(self._workers.values())
+        if self._coordinator is not None:
+            threads = [self._coordinator, *threads]
+        for thread in threads:
+            thread.join(timeout)
+        with self._lock:
+            self._workers.clear()
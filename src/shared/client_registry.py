@@ -0,0 +1,90 @@
+"""CosmosClient 共有レジストリ
+
+同一アカウント（エンドポイント + 認証情報）に対する CosmosClient をプロセス内で
+1つだけ生成し、複数のデータベース・コンテナハンドルから共有する。
+HTTP接続プール・TLSハンドシェイク・接続確認は1プロセスにつき1回で済む。
+"""
+from azure.cosmos import CosmosClient
+from typing import Any, Dict, Tuple
+import hashlib
+import threading
+
+
+_registry_lock = threading.Lock()
+_clients: Dict[Tuple[str, str, bool], "_RegistryEntry"] = {}
+_default_credential = None
+
+
+class _RegistryEntry:
+    """レジストリのエントリ（クライアントと接続確認状態）"""
+
+    def __init__(self, client: CosmosClient):
+        self.client = client
+        self.verified = False
+        self.lock = threading.Lock()
+
+
+def get_default_credential():
+    """プロセス内で共有する DefaultAzureCredential を取得"""
+    global _default_credential
+    with _registry_lock:
+        if _default_credential is None:
+            from azure.identity import DefaultAzureCredential
+            _default_credential = DefaultAzureCredential()
+        return _default_credential
+
+
+def credential_fingerprint(credential: Any) -> str:
+    """認証情報からレジストリキー用の識別子を生成（キー文字列そのものは保持しない）"""
+    if isinstance(credential, str):
+        return "key:" + hashlib.sha256(credential.encode("utf-8")).hexdigest()[:16]
+    return f"credential:{id(credential)}"
+
+
+def get_shared_client(
+    endpoint: str,
+    credential: Any,
+    connection_verify: bool = True,
+    verify_connection: bool = True
+) -> CosmosClient:
+    """共有 CosmosClient を取得
+
+    初回呼び出し時のみクライアントを生成し、verify_connection=True であれば
+    list_databases() による接続確認を1度だけ実行する。
+    接続確認に失敗した場合は例外を送出し、次回呼び出し時に再度確認する。
+    """
+    key = (endpoint, credential_fingerprint(credential), connection_verify)
+    with _registry_lock:
+        entry = _clients.get(key)
+        if entry is None:
+            # エミュレーター使用時はGatewayモードを使用してIPリダイレクトを回避
+            # enable_endpoint_discovery=False で自動エンドポイント検出を無効化
+            client = CosmosClient(
+                endpoint,
+                credential,
+                connection_verify=connection_verify,
+                connection_mode="Gateway",
+                enable_endpoint_discovery=False,
+            )
+            entry = _RegistryEntry(client)
+            _clients[key] = entry
+
+    if verify_connection and not entry.verified:
+        with entry.lock:
+            if not entry.verified:
+                # 接続確認のために軽い操作を実行
+                list(entry.client.list_databases())
+                entry.verified = True
+
+    return entry.client
+
+
+def clear_shared_clients():
+    """共有クライアントをすべて破棄（テスト・プロセス終了時用）"""
+    with _registry_lock:
+        entries = list(_clients.values())
+        _clients.clear()
+    for entry in entries:
+        close = getattr(entry.client, "close", None)
+        if close is not None:
+            close()
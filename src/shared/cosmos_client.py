@@ -1,9 +1,15 @@
 """Cosmos DB接続クライアント"""
-from azure.cosmos import CosmosClient, PartitionKey
 from azure.cosmos.exceptions import CosmosResourceExistsError
-from typing import Optional
+from . import readiness
+from .client_registry import get_default_credential, get_shared_client
+from .bulk import BulkItemResult, bulk_write
+from .document_cache import CachedContainer, DocumentCache
+from .metrics import InstrumentedContainer, MetricsRegistry, default_registry
+from .partition_key import build_partition_key
+from .throttle import RUBudgetController
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
 import os
-import time
+import threading
 import urllib3
 
 # SSL警告を無効化（エミュレーター使用時のみ）
@@ -11,62 +17,116 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 
 class CosmosDBClient:
-    """Cosmos DB 接続クライアント"""
+    """Cosmos DB 接続クライアント
+
+    lazy=True（または COSMOS_DB_LAZY_CONNECT=true）の場合、生成時には接続せず
+    最初の操作時に接続する。warm_up_containers を指定すると、
+    バックグラウンドで接続とメタデータの事前取得を行う。
+    """
 
     def __init__(
         self,
         endpoint: Optional[str] = None,
         key: Optional[str] = None,
-        database_name: Optional[str] = None
+        database_name: Optional[str] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        document_cache: Optional[DocumentCache] = None,
+        lazy: Optional[bool] = None,
+        warm_up_containers: Optional[Iterable[str]] = None
     ):
         self.endpoint = endpoint or os.getenv("COSMOS_DB_ENDPOINT")
         self.key = key or os.getenv("COSMOS_DB_KEY")
         self.database_name = database_name or os.getenv("COSMOS_DB_DATABASE")
 
-        # SSL検証を開発環境では無効化（Emulator用）
-        connection_verify = os.getenv(
-            "COSMOS_DB_CONNECTION_VERIFY", "true").lower() == "true"
-
-        # エミュレーター使用時はGatewayモードを使用してIPリダイレクトを回避
-        # enable_endpoint_discovery=False で自動エンドポイント検出を無効化
-        # リトライロジック付きでクライアントを作成
-        max_retries = 12
-        retry_delay = 10
-
-        kwargs = dict(
-            connection_verify=connection_verify,
-            connection_mode="Gateway",
-            enable_endpoint_discovery=False,
-        )
-
-        # キーが設定されていればキー認証、なければAzure AD認証（マネージドID）
-        if self.key:
-            credential = self.key
-        else:
-            from azure.identity import DefaultAzureCredential
-            credential = DefaultAzureCredential()
-
-        for attempt in range(1, max_retries + 1):
-            try:
-                self.client = CosmosClient(
+        # メトリクス計測はオプトイン（引数指定 or COSMOS_DB_METRICS=true）
+        if metrics is None and os.getenv("COSMOS_DB_METRICS", "false").lower() == "true":
+            metrics = default_registry
+        self.metrics = metrics
+        # ポイントリードのキャッシュ（指定時のみ）
+        self.document_cache = document_cache
+
+        self.database = None
+        self._client = None
+        self._connect_lock = threading.Lock()
+
+        # 遅延接続モードでは生成時に接続せず、最初の操作時に接続する
+        if lazy is None:
+            lazy = os.getenv("COSMOS_DB_LAZY_CONNECT", "false").lower() == "true"
+        if not lazy:
+            self.connect()
+        if warm_up_containers:
+            self.warm_up(warm_up_containers, background=True)
+
+    @property
+    def client(self):
+        """アカウントクライアント（未接続の場合はここで接続する）"""
+        if self._client is None:
+            self.connect()
+        return self._client
+
+    def connect(self):
+        """接続確立（接続済みの場合は何もしない）"""
+        with self._connect_lock:
+            if self._client is not None:
+                return
+
+            # SSL検証を開発環境では無効化（Emulator用）
+            connection_verify = os.getenv(
+                "COSMOS_DB_CONNECTION_VERIFY", "true").lower() == "true"
+
+            # キーが設定されていればキー認証、なければAzure AD認証（マネージドID）
+            if self.key:
+                credential = self.key
+            else:
+                credential = get_default_credential()
+
+            # 同一エンドポイント・認証情報のクライアントはプロセス内で共有される
+            # 直近に起動確認済みのエンドポイントでは接続確認を省略する
+            verify_connection = not readiness.is_ready(self.endpoint)
+            self._client = readiness.wait_until_ready(
+                self.endpoint,
+                lambda: get_shared_client(
                     self.endpoint,
                     credential,
-                    **kwargs,
-                )
-                # 接続確認のために軽い操作を実行
-                list(self.client.list_databases())
-                break
-            except Exception as e:
-                error_msg = str(e)
-                if ("still starting" in error_msg or "ServiceUnavailable" in error_msg) and attempt < max_retries:
-                    print(
-                        f"⏳ Cosmos DBエミュレーター起動中... (試行 {attempt}/{max_retries})")
-                    print(f"   {retry_delay}秒待機してから再試行します...")
-                    time.sleep(retry_delay)
-                else:
-                    raise
+                    connection_verify=connection_verify,
+                    verify_connection=verify_connection,
+                ),
+            )
 
-        self.database = None
+    def warm_up(
+        self,
+        container_names: Iterable[str] = (),
+        background: bool = True
+    ) -> Optional[threading.Thread]:
+        """接続とメタデータ（データベース/コンテナのプロパティ、パーティションキー範囲）を事前取得
+
+        background=True の場合はデーモンスレッドで実行し、そのスレッドを返す。
+        取得したメタデータは共有クライアントにキャッシュされるため、
+        以降に取得したコンテナハンドルの初回リクエストでも再取得されない。
+        """
+        container_names = list(container_names)
+        if not background:
+            self._warm_up(container_names)
+            return None
+        thread = threading.Thread(
+            target=self._warm_up_safely, args=(container_names,),
+            name=f"cosmos-warm-up-{self.database_name}", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up_safely(self, container_names: List[str]):
+        try:
+            self._warm_up(container_names)
+        except Exception as e:
+            print(f"⚠ Cosmos DB ウォームアップ失敗 ({self.database_name}): {e}")
+
+    def _warm_up(self, container_names: List[str]):
+        database = self.client.get_database_client(self.database_name)
+        database.read()
+        for container_name in container_names:
+            container = database.get_container_client(container_name)
+            # コンテナプロパティとパーティションキー範囲のルーティングマップを取得
+            list(container.read_feed_ranges())
 
     def create_database(self):
         """データベース作成"""
@@ -80,22 +140,60 @@ class CosmosDBClient:
     def create_container(
         self,
         container_name: str,
-        partition_key_path: str
+        partition_key_path: Union[str, Sequence[str]],
+        indexing_policy: Optional[Dict[str, Any]] = None
     ):
-        """コンテナ作成"""
+        """コンテナ作成
+
+        partition_key_path にパスのリスト（例: ["/tenantId", "/userId"]）を指定すると
+        階層パーティションキーとなる。
+        indexing_policy を省略した場合は既定ポリシー（全パスをインデックス）。
+        ポリシーの組み立ては shared.indexing.build_indexing_policy を参照。
+        """
+        options: Dict[str, Any] = {}
+        if indexing_policy is not None:
+            options["indexing_policy"] = indexing_policy
         try:
             container = self.database.create_container(
                 id=container_name,
-                partition_key=PartitionKey(path=partition_key_path)
+                partition_key=build_partition_key(partition_key_path),
+                **options
             )
             print(f"✓ Container '{container_name}' created")
-            return container
+            return self._instrument(container)
         except CosmosResourceExistsError:
             print(f"✓ Container '{container_name}' already exists")
-            return self.database.get_container_client(container_name)
+            return self._instrument(self.database.get_container_client(container_name))
 
     def get_container(self, container_name: str):
         """コンテナ取得"""
         if self.database is None:
             self.database = self.client.get_database_client(self.database_name)
-        return self.database.get_container_client(container_name)
+        return self._instrument(self.database.get_container_client(container_name))
+
+    def bulk_write(
+        self,
+        container,
+        items: Iterable[Dict[str, Any]],
+        mode: str = "create",
+        max_workers: int = 8,
+        controller: Optional[RUBudgetController] = None
+    ) -> List[BulkItemResult]:
+        """パーティションキーごとのトランザクショナルバッチで一括書き込み
+
+        container にはコンテナ名またはコンテナクライアントを指定する。
+        mode は "create" または "upsert"。アイテムごとの結果を入力順で返す。
+        controller を指定するとRUバジェットに従って流量制御する。
+        """
+        if isinstance(container, str):
+            container = self.get_container(container)
+        return bulk_write(container, items, mode=mode, max_workers=max_workers,
+                          controller=controller)
+
+    def _instrument(self, container):
+        """メトリクス・キャッシュ有効時はコンテナをラッパーで包む"""
+        if self.metrics is not None:
+            container = InstrumentedContainer(container, self.metrics, self.database_name)
+        if self.document_cache is not None:
+            container = CachedContainer(container, self.document_cache, self.database_name)
+        return container
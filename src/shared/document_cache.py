@@ -0,0 +1,243 @@
+"""ポイントリード用の読み取りスルーキャッシュ（LRU + TTL + ETag再検証）
+
+サービス定義・ロールなど更新頻度が低く参照頻度の高いドキュメントを
+プロセス内にキャッシュし、read_item をネットワーク往復なしで返す。
+- LRU方式で max_entries を超えたエントリを追い出す
+- コンテナごとに TTL を設定できる
+- 存在しないドキュメント（404）も negative_ttl の間キャッシュする
+- TTL切れのエントリは If-None-Match（ETag）で再検証し、未変更ならそのまま延命する
+
+使用例:
+    cache = DocumentCache(default_ttl=60, container_ttls={"services": 300})
+    client = CosmosDBClient(database_name="service_management", document_cache=cache)
+    services = client.get_container("services")
+    services.read_item("service-001", partition_key="service-001")
+"""
+from azure.core import MatchConditions
+from azure.cosmos.exceptions import CosmosHttpResponseError, CosmosResourceNotFoundError
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+import copy
+import threading
+import time
+
+CacheKey = Tuple[str, str, str, Hashable]
+DocumentId = Tuple[str, str, str]
+
+
+class _CacheEntry:
+    __slots__ = ("document", "etag", "expires_at")
+
+    def __init__(self, document: Optional[Dict[str, Any]], expires_at: float):
+        # document が None の場合は「存在しない」ことをキャッシュしたエントリ
+        self.document = document
+        self.etag = document.get("_etag") if document else None
+        self.expires_at = expires_at
+
+
+class DocumentCache:
+    """プロセス内ドキュメントキャッシュ（スレッドセーフ）"""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        default_ttl: float = 60.0,
+        container_ttls: Optional[Dict[str, float]] = None,
+        negative_ttl: float = 5.0
+    ):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.container_ttls = dict(container_ttls or {})
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[CacheKey, _CacheEntry]" = OrderedDict()
+        # (database, container, id) → そのIDのキャッシュキー（パーティションキー違い）
+        self._keys_by_id: Dict[DocumentId, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "negative_hits": 0,
+            "revalidations": 0,
+            "not_modified": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+
+    def ttl_for(self, container_name: str) -> float:
+        return self.container_ttls.get(container_name, self.default_ttl)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """ヒット・ミス・追い出し等の統計"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_ratio"] = round(
+            (stats["hits"] + stats["negative_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[_CacheEntry], bool]:
+        """エントリを取得し、(エントリ, 有効期限内か) を返す"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(key)
+            return entry, entry.expires_at > time.monotonic()
+
+    def store(self, key: CacheKey, document: Optional[Dict[str, Any]]):
+        """ドキュメント（None の場合は存在しないこと）をキャッシュ"""
+        ttl = self.negative_ttl if document is None else self.ttl_for(key[1])
+        if ttl <= 0:
+            return
+        entry = _CacheEntry(document, time.monotonic() + ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._keys_by_id.setdefault(key[:3], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._forget_key(evicted)
+                self._stats["evictions"] += 1
+
+    def _forget_key(self, key: CacheKey):
+        """ID索引からキーを外す（ロック取得済みで呼ぶ）"""
+        keys = self._keys_by_id.get(key[:3])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[key[:3]]
+
+    def refresh(self, key: CacheKey, entry: _CacheEntry):
+        """再検証で未変更だったエントリの有効期限を延長"""
+        entry.expires_at = time.monotonic() + self.ttl_for(key[1])
+
+    def invalidate(
+        self,
+        database_name: str,
+        container_name: str,
+        item_id: str,
+        partition_key: Any = None
+    ):
+        """ドキュメントのキャッシュを破棄（partition_key 省略時は同一IDをすべて破棄）"""
+        with self._lock:
+            if partition_key is not None:
+                keys = [(database_name, container_name, item_id, _hashable(partition_key))]
+            else:
+                keys = list(self._keys_by_id.get((database_name, container_name, item_id), ()))
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._forget_key(key)
+                    self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+
+
+def _hashable(value: Any) -> Hashable:
+    return tuple(value) if isinstance(value, list) else value
+
+
+class CachedContainer:
+    """ContainerProxy の read_item をキャッシュ経由にするラッパー
+
+    書き込み操作は元のコンテナに委譲したうえで該当ドキュメントのキャッシュを破棄する。
+    返却するドキュメントはキャッシュのコピーのため、呼び出し側で変更しても影響しない。
+    """
+
+    def __init__(self, container, cache: DocumentCache, database_name: str = ""):
+        self._container = container
+        self._cache = cache
+        self._database_name = database_name
+        self._container_name = getattr(container, "id", "")
+
+    def __getattr__(self, name):
+        return getattr(self._container, name)
+
+    def read_item(self, item, partition_key, **kwargs) -> Dict[str, Any]:
+        item_id = item["id"] if isinstance(item, dict) else item
+        key = (self._database_name, self._container_name, item_id, _hashable(partition_key))
+        entry, fresh = self._cache.lookup(key)
+
+        if entry is not None and fresh:
+            if entry.document is None:
+                self._cache._count("negative_hits")
+                raise CosmosResourceNotFoundError(
+                    status_code=404,
+                    message=f"Entity with the specified id does not exist (cached): {item_id}")
+            self._cache._count("hits")
+            return copy.deepcopy(entry.document)
+
+        if entry is not None and entry.etag:
+            # TTL切れ: ETagで再検証し、未変更なら本文を再取得しない
+            self._cache._count("revalidations")
+            try:
+                document = self._container.read_item(
+                    item_id, partition_key,
+                    etag=entry.etag, match_condition=MatchConditions.IfModified, **kwargs)
+            except CosmosResourceNotFoundError:
+                self._cache.store(key, None)
+                raise
+            except CosmosHttpResponseError as e:
+                if e.status_code != 304:
+                    raise
+                document = None
+            if not document or "id" not in document:
+                self._cache._count("not_modified")
+                self._cache.refresh(key, entry)
+                return copy.deepcopy(entry.document)
+            self._cache.store(key, copy.deepcopy(dict(document)))
+            return document
+
+        self._cache._count("misses")
+        try:
+            document = self._container.read_item(item_id, partition_key, **kwargs)
+        except CosmosResourceNotFoundError:
+            self._cache.store(key, None)
+            raise
+        self._cache.store(key, copy.deepcopy(dict(document)))
+        return document
+
+    def _invalidate_body(self, body: Dict[str, Any]):
+        if isinstance(body, dict) and "id" in body:
+            self._cache.invalidate(self._database_name, self._container_name, body["id"])
+
+    def create_item(self, body, *args, **kwargs):
+        result = self._container.create_item(body, *args, **kwargs)
+        self._invalidate_body(body)
+        return result
+
+    def upsert_item(self, body, *args, **kwargs):
+        try:
+            return self._container.upsert_item(body, *args, **kwargs)
+        finally:
+            self._invalidate_body(body)
+
+    def replace_item(self, item, body, *args, **kwargs):
+        try:
+            return self._container.replace_item(item, body, *args, **kwargs)
+        finally:
+            self._invalidate_body(body)
+
+    def patch_item(self, item, partition_key, *args, **kwargs):
+        try:
+            return self._container.patch_item(item, partition_key, *args, **kwargs)
+        finally:
+            item_id = item["id"] if isinstance(item, dict) else item
+            self._cache.invalidate(
+                self._database_name, self._container_name, item_id, partition_key)
+
+    def delete_item(self, item, partition_key, *args, **kwargs):
+        try:
+            return self._container.delete_item(item, partition_key, *args, **kwargs)
+        finally:
+            item_id = item["id"] if isinstance(item, dict) else item
+            self._cache.invalidate(
+                self._database_name, self._container_name, item_id, partition_key)
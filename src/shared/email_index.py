@@ -0,0 +1,206 @@
+"""メールアドレス → ユーザーの副次インデックス
+
+users コンテナのパーティションキーは /id のため、ログイン時にメールアドレス（userId）で
+ユーザーを探すとクロスパーティションクエリになる。user_email_index コンテナ
+（パーティションキー /id）に正規化したメールアドレスをキーとするドキュメントを置き、
+ログインをポイントリード2回（インデックス → ユーザー）にする。
+
+- create_user() はインデックスを先に作成してからユーザーを作成する（メールアドレスの一意制約を兼ねる）。
+  既存のエントリが古い（指すユーザーが存在しない・別のアドレスに変わった）場合は ETag 条件付きで引き継ぐ
+- replace_user() / delete_user() はユーザーの書き込み後にインデックスを追従させる
+- 他の経路で書き込まれたユーザーは handle_user_changes() を変更フィードに登録して追従させる。
+  変更フィードは変更前のメールアドレスを含まないため、この経路でアドレスが変わった場合の
+  古いエントリは残る（lookup() は無視する。削除は scripts/email_index.py rebuild --prune で行う）
+- lookup() はユーザー側のメールアドレスと照合し、古いインデックスは無視する
+- 整合性の検証と修復は scripts/email_index.py verify / rebuild で行う
+"""
+from azure.core import MatchConditions
+from azure.cosmos.exceptions import (
+    CosmosAccessConditionFailedError,
+    CosmosResourceExistsError,
+    CosmosResourceNotFoundError,
+)
+from typing import Any, Dict, List, Mapping, Optional
+
+INDEX_TYPE = "user_email"
+# Cosmos DB の id に使えない文字（と、エスケープに使う %）
+_RESERVED_CHARACTERS = "%/\\?#"
+
+
+def normalize_email(email: str) -> str:
+    """比較用に正規化したメールアドレス（前後の空白を除き小文字化）"""
+    return email.strip().lower()
+
+
+def index_key(email: str) -> str:
+    """インデックスドキュメントの id（id に使えない文字は %XX にエスケープ）"""
+    return "".join(
+        f"%{ord(char):02X}" if char in _RESERVED_CHARACTERS else char
+        for char in normalize_email(email))
+
+
+def email_index_document(user: Mapping[str, Any]) -> Dict[str, Any]:
+    """ユーザードキュメントに対応するインデックスドキュメント"""
+    key = index_key(user["userId"])
+    return {
+        "id": key,
+        "type": INDEX_TYPE,
+        "email": normalize_email(user["userId"]),
+        "userId": user["id"],
+        "tenantId": user.get("tenantId"),
+        "partitionKey": key,
+    }
+
+
+class EmailIndex:
+    """users コンテナと user_email_index コンテナの書き込み・参照をまとめるクラス"""
+
+    def __init__(self, users, index):
+        self.users = users
+        self.index = index
+
+    def _read_entry(self, email: str) -> Optional[Dict[str, Any]]:
+        key = index_key(email)
+        try:
+            return self.index.read_item(item=key, partition_key=key)
+        except CosmosResourceNotFoundError:
+            return None
+
+    def _release(self, email: str, user_id: str):
+        """インデックスがこのユーザーを指している場合だけ削除する"""
+        entry = self._read_entry(email)
+        if entry is None or entry.get("userId") != user_id:
+            return
+        try:
+            self.index.delete_item(
+                item=entry["id"], partition_key=entry["id"], etag=entry["_etag"],
+                match_condition=MatchConditions.IfNotModified)
+        except (CosmosAccessConditionFailedError, CosmosResourceNotFoundError):
+            pass
+
+    def _is_current(self, entry: Mapping[str, Any]) -> bool:
+        """エントリが指すユーザーが存在し、今もそのメールアドレスを使っているか"""
+        try:
+            user = self.users.read_item(item=entry["userId"], partition_key=entry["userId"])
+        except CosmosResourceNotFoundError:
+            return False
+        return not user.get("isDeleted") \
+            and normalize_email(user.get("userId", "")) == entry.get("email")
+
+    def _claim(self, user: Mapping[str, Any]) -> Dict[str, Any]:
+        """ユーザーのメールアドレスを確保する
+
+        使用中のエントリがあれば CosmosResourceExistsError。古いエントリ（このユーザー自身を
+        指すもの、または指すユーザーがそのアドレスを使っていないもの）は ETag 条件付きで置き換える。
+        """
+        document = email_index_document(user)
+        try:
+            return self.index.create_item(document)
+        except CosmosResourceExistsError:
+            entry = self._read_entry(user["userId"])
+            if entry is not None and entry.get("userId") != user["id"] \
+                    and self._is_current(entry):
+                raise
+        if entry is None:
+            # 確認する間に削除された
+            return self.index.create_item(document)
+        try:
+            return self.index.replace_item(
+                item=entry["id"], body=document, etag=entry["_etag"],
+                match_condition=MatchConditions.IfNotModified)
+        except (CosmosAccessConditionFailedError, CosmosResourceNotFoundError) as e:
+            # 他の書き込みが先にエントリを更新・削除した
+            raise CosmosResourceExistsError(
+                status_code=409,
+                message=f"Email index entry was claimed concurrently: {entry['id']}") from e
+
+    # ------------------------------------------------------------------
+    # 参照
+    # ------------------------------------------------------------------
+
+    def lookup(self, email: str) -> Optional[Dict[str, Any]]:
+        """メールアドレスでユーザーを取得（見つからない・インデックスが古い場合は None）"""
+        entry = self._read_entry(email)
+        if entry is None:
+            return None
+        try:
+            user = self.users.read_item(item=entry["userId"], partition_key=entry["userId"])
+        except CosmosResourceNotFoundError:
+            return None
+        if normalize_email(user.get("userId", "")) != normalize_email(email):
+            return None
+        return user
+
+    # ------------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------------
+
+    def create_user(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """ユーザーを作成（同じメールアドレスのユーザーがいれば CosmosResourceExistsError）"""
+        self._claim(user)
+        try:
+            return self.users.create_item(user)
+        except Exception:
+            self._release(user["userId"], user["id"])
+            raise
+
+    def replace_user(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """ユーザーを更新（メールアドレスの変更時は新しいアドレスを先に確保する）"""
+        previous = self.users.read_item(item=user["id"], partition_key=user["id"])
+        document = email_index_document(user)
+        changed = normalize_email(previous["userId"]) != normalize_email(user["userId"])
+        if changed:
+            self._claim(user)
+        try:
+            replaced = self.users.replace_item(item=user["id"], body=user)
+        except Exception:
+            if changed:
+                self._release(user["userId"], user["id"])
+            raise
+        if changed:
+            self._release(previous["userId"], user["id"])
+        else:
+            self.index.upsert_item(document)
+        return replaced
+
+    def delete_user(self, user_id: str):
+        """ユーザーとインデックスを削除"""
+        try:
+            user = self.users.read_item(item=user_id, partition_key=user_id)
+        except CosmosResourceNotFoundError:
+            return
+        self.users.delete_item(item=user_id, partition_key=user_id)
+        self._release(user["userId"], user_id)
+
+    def sync(self, user: Mapping[str, Any], previous_email: Optional[str] = None):
+        """書き込み済みのユーザーにインデックスを合わせる（論理削除済みなら削除）
+
+        エントリがない場合は作成し、このユーザーを指している場合だけ ETag 条件付きで更新する。
+        他のユーザーが確保済みのエントリは上書きしない。previous_email を省略した場合
+        （変更フィード経由）は古いアドレスのエントリは残り、rebuild --prune で削除される。
+        """
+        if previous_email and normalize_email(previous_email) != normalize_email(user["userId"]):
+            self._release(previous_email, user["id"])
+        if user.get("isDeleted"):
+            self._release(user["userId"], user["id"])
+            return
+        document = email_index_document(user)
+        entry = self._read_entry(user["userId"])
+        try:
+            if entry is None:
+                self.index.create_item(document)
+            elif entry.get("userId") == user["id"] and any(
+                    entry.get(field) != value for field, value in document.items()):
+                self.index.replace_item(
+                    item=entry["id"], body=document, etag=entry["_etag"],
+                    match_condition=MatchConditions.IfNotModified)
+        except (CosmosResourceExistsError, CosmosAccessConditionFailedError,
+                CosmosResourceNotFoundError):
+            # 確認した後に他の書き込みがエントリを変更した（その書き込みを優先する）
+            pass
+
+    def handle_user_changes(self, items: List[Dict[str, Any]]):
+        """変更フィードのハンドラー（ChangeFeedProcessor に doc_types=("user",) で登録）"""
+        for user in items:
+            if user.get("type") == "user" and user.get("userId"):
+                self.sync(user)
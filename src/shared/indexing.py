@@ -0,0 +1,176 @@
+"""インデックスポリシーの定義・比較・適用
+
+デフォルトの「全パスをインデックス」ポリシーでは、検索しない大きなフィールド
+（passwordHash 等）も書き込みごとにインデックスされRUを消費する。
+除外パス・複合インデックス・空間インデックス・インデックスなしモードを指定し、
+実環境のポリシーとの差分を検出して置き換える（インデックス変換はサービス側で
+オンラインに実行される）。
+"""
+from azure.cosmos import PartitionKey
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# サービスが自動的に追加する除外パス
+SYSTEM_EXCLUDED_PATHS = ('/"_etag"/?',)
+
+INDEXING_MODES = ("consistent", "none")
+SPATIAL_TYPES = ("Point", "LineString", "Polygon", "MultiPolygon")
+
+# replace_container で引き継ぐコンテナプロパティ（キーワード引数名, プロパティ名）
+CARRIED_OVER_PROPERTIES = (
+    ("default_ttl", "defaultTtl"),
+    ("unique_key_policy", "uniqueKeyPolicy"),
+    ("conflict_resolution_policy", "conflictResolutionPolicy"),
+)
+
+CompositeSpec = Sequence[Union[str, Tuple[str, str]]]
+
+
+def default_indexing_policy() -> Dict[str, Any]:
+    """Cosmos DB の既定ポリシー（全パスをインデックス）"""
+    return build_indexing_policy()
+
+
+def build_indexing_policy(
+    included_paths: Optional[Iterable[str]] = None,
+    excluded_paths: Optional[Iterable[str]] = None,
+    composite_indexes: Optional[Iterable[CompositeSpec]] = None,
+    spatial_indexes: Optional[Dict[str, Iterable[str]]] = None,
+    mode: str = "consistent"
+) -> Dict[str, Any]:
+    """インデックスポリシーを組み立てる
+
+    composite_indexes の各要素はパス、または (パス, "ascending"|"descending") の並び。
+    spatial_indexes はパスから空間タイプ一覧へのマッピング。
+    mode="none" の場合はインデックスを作成しない（ポイントリード専用コンテナ向け）。
+    """
+    if mode not in INDEXING_MODES:
+        raise ValueError(f"mode must be one of {INDEXING_MODES}: {mode!r}")
+    if mode == "none":
+        return {"indexingMode": "none", "automatic": False,
+                "includedPaths": [], "excludedPaths": []}
+
+    policy: Dict[str, Any] = {
+        "indexingMode": "consistent",
+        "automatic": True,
+        "includedPaths": [{"path": path} for path in (included_paths or ["/*"])],
+        "excludedPaths": [{"path": path} for path in (excluded_paths or [])],
+    }
+    if composite_indexes:
+        policy["compositeIndexes"] = [
+            [_composite_entry(entry) for entry in composite]
+            for composite in composite_indexes
+        ]
+    if spatial_indexes:
+        for types in spatial_indexes.values():
+            unknown = set(types) - set(SPATIAL_TYPES)
+            if unknown:
+                raise ValueError(f"unknown spatial types: {sorted(unknown)}")
+        policy["spatialIndexes"] = [
+            {"path": path, "types": list(types)} for path, types in spatial_indexes.items()
+        ]
+    return policy
+
+
+def _composite_entry(entry: Union[str, Tuple[str, str]]) -> Dict[str, str]:
+    if isinstance(entry, str):
+        return {"path": entry, "order": "ascending"}
+    path, order = entry
+    return {"path": path, "order": order}
+
+
+def normalize_indexing_policy(policy: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """比較用にポリシーを正規化（順序・大文字小文字・サービス付与の項目を吸収）"""
+    policy = policy or default_indexing_policy()
+    mode = str(policy.get("indexingMode", "consistent")).lower()
+    if mode == "none":
+        return {"indexingMode": "none"}
+
+    excluded = {entry["path"] for entry in policy.get("excludedPaths", [])}
+    excluded.update(SYSTEM_EXCLUDED_PATHS)
+    return {
+        "indexingMode": mode,
+        "automatic": bool(policy.get("automatic", True)),
+        "includedPaths": sorted({entry["path"] for entry in policy.get("includedPaths", [])}),
+        "excludedPaths": sorted(excluded),
+        "compositeIndexes": sorted(
+            tuple((entry["path"], str(entry.get("order", "ascending")).lower())
+                  for entry in composite)
+            for composite in policy.get("compositeIndexes", [])
+        ),
+        "spatialIndexes": sorted(
+            (entry["path"], tuple(sorted(entry.get("types", []))))
+            for entry in policy.get("spatialIndexes", [])
+        ),
+    }
+
+
+def diff_indexing_policy(
+    live: Optional[Dict[str, Any]],
+    desired: Optional[Dict[str, Any]]
+) -> List[str]:
+    """実環境と期待値の差分を人が読める形で返す（差分なしなら空リスト）"""
+    current = normalize_indexing_policy(live)
+    target = normalize_indexing_policy(desired)
+    changes: List[str] = []
+    if current.get("indexingMode") != target.get("indexingMode"):
+        changes.append(
+            f"indexingMode: {current.get('indexingMode')} -> {target.get('indexingMode')}")
+        return changes
+    if target["indexingMode"] == "none":
+        return changes
+    if current["automatic"] != target["automatic"]:
+        changes.append(f"automatic: {current['automatic']} -> {target['automatic']}")
+    for key in ("includedPaths", "excludedPaths", "compositeIndexes", "spatialIndexes"):
+        before, after = set(current[key]), set(target[key])
+        changes.extend(f"{key}: + {_format(entry)}" for entry in sorted(after - before))
+        changes.extend(f"{key}: - {_format(entry)}" for entry in sorted(before - after))
+    return changes
+
+
+def _format(entry: Any) -> str:
+    if isinstance(entry, tuple) and entry and isinstance(entry[0], tuple):
+        return "(" + ", ".join(f"{path} {order}" for path, order in entry) + ")"
+    if isinstance(entry, tuple):
+        return f"{entry[0]} {list(entry[1])}"
+    return str(entry)
+
+
+def apply_indexing_policy(database, container_name: str, desired: Dict[str, Any]) -> List[str]:
+    """差分がある場合のみコンテナのインデックスポリシーを置き換え、差分を返す
+
+    replace_container はコンテナ定義全体を置き換えるため、パーティションキー・既定TTL・
+    一意キーポリシー・競合解決ポリシーは実環境の値を引き継ぐ。
+    """
+    properties = database.get_container_client(container_name).read()
+    changes = diff_indexing_policy(properties.get("indexingPolicy"), desired)
+    if not changes:
+        return []
+
+    partition_key = properties["partitionKey"]
+    options: Dict[str, Any] = {
+        "partition_key": PartitionKey(
+            path=partition_key["paths"] if len(partition_key["paths"]) > 1
+            else partition_key["paths"][0],
+            kind=partition_key.get("kind", "Hash"),
+            version=partition_key.get("version", 2),
+        ),
+        "indexing_policy": desired,
+    }
+    for option, field in CARRIED_OVER_PROPERTIES:
+        if properties.get(field) is not None:
+            options[option] = properties[field]
+    database.replace_container(container_name, **options)
+    return changes
+
+
+def index_transformation_progress(container) -> Optional[int]:
+    """インデックス変換の進捗（%）を取得（ヘッダーが返らない場合は None）"""
+    captured: Dict[str, Any] = {}
+
+    def hook(headers, result):
+        captured["headers"] = headers
+
+    container.read(populate_quota_info=True, response_hook=hook)
+    headers = captured.get("headers") or {}
+    value = headers.get("x-ms-documentdb-collection-index-transformation-progress")
+    return int(value) if value is not None else None
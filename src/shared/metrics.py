@@ -0,0 +1,447 @@
+"""Cosmos DB 操作メトリクス（RU・レイテンシ・スロットリング）
+
+コンテナ操作をラップし、データベース/コンテナ/操作ごとに以下を集計する（オプトイン）。
+- 消費RU（x-ms-request-charge）
+- レイテンシのヒストグラムと p50/p95/p99
+- スロットリング（429）件数・エラー件数
+- ペイロードサイズ
+
+集計結果は Prometheus テキスト形式と JSON で出力できる。
+
+使用例:
+    registry = MetricsRegistry()
+    client = CosmosDBClient(database_name="auth_management", metrics=registry)
+    start_metrics_server(registry, port=9464)  # /metrics, /metrics.json
+"""
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+import json
+import math
+import threading
+import time
+
+# レイテンシヒストグラムのバケット境界（ミリ秒）
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# パーセンタイル算出に保持する直近サンプル数
+PERCENTILE_SAMPLE_SIZE = 2048
+
+OperationKey = Tuple[str, str, str]
+
+
+def _payload_size(payload: Any) -> int:
+    if payload is None:
+        return 0
+    try:
+        return len(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _request_charge(headers: Optional[Mapping[str, str]]) -> float:
+    if not headers:
+        return 0.0
+    try:
+        return float(headers.get("x-ms-request-charge", 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _throttle_retries(headers: Optional[Mapping[str, str]]) -> int:
+    """SDK内部で429リトライされた回数"""
+    if not headers:
+        return 0
+    try:
+        return int(headers.get("x-ms-throttle-retry-count", 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class OperationStats:
+    """1つの (database, container, operation) の集計値"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.throttled = 0
+        self.request_charge = 0.0
+        self.payload_bytes = 0
+        self.latency_sum_ms = 0.0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._samples = deque(maxlen=PERCENTILE_SAMPLE_SIZE)
+
+    def observe(
+        self,
+        latency_ms: float,
+        request_charge: float,
+        payload_bytes: int,
+        throttled: int,
+        error: bool
+    ):
+        self.count += 1
+        self.errors += int(error)
+        self.throttled += throttled
+        self.request_charge += request_charge
+        self.payload_bytes += payload_bytes
+        self.latency_sum_ms += latency_ms
+        for idx, bound in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= bound:
+                self.latency_buckets[idx] += 1
+                break
+        else:
+            self.latency_buckets[-1] += 1
+        self._samples.append(latency_ms)
+
+    def percentile(self, p: float) -> float:
+        """直近サンプルからパーセンタイル（ミリ秒）を算出"""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        idx = max(0, math.ceil(p / 100.0 * len(ordered)) - 1)
+        return ordered[idx]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "throttled": self.throttled,
+            "requestCharge": round(self.request_charge, 2),
+            "avgRequestCharge": round(self.request_charge / self.count, 2) if self.count else 0.0,
+            "payloadBytes": self.payload_bytes,
+            "latencyMs": {
+                "avg": round(self.latency_sum_ms / self.count, 2) if self.count else 0.0,
+                "p50": round(self.percentile(50), 2),
+                "p95": round(self.percentile(95), 2),
+                "p99": round(self.percentile(99), 2),
+            },
+        }
+
+
+class MetricsRegistry:
+    """操作メトリクスのレジストリ（スレッドセーフ）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[OperationKey, OperationStats] = {}
+
+    def record(
+        self,
+        database: str,
+        container: str,
+        operation: str,
+        latency_ms: float,
+        request_charge: float = 0.0,
+        payload_bytes: int = 0,
+        throttled: int = 0,
+        error: bool = False
+    ):
+        """1回の操作結果を記録"""
+        key = (database or "", container or "", operation)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = OperationStats()
+            stats.observe(latency_ms, request_charge, payload_bytes, throttled, error)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self) -> Dict[OperationKey, Dict[str, Any]]:
+        """現在の集計値を (database, container, operation) ごとに取得"""
+        with self._lock:
+            return {key: stats.to_dict() for key, stats in self._stats.items()}
+
+    def container_request_charge(self) -> Dict[Tuple[str, str], float]:
+        """コンテナごとの合計消費RU"""
+        totals: Dict[Tuple[str, str], float] = {}
+        with self._lock:
+            for (database, container, _), stats in self._stats.items():
+                totals[(database, container)] = totals.get(
+                    (database, container), 0.0) + stats.request_charge
+        return totals
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """JSON形式で出力"""
+        operations = [
+            {"database": database, "container": container, "operation": operation, **values}
+            for (database, container, operation), values in sorted(self.snapshot().items())
+        ]
+        return json.dumps({"operations": operations}, ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self) -> str:
+        """Prometheus テキスト形式で出力"""
+        with self._lock:
+            items = sorted(self._stats.items())
+            lines = []
+            counters = (
+                ("cosmos_requests_total", "Number of Cosmos DB operations", "count"),
+                ("cosmos_request_errors_total", "Number of failed Cosmos DB operations", "errors"),
+                ("cosmos_throttled_requests_total",
+                 "Number of throttled (429) Cosmos DB requests", "throttled"),
+                ("cosmos_request_charge_total", "Request units consumed", "request_charge"),
+                ("cosmos_payload_bytes_total", "Serialized payload bytes", "payload_bytes"),
+            )
+            for name, help_text, attr in counters:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for key, stats in items:
+                    lines.append(f"{name}{{{_labels(key)}}} {getattr(stats, attr)}")
+
+            name = "cosmos_operation_latency_ms"
+            lines.append(f"# HELP {name} Cosmos DB operation latency in milliseconds")
+            lines.append(f"# TYPE {name} histogram")
+            for key, stats in items:
+                labels = _labels(key)
+                cumulative = 0
+                for bound, bucket in zip(LATENCY_BUCKETS_MS, stats.latency_buckets):
+                    cumulative += bucket
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {stats.count}')
+                lines.append(f"{name}_sum{{{labels}}} {round(stats.latency_sum_ms, 3)}")
+                lines.append(f"{name}_count{{{labels}}} {stats.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(key: OperationKey) -> str:
+    database, container, operation = key
+    return (f'database="{_escape_label(database)}",container="{_escape_label(container)}",'
+            f'operation="{_escape_label(operation)}"')
+
+
+# プロセス共通のデフォルトレジストリ
+default_registry = MetricsRegistry()
+
+
+class InstrumentedContainer:
+    """ContainerProxy をラップして操作ごとのメトリクスを記録する
+
+    計測対象外のメソッド・属性はそのまま元の ContainerProxy に委譲する。
+    """
+
+    def __init__(self, container, registry: MetricsRegistry, database_name: str = ""):
+        self._container = container
+        self._registry = registry
+        self._database_name = database_name
+        self._container_name = getattr(container, "id", "")
+
+    def __getattr__(self, name):
+        return getattr(self._container, name)
+
+    def _call(self, operation: str, method, payload: Any, *args, **kwargs):
+        captured: Dict[str, Any] = {}
+        user_hook = kwargs.pop("response_hook", None)
+
+        def hook(headers, result):
+            captured["headers"] = headers
+            if user_hook is not None:
+                user_hook(headers, result)
+
+        start = time.perf_counter()
+        try:
+            result = method(*args, response_hook=hook, **kwargs)
+        except CosmosHttpResponseError as e:
+            self._record(operation, start, e.headers, payload, error=True,
+                         throttled=int(e.status_code == 429))
+            raise
+        except Exception:
+            self._record(operation, start, None, payload, error=True)
+            raise
+        headers = captured.get("headers")
+        if headers is None:
+            headers = getattr(result, "get_response_headers", lambda: None)()
+        self._record(operation, start, headers, payload if payload is not None else result)
+        return result
+
+    def _record(
+        self,
+        operation: str,
+        start: float,
+        headers: Optional[Mapping[str, str]],
+        payload: Any,
+        error: bool = False,
+        throttled: int = 0
+    ):
+        self._registry.record(
+            self._database_name,
+            self._container_name,
+            operation,
+            latency_ms=(time.perf_counter() - start) * 1000.0,
+            request_charge=_request_charge(headers),
+            payload_bytes=_payload_size(payload),
+            throttled=throttled + _throttle_retries(headers),
+            error=error,
+        )
+
+    def create_item(self, body, *args, **kwargs):
+        return self._call("create", self._container.create_item, body, body, *args, **kwargs)
+
+    def upsert_item(self, body, *args, **kwargs):
+        return self._call("upsert", self._container.upsert_item, body, body, *args, **kwargs)
+
+    def replace_item(self, item, body, *args, **kwargs):
+        return self._call("replace", self._container.replace_item, body, item, body,
+                          *args, **kwargs)
+
+    def read_item(self, item, partition_key, *args, **kwargs):
+        return self._call("read", self._container.read_item, None, item, partition_key,
+                          *args, **kwargs)
+
+    def delete_item(self, item, partition_key, *args, **kwargs):
+        return self._call("delete", self._container.delete_item, None, item, partition_key,
+                          *args, **kwargs)
+
+    def execute_item_batch(self, batch_operations, partition_key, *args, **kwargs):
+        payload = [operation[1] for operation in batch_operations]
+        return self._call("batch", self._container.execute_item_batch, payload,
+                          batch_operations, partition_key, *args, **kwargs)
+
+    def query_items(self, *args, **kwargs) -> "_InstrumentedPager":
+        """クエリ結果をページ単位で取得し、ページごとにメトリクスを記録"""
+        capture = _PageHeaderCapture(kwargs.pop("response_hook", None))
+        pager = self._container.query_items(*args, response_hook=capture, **kwargs)
+        return _InstrumentedPager(self, "query", pager, capture)
+
+
+class _PageHeaderCapture:
+    """クエリの response_hook として、ページ取得中に届いたヘッダーだけを保持する
+
+    SDKによっては query_items() の呼び出し直後にも hook が共有の
+    last_response_headers で呼ばれるため、ページ取得中以外の呼び出しは無視する。
+    """
+
+    def __init__(self, user_hook=None):
+        self._user_hook = user_hook
+        self._active = False
+        self._headers: Optional[Mapping[str, str]] = None
+
+    def __call__(self, headers, result):
+        if self._active:
+            self._headers = headers
+        if self._user_hook is not None:
+            self._user_hook(headers, result)
+
+    def begin(self):
+        self._headers = None
+        self._active = True
+
+    def end(self) -> Optional[Mapping[str, str]]:
+        self._active = False
+        return self._headers
+
+
+class _InstrumentedPager:
+    """ItemPaged 互換のラッパー（by_page() による継続トークン取得も計測対象）"""
+
+    def __init__(self, owner: InstrumentedContainer, operation: str, pager,
+                 capture: _PageHeaderCapture):
+        self._owner = owner
+        self._operation = operation
+        self._pager = pager
+        self._capture = capture
+
+    def __getattr__(self, name):
+        return getattr(self._pager, name)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for page in self.by_page():
+            yield from page
+
+    def by_page(self, continuation_token: Optional[str] = None) -> "_InstrumentedPageIterator":
+        return _InstrumentedPageIterator(self, self._pager.by_page(continuation_token))
+
+
+class _InstrumentedPageIterator:
+    """ページ取得ごとにRU・レイテンシを記録するページイテレーター"""
+
+    def __init__(self, pager: _InstrumentedPager, pages):
+        self._pager = pager
+        self._pages = pages
+
+    @property
+    def continuation_token(self) -> Optional[str]:
+        return self._pages.continuation_token
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Iterator[Dict[str, Any]]:
+        owner = self._pager._owner
+        operation = self._pager._operation
+        capture = self._pager._capture
+        start = time.perf_counter()
+        capture.begin()
+        try:
+            page = list(next(self._pages))
+        except StopIteration:
+            capture.end()
+            raise
+        except CosmosHttpResponseError as e:
+            capture.end()
+            owner._record(operation, start, e.headers, None, error=True,
+                          throttled=int(e.status_code == 429))
+            raise
+        headers = capture.end() or _pager_response_headers(self._pager._pager)
+        # ヘッダーが取れない場合は RU を記録しない（共有クライアントの
+        # last_response_headers は他スレッドのリクエストのものである可能性がある）
+        owner._record(operation, start, headers, page)
+        return iter(page)
+
+
+def _pager_response_headers(pager) -> Optional[Mapping[str, str]]:
+    """ページャー自身が保持する直近ページのレスポンスヘッダー（SDKバージョン差異を吸収）"""
+    get_last = getattr(pager, "get_last_response_headers", None)
+    if get_last is not None:
+        headers = get_last()
+        if headers:
+            return headers
+    get_headers = getattr(pager, "get_response_headers", None)
+    if get_headers is None:
+        return None
+    headers = get_headers()
+    if isinstance(headers, list):
+        return headers[-1] if headers else None
+    return headers or None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = default_registry
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/metrics":
+            body = self.registry.to_prometheus().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif self.path.rstrip("/") == "/metrics.json":
+            body = self.registry.to_json().encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # アクセスログは出力しない
+        pass
+
+
+def start_metrics_server(
+    registry: MetricsRegistry = default_registry,
+    port: int = 9464,
+    host: str = "0.0.0.0"
+) -> ThreadingHTTPServer:
+    """/metrics（Prometheus）と /metrics.json を返すHTTPサーバーをバックグラウンドで起動"""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="cosmos-metrics", daemon=True)
+    thread.start()
+    return server
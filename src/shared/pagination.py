@@ -0,0 +1,194 @@
+"""継続トークンによるページング
+
+OFFSET/LIMIT はページが深くなるほど読み飛ばし分のRUを消費するため、
+Cosmos DB の継続トークンを使ってページングする。継続トークンは
+署名付きの不透明なカーソル文字列に包んでクライアントへ返す。
+
+partition_key には階層パーティションキーのプレフィックス（例: [tenantId]）も指定できる
+（shared.partition_key.prefix_partition_key を参照）。
+
+カーソルの署名鍵は環境変数 COSMOS_DB_CURSOR_SECRET から取得する。
+未設定の場合はプロセスごとのランダム鍵となり、別プロセスが発行したカーソルは無効になる。
+"""
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import zlib
+
+DEFAULT_PAGE_SIZE = 100
+
+_process_secret = secrets.token_bytes(32)
+
+
+class InvalidCursorError(ValueError):
+    """カーソルの改ざん・別クエリでの使用・形式不正"""
+
+
+@dataclass
+class Page:
+    """1ページ分のクエリ結果"""
+    items: List[Dict[str, Any]] = field(default_factory=list)
+    next_cursor: Optional[str] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
+
+
+def _secret() -> bytes:
+    secret = os.getenv("COSMOS_DB_CURSOR_SECRET")
+    return secret.encode("utf-8") if secret else _process_secret
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def query_fingerprint(
+    query: str,
+    parameters: Optional[List[Dict[str, Any]]] = None,
+    partition_key: Any = None
+) -> str:
+    """カーソルを特定のクエリに束縛するための識別子"""
+    material = json.dumps(
+        {"q": query, "p": parameters or [], "pk": partition_key},
+        sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(continuation: str, fingerprint: str) -> str:
+    """継続トークンを署名付きカーソルに変換"""
+    payload = zlib.compress(json.dumps(
+        {"c": continuation, "q": fingerprint}, separators=(",", ":")).encode("utf-8"))
+    signature = hmac.new(_secret(), payload, hashlib.sha256).digest()[:16]
+    return f"{_b64encode(payload)}.{_b64encode(signature)}"
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> str:
+    """カーソルを検証して継続トークンを取り出す"""
+    try:
+        encoded_payload, encoded_signature = cursor.split(".", 1)
+        payload = _b64decode(encoded_payload)
+        signature = _b64decode(encoded_signature)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("malformed cursor") from e
+
+    expected = hmac.new(_secret(), payload, hashlib.sha256).digest()[:16]
+    if not hmac.compare_digest(signature, expected):
+        raise InvalidCursorError("cursor signature mismatch")
+
+    try:
+        data = json.loads(zlib.decompress(payload))
+    except (zlib.error, ValueError) as e:
+        raise InvalidCursorError("malformed cursor") from e
+    if data.get("q") != fingerprint:
+        raise InvalidCursorError("cursor was issued for a different query")
+    return data["c"]
+
+
+def _query_kwargs(
+    parameters: Optional[List[Dict[str, Any]]],
+    partition_key: Any,
+    page_size: int,
+    cross_partition_flag: bool
+) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {"max_item_count": page_size}
+    if parameters:
+        kwargs["parameters"] = parameters
+    if partition_key is not None:
+        kwargs["partition_key"] = partition_key
+    elif cross_partition_flag:
+        kwargs["enable_cross_partition_query"] = True
+    return kwargs
+
+
+def query_page(
+    container,
+    query: str,
+    parameters: Optional[List[Dict[str, Any]]] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    partition_key: Any = None
+) -> Page:
+    """1ページ分のクエリ結果と次ページのカーソルを取得
+
+    ページの深さにかかわらず、各ページのRUは先頭ページと同程度になる。
+    """
+    fingerprint = query_fingerprint(query, parameters, partition_key)
+    continuation = decode_cursor(cursor, fingerprint) if cursor else None
+
+    pager = container.query_items(
+        query=query, **_query_kwargs(parameters, partition_key, page_size, True))
+    pages = pager.by_page(continuation)
+    try:
+        items = list(next(pages))
+    except StopIteration:
+        return Page()
+
+    next_continuation = pages.continuation_token
+    next_cursor = encode_cursor(next_continuation, fingerprint) if next_continuation else None
+    return Page(items=items, next_cursor=next_cursor)
+
+
+def stream_query(
+    container,
+    query: str,
+    parameters: Optional[List[Dict[str, Any]]] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    partition_key: Any = None
+) -> Iterator[Dict[str, Any]]:
+    """クエリ結果をページ単位で遅延取得しながら1件ずつ返す（メモリ使用量は1ページ分）"""
+    pager = container.query_items(
+        query=query, **_query_kwargs(parameters, partition_key, page_size, True))
+    for page in pager.by_page():
+        yield from page
+
+
+async def async_query_page(
+    container,
+    query: str,
+    parameters: Optional[List[Dict[str, Any]]] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    partition_key: Any = None
+) -> Page:
+    """query_page の非同期版（azure.cosmos.aio のコンテナを受け取る）"""
+    fingerprint = query_fingerprint(query, parameters, partition_key)
+    continuation = decode_cursor(cursor, fingerprint) if cursor else None
+
+    pager = container.query_items(
+        query=query, **_query_kwargs(parameters, partition_key, page_size, False))
+    pages = pager.by_page(continuation)
+    try:
+        page = await pages.__anext__()
+    except StopAsyncIteration:
+        return Page()
+    items = [item async for item in page]
+
+    next_continuation = pages.continuation_token
+    next_cursor = encode_cursor(next_continuation, fingerprint) if next_continuation else None
+    return Page(items=items, next_cursor=next_cursor)
+
+
+async def async_stream_query(
+    container,
+    query: str,
+    parameters: Optional[List[Dict[str, Any]]] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    partition_key: Any = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """stream_query の非同期版"""
+    pager = container.query_items(
+        query=query, **_query_kwargs(parameters, partition_key, page_size, False))
+    async for page in pager.by_page():
+        async for item in page:
+            yield item
@@ -0,0 +1,91 @@
+"""パーティションキー関連のユーティリティ
+
+階層パーティションキー（例: /tenantId + /userId）では、先頭からの一部の値（プレフィックス）を
+partition_key に指定したクエリは、そのプレフィックスに属する物理パーティションだけを対象とする。
+"""
+from azure.cosmos import PartitionKey
+from azure.cosmos.partition_key import NonePartitionKeyValue
+from typing import Any, Dict, List, Mapping, Sequence, Union
+
+# 階層パーティションキーの最大階層数
+MAX_PARTITION_KEY_LEVELS = 3
+
+
+def normalize_partition_key_paths(paths: Union[str, Sequence[str]]) -> List[str]:
+    """パーティションキーパスの指定（文字列 or リスト）を検証してリストに変換"""
+    paths = [paths] if isinstance(paths, str) else list(paths)
+    if not 1 <= len(paths) <= MAX_PARTITION_KEY_LEVELS:
+        raise ValueError(
+            f"partition key requires 1 to {MAX_PARTITION_KEY_LEVELS} paths: {paths}")
+    for path in paths:
+        if not path.startswith("/"):
+            raise ValueError(f"partition key path must start with '/': {path!r}")
+    return paths
+
+
+def build_partition_key(paths: Union[str, Sequence[str]]) -> PartitionKey:
+    """パス指定から PartitionKey を生成（複数パスの場合は階層パーティションキー）"""
+    paths = normalize_partition_key_paths(paths)
+    if len(paths) == 1:
+        return PartitionKey(path=paths[0])
+    return PartitionKey(path=paths, kind="MultiHash")
+
+
+def prefix_partition_key(paths: Sequence[str], values: Sequence[Any]) -> Any:
+    """階層パーティションキーのプレフィックス値を partition_key 引数の形式で返す
+
+    values は先頭の階層から順に指定する（例: [tenantId]）。
+    単一パスのコンテナでは値そのものを返す。
+    """
+    values = list(values)
+    if not 1 <= len(values) <= len(paths):
+        raise ValueError(
+            f"partition key prefix must have 1 to {len(paths)} values: {values}")
+    if len(paths) == 1:
+        return values[0]
+    return values
+
+
+def get_partition_key_paths(container) -> List[str]:
+    """コンテナのパーティションキーパス一覧を取得"""
+    properties = container.read()
+    return list(properties["partitionKey"]["paths"])
+
+
+def _resolve_path(item: Mapping[str, Any], path: str) -> Any:
+    value: Any = item
+    for segment in path.strip("/").split("/"):
+        if not isinstance(value, Mapping) or segment not in value:
+            return NonePartitionKeyValue
+        value = value[segment]
+    return value
+
+
+def extract_partition_key(item: Mapping[str, Any], paths: List[str]) -> Any:
+    """ドキュメントからパーティションキー値を取り出す
+
+    単一パスの場合は値そのもの、複数パスの場合は値のリストを返す。
+    値が存在しない場合は NonePartitionKeyValue を返す。
+    """
+    if len(paths) == 1:
+        return _resolve_path(item, paths[0])
+    return [_resolve_path(item, path) for path in paths]
+
+
+def partition_key_group(value: Any) -> Any:
+    """パーティションキー値をグルーピング用のハッシュ可能なキーに変換"""
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def group_by_partition_key(
+    items: List[Mapping[str, Any]],
+    paths: List[str]
+) -> Dict[Any, List[int]]:
+    """ドキュメントのインデックスをパーティションキー値ごとにグループ化"""
+    groups: Dict[Any, List[int]] = {}
+    for idx, item in enumerate(items):
+        key = partition_key_group(extract_partition_key(item, paths))
+        groups.setdefault(key, []).append(idx)
+    return groups
@@ -0,0 +1,186 @@
+"""権限文字列の評価
+
+ロールの permissions（"tenant:*", "file:upload" など）を ":" 区切りのセグメントの
+トライ木にコンパイルし、権限チェックをセグメント数に比例する時間で行う。
+
+- "*" のセグメントはそれ以降のすべてのセグメントに一致する（"tenant:*" は "tenant:delete" や
+  "tenant:user:read" を含むが "tenant" 自体は含まない。"*" 単独はすべての権限）
+- コンパイル済みの PermissionSet は不変で、スレッド間で共有できる
+- PermissionEvaluator はロールIDの組とロール定義のバージョンごとにコンパイル結果をLRUで保持する。
+  ロール定義を更新するとバージョンが進み、古い結果は使われなくなる
+
+使用例:
+    evaluator = PermissionEvaluator(roles)
+    access = read_effective_access(view, user_id)
+    if evaluator.can(access, "tenant:delete"):
+        ...
+    evaluator.check_many(access, ["file:read", "file:upload"])
+"""
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple, Union
+import threading
+
+SEPARATOR = ":"
+WILDCARD = "*"
+
+User = Union[Mapping[str, Any], Iterable[str]]
+
+
+class _Node:
+    __slots__ = ("children", "terminal", "wildcard")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        # この位置で終わる権限が付与されている
+        self.terminal = False
+        # この位置以降のすべての権限が付与されている
+        self.wildcard = False
+
+
+class PermissionSet:
+    """コンパイル済みの権限集合（不変）"""
+
+    __slots__ = ("_root", "_permissions")
+
+    def __init__(self, permissions: Iterable[str] = ()):
+        root = _Node()
+        granted = set()
+        for permission in permissions:
+            segments = permission.split(SEPARATOR) if permission else []
+            if not segments or "" in segments:
+                continue
+            node = root
+            for segment in segments:
+                if node.wildcard:
+                    break
+                if segment == WILDCARD:
+                    # より広い権限に含まれる子は不要になる
+                    node.wildcard = True
+                    node.children = {}
+                    break
+                node = node.children.setdefault(segment, _Node())
+            else:
+                node.terminal = True
+            granted.add(permission)
+        self._root = root
+        self._permissions: FrozenSet[str] = frozenset(granted)
+
+    @property
+    def permissions(self) -> FrozenSet[str]:
+        """コンパイル元の権限文字列"""
+        return self._permissions
+
+    def __len__(self) -> int:
+        return len(self._permissions)
+
+    def __contains__(self, permission: str) -> bool:
+        return self.can(permission)
+
+    def can(self, permission: str) -> bool:
+        """権限が付与されているか"""
+        node = self._root
+        for segment in permission.split(SEPARATOR):
+            if node.wildcard:
+                return True
+            node = node.children.get(segment)
+            if node is None:
+                return False
+        return node.terminal
+
+    def check_many(self, permissions: Iterable[str]) -> Dict[str, bool]:
+        """複数の権限をまとめて判定"""
+        return {permission: self.can(permission) for permission in permissions}
+
+    def can_all(self, permissions: Iterable[str]) -> bool:
+        return all(self.can(permission) for permission in permissions)
+
+    def can_any(self, permissions: Iterable[str]) -> bool:
+        return any(self.can(permission) for permission in permissions)
+
+
+def role_ids_of(user: User) -> FrozenSet[str]:
+    """ユーザー（effective_access ドキュメント）またはロールIDの列からロールIDの集合を取得"""
+    if isinstance(user, Mapping):
+        roles = user.get("roles") or []
+        return frozenset(
+            role["roleId"] if isinstance(role, Mapping) else role for role in roles)
+    return frozenset(user)
+
+
+class PermissionEvaluator:
+    """ロールIDの組ごとに PermissionSet をコンパイルしてキャッシュする評価器（スレッドセーフ）"""
+
+    def __init__(self, roles: Iterable[Mapping[str, Any]] = (), max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._compiled: "OrderedDict[Tuple[FrozenSet[str], int], PermissionSet]" = OrderedDict()
+        self._role_permissions: Dict[str, List[str]] = {}
+        self._version = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self.update_roles(roles)
+
+    @property
+    def version(self) -> int:
+        """ロール定義のバージョン（update_roles のたびに進む）"""
+        return self._version
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._compiled)
+            stats["version"] = self._version
+        return stats
+
+    def update_roles(self, roles: Iterable[Mapping[str, Any]]):
+        """ロール定義を置き換え、コンパイル済みの結果を無効化する"""
+        role_permissions = {role["id"]: list(role.get("permissions", [])) for role in roles}
+        with self._lock:
+            self._role_permissions = role_permissions
+            self._version += 1
+            self._compiled.clear()
+
+    def compile(self, user: User) -> PermissionSet:
+        """ユーザーのロールの権限をまとめた PermissionSet を取得"""
+        role_ids = role_ids_of(user)
+        with self._lock:
+            key = (role_ids, self._version)
+            compiled = self._compiled.get(key)
+            if compiled is not None:
+                self._compiled.move_to_end(key)
+                self._stats["hits"] += 1
+                return compiled
+            self._stats["misses"] += 1
+            role_permissions = self._role_permissions
+
+        # コンパイルはロックの外で行う（同時に同じ組をコンパイルしても結果は同じ）
+        compiled = PermissionSet(
+            permission for role_id in sorted(role_ids)
+            for permission in role_permissions.get(role_id, ()))
+        with self._lock:
+            if key[1] == self._version:
+                self._compiled[key] = compiled
+                while len(self._compiled) > self.max_entries:
+                    self._compiled.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return compiled
+
+    def can(self, user: User, permission: str) -> bool:
+        """ユーザーに権限が付与されているか"""
+        return self.compile(user).can(permission)
+
+    def check_many(self, user: User, permissions: Iterable[str]) -> Dict[str, bool]:
+        """ユーザーに対して複数の権限をまとめて判定"""
+        return self.compile(user).check_many(permissions)
+
+
+def compile_permissions(
+    roles: Iterable[Mapping[str, Any]],
+    role_ids: Optional[Iterable[str]] = None
+) -> PermissionSet:
+    """ロール定義（role_ids 指定時はそのロールだけ）の権限をコンパイル"""
+    selected = None if role_ids is None else set(role_ids)
+    return PermissionSet(
+        permission for role in roles
+        if selected is None or role["id"] in selected
+        for permission in role.get("permissions", []))
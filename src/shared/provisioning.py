@@ -0,0 +1,238 @@
+"""スキーママニフェストに基づくデータベース・コンテナのプロビジョニング
+
+マニフェスト（JSON / YAML）にデータベース・コンテナ・パーティションキー・スループット等を宣言し、
+実環境との差分だけを並列に作成する。作成済みの環境ではコンテナごとに
+メタデータ読み取り1回で完了し、作成の試行や競合エラーは発生しない。
+indexingPolicy を宣言したコンテナは、既存コンテナのポリシーとの差分も検出して置き換える。
+partitionKey にパスのリストを指定すると階層パーティションキー（最大3階層）になる。
+
+マニフェスト例:
+    {
+      "databases": [
+        {
+          "id": "auth_management",
+          "throughput": 400,
+          "containers": [
+            {
+              "id": "users",
+              "partitionKey": "/id",
+              "uniqueKeys": [["/userId"]],
+              "indexingPolicy": {"excludedPaths": [{"path": "/passwordHash/?"}]}
+            },
+            {"id": "tenant_users", "partitionKey": ["/tenantId", "/userId"]}
+          ]
+        }
+      ]
+    }
+"""
+from azure.cosmos import PartitionKey
+from azure.cosmos.exceptions import CosmosResourceExistsError, CosmosResourceNotFoundError
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import json
+
+from .indexing import apply_indexing_policy, build_indexing_policy, diff_indexing_policy
+from .partition_key import build_partition_key
+
+
+@dataclass
+class ProvisionAction:
+    """差分として検出された操作"""
+    kind: str  # create_database / create_container / update_indexing_policy / mismatch
+    database: str
+    container: Optional[str] = None
+    spec: Dict[str, Any] = field(default_factory=dict)
+    detail: str = ""
+
+    @property
+    def label(self) -> str:
+        return f"{self.database}/{self.container}" if self.container else self.database
+
+
+def load_manifest(path: Union[str, Path]) -> Dict[str, Any]:
+    """マニフェストを読み込む（.yaml / .yml は PyYAML が必要）"""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix in (".yaml", ".yml"):
+        import yaml
+        manifest = yaml.safe_load(text)
+    else:
+        manifest = json.loads(text)
+    validate_manifest(manifest)
+    return manifest
+
+
+def validate_manifest(manifest: Dict[str, Any]):
+    """マニフェストの必須項目を検証"""
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("databases"), list):
+        raise ValueError("manifest must contain a 'databases' list")
+    for database in manifest["databases"]:
+        if not database.get("id"):
+            raise ValueError("every database requires an 'id'")
+        for container in database.get("containers", []):
+            if not container.get("id"):
+                raise ValueError(f"container in '{database['id']}' requires an 'id'")
+            if not container.get("partitionKey"):
+                raise ValueError(
+                    f"container '{database['id']}/{container['id']}' requires a 'partitionKey'")
+
+
+def partition_key_paths(spec: Union[str, List[str], Dict[str, Any]]) -> List[str]:
+    """マニフェストのパーティションキー指定をパス一覧に正規化"""
+    if isinstance(spec, str):
+        return [spec]
+    if isinstance(spec, dict):
+        return list(spec["paths"])
+    return list(spec)
+
+
+def _partition_key(spec: Union[str, List[str], Dict[str, Any]]) -> PartitionKey:
+    return build_partition_key(partition_key_paths(spec))
+
+
+def indexing_policy(spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """コンテナ定義の indexingPolicy を完全なポリシーに展開（未指定なら None）
+
+    省略された項目は既定値（includedPaths は "/*"、indexingMode は consistent）で補う。
+    """
+    policy = spec.get("indexingPolicy")
+    if policy is None:
+        return None
+    if str(policy.get("indexingMode", "consistent")).lower() == "none":
+        return build_indexing_policy(mode="none")
+    expanded = build_indexing_policy(
+        included_paths=[entry["path"] for entry in policy.get("includedPaths", [])] or None,
+        excluded_paths=[entry["path"] for entry in policy.get("excludedPaths", [])],
+    )
+    for key in ("compositeIndexes", "spatialIndexes"):
+        if policy.get(key):
+            expanded[key] = policy[key]
+    return expanded
+
+
+def _container_options(spec: Dict[str, Any]) -> Dict[str, Any]:
+    options: Dict[str, Any] = {"partition_key": _partition_key(spec["partitionKey"])}
+    if spec.get("throughput"):
+        options["offer_throughput"] = spec["throughput"]
+    if spec.get("uniqueKeys"):
+        options["unique_key_policy"] = {
+            "uniqueKeys": [{"paths": list(paths)} for paths in spec["uniqueKeys"]]
+        }
+    if spec.get("defaultTtl") is not None:
+        options["default_ttl"] = spec["defaultTtl"]
+    policy = indexing_policy(spec)
+    if policy is not None:
+        options["indexing_policy"] = policy
+    return options
+
+
+def _inspect_container(client, database_id: str, spec: Dict[str, Any]) -> List[ProvisionAction]:
+    container = client.get_database_client(database_id).get_container_client(spec["id"])
+    try:
+        properties = container.read()
+    except CosmosResourceNotFoundError:
+        return [ProvisionAction("create_container", database_id, spec["id"], spec)]
+
+    live_paths = properties.get("partitionKey", {}).get("paths", [])
+    desired_paths = partition_key_paths(spec["partitionKey"])
+    if live_paths != desired_paths:
+        # パーティションキーは作成後に変更できないため報告のみ
+        return [ProvisionAction(
+            "mismatch", database_id, spec["id"], spec,
+            f"partition key is {live_paths}, manifest declares {desired_paths}")]
+
+    desired_policy = indexing_policy(spec)
+    if desired_policy is not None:
+        changes = diff_indexing_policy(properties.get("indexingPolicy"), desired_policy)
+        if changes:
+            return [ProvisionAction(
+                "update_indexing_policy", database_id, spec["id"], spec, "; ".join(changes))]
+    return []
+
+
+def plan(client, manifest: Dict[str, Any], max_workers: int = 8) -> List[ProvisionAction]:
+    """マニフェストと実環境の差分を算出
+
+    存在しないデータベースはその配下のコンテナを読み取らずに作成対象とする。
+    """
+    actions: List[ProvisionAction] = []
+    existing_databases = []
+    for database in manifest["databases"]:
+        try:
+            client.get_database_client(database["id"]).read()
+            existing_databases.append(database)
+        except CosmosResourceNotFoundError:
+            actions.append(ProvisionAction("create_database", database["id"], spec=database))
+            actions.extend(
+                ProvisionAction("create_container", database["id"], container["id"], container)
+                for container in database.get("containers", []))
+
+    targets = [
+        (database["id"], container)
+        for database in existing_databases
+        for container in database.get("containers", [])
+    ]
+    if targets:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as executor:
+            for found in executor.map(lambda t: _inspect_container(client, *t), targets):
+                actions.extend(found)
+    return actions
+
+
+def _create_database(client, action: ProvisionAction) -> str:
+    options = {}
+    if action.spec.get("throughput"):
+        options["offer_throughput"] = action.spec["throughput"]
+    try:
+        client.create_database(action.database, **options)
+        return "created"
+    except CosmosResourceExistsError:
+        return "exists"
+
+
+def _create_container(client, action: ProvisionAction) -> str:
+    database = client.get_database_client(action.database)
+    try:
+        database.create_container(id=action.container, **_container_options(action.spec))
+        return "created"
+    except CosmosResourceExistsError:
+        return "exists"
+
+
+def _update_indexing_policy(client, action: ProvisionAction) -> str:
+    database = client.get_database_client(action.database)
+    changes = apply_indexing_policy(database, action.container, indexing_policy(action.spec))
+    return "updated" if changes else "unchanged"
+
+
+def apply(client, actions: List[ProvisionAction], max_workers: int = 8) -> Dict[str, str]:
+    """差分を適用（DB作成 → コンテナ作成 → インデックスポリシー更新の順に、それぞれ並列実行）"""
+    results: Dict[str, str] = {}
+    phases = (
+        ("create_database", _create_database),
+        ("create_container", _create_container),
+        ("update_indexing_policy", _update_indexing_policy),
+    )
+    for kind, handler in phases:
+        targets = [action for action in actions if action.kind == kind]
+        if not targets:
+            continue
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as executor:
+            for action, outcome in zip(targets, executor.map(lambda a: handler(client, a), targets)):
+                results[action.label] = outcome
+    return results
+
+
+def provision(
+    client,
+    manifest: Dict[str, Any],
+    max_workers: int = 8,
+    dry_run: bool = False
+) -> List[ProvisionAction]:
+    """マニフェストに従ってプロビジョニングし、検出した差分を返す"""
+    actions = plan(client, manifest, max_workers=max_workers)
+    if not dry_run:
+        apply(client, actions, max_workers=max_workers)
+    return actions
@@ -0,0 +1,176 @@
+"""Cosmos DB 起動待ち（レディネスプローブ）
+
+エミュレーター起動直後などの一時的なエラーを、例外メッセージではなく
+ステータスコード・例外型で判定し、ジッター付き指数バックオフで全体の期限まで再試行する。
+成功結果はプロセス内および一時ファイルにキャッシュし、setup_database.sh のように
+連続実行されるスクリプトが毎回待機・接続確認をやり直さないようにする。
+"""
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+import asyncio
+import hashlib
+import os
+import random
+import tempfile
+import time
+
+T = TypeVar("T")
+
+# 起動中・一時的な過負荷を示すステータスコード
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 449, 500, 502, 503, 504})
+
+DEFAULT_TIMEOUT = 120.0
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 10.0
+DEFAULT_CACHE_TTL = 300.0
+
+_ready_cache: Dict[str, float] = {}
+
+
+class CosmosNotReadyError(TimeoutError):
+    """期限内に Cosmos DB が利用可能にならなかった"""
+
+    def __init__(self, endpoint: str, timeout: float, last_error: Exception):
+        super().__init__(
+            f"Cosmos DB at {endpoint} did not become ready within {timeout:.0f}s: {last_error}")
+        self.endpoint = endpoint
+        self.last_error = last_error
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """起動待ちで再試行すべき一時的エラーかを判定"""
+    if isinstance(error, CosmosHttpResponseError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    # 接続拒否・リセット（コンテナ起動前など）
+    if isinstance(error, (ServiceRequestError, ServiceResponseError, ConnectionError)):
+        return True
+    return False
+
+
+def _cache_ttl() -> float:
+    return float(os.getenv("COSMOS_DB_READY_CACHE_TTL", DEFAULT_CACHE_TTL))
+
+
+def _marker_path(endpoint: str) -> Path:
+    digest = hashlib.sha256(endpoint.encode("utf-8")).hexdigest()[:16]
+    return Path(tempfile.gettempdir()) / f"cosmos-db-ready-{digest}"
+
+
+def is_ready(endpoint: str) -> bool:
+    """直近に起動確認済みか（プロセス内キャッシュ → 一時ファイルの順に確認）"""
+    ttl = _cache_ttl()
+    if ttl <= 0:
+        return False
+    now = time.time()
+    checked_at = _ready_cache.get(endpoint)
+    if checked_at is not None and now - checked_at < ttl:
+        return True
+    try:
+        checked_at = _marker_path(endpoint).stat().st_mtime
+    except OSError:
+        return False
+    if now - checked_at < ttl:
+        _ready_cache[endpoint] = checked_at
+        return True
+    return False
+
+
+def mark_ready(endpoint: str):
+    """起動確認済みとして記録"""
+    _ready_cache[endpoint] = time.time()
+    try:
+        _marker_path(endpoint).touch()
+    except OSError:
+        # マーカーが書けなくてもプロセス内キャッシュは有効
+        pass
+
+
+def invalidate(endpoint: str):
+    """起動確認済みの記録を破棄"""
+    _ready_cache.pop(endpoint, None)
+    try:
+        _marker_path(endpoint).unlink()
+    except OSError:
+        pass
+
+
+def _backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """フルジッター付き指数バックオフ"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def _resolve_timeout(timeout: Optional[float]) -> float:
+    if timeout is not None:
+        return timeout
+    return float(os.getenv("COSMOS_DB_READY_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+def _report_wait(attempt: int, delay: float, remaining: float, error: BaseException):
+    status = getattr(error, "status_code", None) or type(error).__name__
+    print(f"⏳ Cosmos DBエミュレーター起動中... (試行 {attempt}, {status})")
+    print(f"   {delay:.1f}秒待機してから再試行します... (残り {remaining:.0f}秒)")
+
+
+def wait_until_ready(
+    endpoint: str,
+    probe: Callable[[], T],
+    timeout: Optional[float] = None,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    max_delay: float = DEFAULT_MAX_DELAY
+) -> T:
+    """probe が成功するまで期限付きで再試行し、その戻り値を返す
+
+    一時的エラー以外は即座に送出する。期限切れの場合は CosmosNotReadyError。
+    """
+    timeout = _resolve_timeout(timeout)
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = probe()
+        except Exception as e:
+            if not is_retryable_error(e):
+                raise
+            invalidate(endpoint)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CosmosNotReadyError(endpoint, timeout, e) from e
+            delay = min(_backoff_delay(attempt, base_delay, max_delay), remaining)
+            _report_wait(attempt, delay, remaining, e)
+            time.sleep(delay)
+            continue
+        mark_ready(endpoint)
+        return result
+
+
+async def async_wait_until_ready(
+    endpoint: str,
+    probe: Callable[[], Awaitable[T]],
+    timeout: Optional[float] = None,
+    base_delay: float = DEFAULT_BASE_DELAY,
+    max_delay: float = DEFAULT_MAX_DELAY
+) -> T:
+    """wait_until_ready の非同期版"""
+    timeout = _resolve_timeout(timeout)
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = await probe()
+        except Exception as e:
+            if not is_retryable_error(e):
+                raise
+            invalidate(endpoint)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CosmosNotReadyError(endpoint, timeout, e) from e
+            delay = min(_backoff_delay(attempt, base_delay, max_delay), remaining)
+            _report_wait(attempt, delay, remaining, e)
+            await asyncio.sleep(delay)
+            continue
+        mark_ready(endpoint)
+        return result
@@ -0,0 +1,208 @@
+"""参照データのプロセス内スナップショット
+
+services・roles のように件数が少なく参照頻度の高いコンテナを丸ごとメモリに読み込み、
+id と副次フィールド（serviceId, roleCode など）で引ける不変のインデックスとして保持する。
+
+- 変更フィードをポーリングし、変更があればコンテナを読み直して新しいスナップショットに
+  アトミックに差し替える（読み取り側はロックなしで snapshot を参照するだけ）
+- 削除は変更フィードに現れないため、refresh_interval ごとに変更がなくても読み直す
+- スナップショットの鮮度はポーリング間隔で決まる。version は差し替えのたびに進む
+- 購読者には version の順に通知し、すでに新しい版を通知済みなら古い版は通知しない
+
+使用例:
+    roles = ReferenceReplicator(roles_container, index_fields=("serviceId", "roleCode",
+                                                               ("serviceId", "roleCode")))
+    roles.subscribe(lambda snapshot: evaluator.update_roles(snapshot.all()))
+    roles.start()
+    admin = roles.snapshot.first(("serviceId", "roleCode"), ("service-001", "admin"))
+"""
+from types import MappingProxyType
+from typing import (
+    Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+)
+import threading
+import time
+
+from .change_feed import START_FROM_NOW, ChangeFeedReader
+from .pagination import stream_query
+
+DEFAULT_POLL_INTERVAL = 5.0
+DEFAULT_REFRESH_INTERVAL = 300.0
+
+IndexField = Union[str, Tuple[str, ...]]
+
+
+def _index_value(document: Mapping[str, Any], field: IndexField) -> Any:
+    if isinstance(field, tuple):
+        return tuple(document.get(name) for name in field)
+    return document.get(field)
+
+
+class ReferenceSnapshot:
+    """ある時点のコンテナ全件と、そのインデックス（不変）"""
+
+    __slots__ = ("version", "loaded_at", "_by_id", "_indexes")
+
+    def __init__(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        index_fields: Sequence[IndexField] = (),
+        version: int = 0
+    ):
+        by_id = {document["id"]: MappingProxyType(document) for document in documents}
+        indexes: Dict[IndexField, Dict[Any, Tuple[Mapping[str, Any], ...]]] = {}
+        for field in index_fields:
+            groups: Dict[Any, List[Mapping[str, Any]]] = {}
+            for document in by_id.values():
+                groups.setdefault(_index_value(document, field), []).append(document)
+            indexes[field] = {value: tuple(group) for value, group in groups.items()}
+        self.version = version
+        self.loaded_at = time.time()
+        self._by_id = MappingProxyType(by_id)
+        self._indexes = MappingProxyType(indexes)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._by_id
+
+    def get(self, document_id: str) -> Optional[Mapping[str, Any]]:
+        """id でドキュメントを取得"""
+        return self._by_id.get(document_id)
+
+    def find(self, field: IndexField, value: Any) -> Tuple[Mapping[str, Any], ...]:
+        """副次フィールドの値が一致するドキュメント（複合インデックスは値をタプルで指定）"""
+        try:
+            index = self._indexes[field]
+        except KeyError:
+            raise KeyError(f"field {field!r} is not indexed") from None
+        return index.get(value, ())
+
+    def first(self, field: IndexField, value: Any) -> Optional[Mapping[str, Any]]:
+        """find() の先頭（一意なフィールド向け）"""
+        found = self.find(field, value)
+        return found[0] if found else None
+
+    def all(self) -> Tuple[Mapping[str, Any], ...]:
+        return tuple(self._by_id.values())
+
+
+class ReferenceReplicator:
+    """変更フィードでスナップショットを最新に保つレプリケーター"""
+
+    def __init__(
+        self,
+        container,
+        index_fields: Sequence[IndexField] = (),
+        query: str = "SELECT * FROM c",
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        refresh_interval: Optional[float] = DEFAULT_REFRESH_INTERVAL
+    ):
+        self.container = container
+        self.index_fields = tuple(index_fields)
+        self.query = query
+        self.poll_interval = poll_interval
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[ReferenceSnapshot] = None
+        self._reader = ChangeFeedReader(container, start_time=START_FROM_NOW)
+        self._subscribers: List[Callable[[ReferenceSnapshot], Any]] = []
+        self._lock = threading.Lock()
+        # 通知の順序を保つためのロックと、最後に通知したスナップショット
+        self._notify_lock = threading.Lock()
+        self._notified: Optional[ReferenceSnapshot] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.polled_at: Optional[float] = None
+
+    @property
+    def snapshot(self) -> ReferenceSnapshot:
+        """現在のスナップショット（未読み込みなら読み込む）"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._load(force=False)
+        return snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version if self._snapshot is not None else 0
+
+    @property
+    def staleness_seconds(self) -> Optional[float]:
+        """最後に変更フィードを確認してからの経過秒（未確認なら None）"""
+        return None if self.polled_at is None else time.time() - self.polled_at
+
+    def subscribe(self, callback: Callable[[ReferenceSnapshot], Any]):
+        """スナップショットを差し替えるたびに呼ばれるコールバックを登録"""
+        with self._notify_lock:
+            self._subscribers.append(callback)
+            if self._notified is not None:
+                callback(self._notified)
+        return callback
+
+    def load(self) -> ReferenceSnapshot:
+        """コンテナを読み直してスナップショットを差し替える"""
+        return self._load(force=True)
+
+    def _load(self, force: bool) -> ReferenceSnapshot:
+        with self._lock:
+            if not force and self._snapshot is not None:
+                # 待っている間に他のスレッドが読み込み済み
+                return self._snapshot
+            if self._snapshot is None:
+                # 読み込み中の変更を取りこぼさないよう、先に変更フィードの位置を確定する
+                self._reader.drain(lambda items: None)
+                self.polled_at = time.time()
+            snapshot = ReferenceSnapshot(
+                stream_query(self.container, self.query), self.index_fields,
+                version=self.version + 1)
+            self._snapshot = snapshot
+        self._notify(snapshot)
+        return snapshot
+
+    def _notify(self, snapshot: ReferenceSnapshot):
+        """購読者へ version の順に通知（より新しい版を通知済みなら何もしない）"""
+        with self._notify_lock:
+            if self._notified is not None and snapshot.version <= self._notified.version:
+                return
+            # 待っている間にさらに新しい版に差し替わっていれば、そちらを通知する
+            snapshot = self._snapshot
+            self._notified = snapshot
+            for callback in self._subscribers:
+                callback(snapshot)
+
+    def poll(self) -> bool:
+        """変更があれば読み直す（読み直した場合 True）"""
+        if self._snapshot is None:
+            self._load(force=False)
+            return True
+        changed = self._reader.drain(lambda items: None)
+        self.polled_at = time.time()
+        expired = self.refresh_interval is not None \
+            and time.time() - self._snapshot.loaded_at >= self.refresh_interval
+        if changed or expired:
+            self.load()
+            return True
+        return False
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # 失敗しても直前のスナップショットを使い続け、次の周期で再試行する
+                print(f"⚠ 参照データの更新に失敗しました ({self.container.id}): {e}")
+
+    def start(self) -> ReferenceSnapshot:
+        """初回の読み込みを行い、バックグラウンドでのポーリングを開始"""
+        snapshot = self.snapshot
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"reference-{self.container.id}", daemon=True)
+        self._thread.start()
+        return snapshot
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
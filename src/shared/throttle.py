@@ -0,0 +1,281 @@
+"""RUバジェットに基づくクライアント側の流量制御
+
+プロビジョニング済みRU/sを上限とするトークンバケットと、
+AIMD（加算増加・乗算減少）方式の同時実行数制御を組み合わせる。
+- リクエスト前に推定RUをトークンバケットから引き当て、実際の消費RUで補正する
+- 成功するたびに同時実行数を少しずつ増やし、429を受けたら半減させる
+- x-ms-retry-after-ms が返された場合はその時間だけ全リクエストを待機させる
+
+同期（スレッド）・非同期（asyncio）のどちらからでも利用できる。
+
+使用例:
+    controller = RUBudgetController(provisioned_ru=400)
+    controller.run(container.upsert_item, item, kind="upsert")
+    await controller.arun(async_container.upsert_item, item, kind="upsert")
+"""
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, TypeVar
+import asyncio
+import os
+import threading
+import time
+
+T = TypeVar("T")
+
+DEFAULT_PROVISIONED_RU = 400.0
+# 推定RUの初期値（1KB程度のドキュメントの書き込み）
+DEFAULT_ESTIMATED_RU = 10.0
+# 同時実行数の上限到達時の待機間隔
+_POLL_INTERVAL = 0.005
+
+
+def _header_float(headers: Optional[Mapping[str, str]], name: str) -> Optional[float]:
+    if not headers:
+        return None
+    value = headers.get(name)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def response_headers(result: Any) -> Optional[Mapping[str, str]]:
+    """操作結果（CosmosDict / CosmosList 等）からレスポンスヘッダーを取得"""
+    get_headers = getattr(result, "get_response_headers", None)
+    return get_headers() if get_headers is not None else None
+
+
+class _Ticket:
+    """acquire() で払い出される実行権"""
+    __slots__ = ("kind", "units", "estimated_ru", "started_at")
+
+    def __init__(self, kind: str, units: int, estimated_ru: float):
+        self.kind = kind
+        self.units = units
+        self.estimated_ru = estimated_ru
+        self.started_at = time.monotonic()
+
+
+class RUBudgetController:
+    """RU/sバジェットと429に応じて同時実行数を調整するコントローラー"""
+
+    def __init__(
+        self,
+        provisioned_ru: Optional[float] = None,
+        utilization: float = 0.9,
+        initial_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_concurrency: int = 64,
+        decrease_factor: float = 0.5,
+        decrease_cooldown: float = 1.0
+    ):
+        if provisioned_ru is None:
+            provisioned_ru = float(os.getenv("COSMOS_DB_PROVISIONED_RU", DEFAULT_PROVISIONED_RU))
+        self.provisioned_ru = provisioned_ru
+        self.rate = provisioned_ru * utilization
+        # 1秒分のバーストを許容
+        self.capacity = self.rate
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._tokens = self.capacity
+        self._refilled_at = time.monotonic()
+        self._limit = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        # 操作種別ごとの1単位あたり消費RUの指数移動平均
+        self._unit_cost: Dict[str, float] = {}
+        self._stats = {
+            "requests": 0,
+            "throttled": 0,
+            "request_charge": 0.0,
+        }
+        self._started_at = time.monotonic()
+
+    # ------------------------------------------------------------------
+    # 状態
+    # ------------------------------------------------------------------
+
+    @property
+    def concurrency_limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["concurrency_limit"] = int(self._limit)
+            stats["in_flight"] = self._in_flight
+        elapsed = max(time.monotonic() - self._started_at, 1e-9)
+        stats["ru_per_second"] = round(stats["request_charge"] / elapsed, 2)
+        stats["request_charge"] = round(stats["request_charge"], 2)
+        return stats
+
+    def estimate(self, kind: str, units: int = 1) -> float:
+        """操作種別と件数から推定RUを算出"""
+        return self._unit_cost.get(kind, DEFAULT_ESTIMATED_RU) * units
+
+    # ------------------------------------------------------------------
+    # 実行権の取得・返却
+    # ------------------------------------------------------------------
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _try_acquire(self, kind: str, units: int, estimated_ru: Optional[float]):
+        """実行権を取得できれば _Ticket、できなければ待機秒数を返す（ロック取得済みで呼ぶ）"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._in_flight >= int(self._limit):
+            return _POLL_INTERVAL
+        self._refill(now)
+        estimate = estimated_ru if estimated_ru is not None else self.estimate(kind, units)
+        # バケット容量を超える大きな操作は満タン時に通す
+        needed = min(estimate, self.capacity)
+        if self._tokens < needed:
+            return (needed - self._tokens) / self.rate
+        self._tokens -= estimate
+        self._in_flight += 1
+        return _Ticket(kind, units, estimate)
+
+    def acquire(
+        self,
+        kind: str = "default",
+        units: int = 1,
+        estimated_ru: Optional[float] = None
+    ) -> _Ticket:
+        """実行権を取得するまでブロック"""
+        with self._released:
+            while True:
+                result = self._try_acquire(kind, units, estimated_ru)
+                if isinstance(result, _Ticket):
+                    return result
+                self._released.wait(timeout=result)
+
+    async def acquire_async(
+        self,
+        kind: str = "default",
+        units: int = 1,
+        estimated_ru: Optional[float] = None
+    ) -> _Ticket:
+        """acquire() の非同期版"""
+        while True:
+            with self._lock:
+                result = self._try_acquire(kind, units, estimated_ru)
+            if isinstance(result, _Ticket):
+                return result
+            await asyncio.sleep(result)
+
+    def complete(
+        self,
+        ticket: _Ticket,
+        headers: Optional[Mapping[str, str]] = None,
+        throttled: bool = False
+    ):
+        """実行結果を反映して実行権を返却
+
+        headers から実際の消費RU・SDK内部の429リトライ回数・retry-after を読み取る。
+        """
+        charge = _header_float(headers, "x-ms-request-charge")
+        retry_after_ms = _header_float(headers, "x-ms-retry-after-ms")
+        sdk_retries = _header_float(headers, "x-ms-throttle-retry-count") or 0
+        throttled = throttled or sdk_retries > 0
+
+        with self._released:
+            now = time.monotonic()
+            self._in_flight -= 1
+            self._stats["requests"] += 1
+
+            if charge is not None:
+                self._stats["request_charge"] += charge
+                # 推定との差分をバケットに反映
+                self._tokens -= charge - ticket.estimated_ru
+                if not throttled and ticket.units > 0:
+                    unit_cost = charge / ticket.units
+                    previous = self._unit_cost.get(ticket.kind)
+                    self._unit_cost[ticket.kind] = unit_cost if previous is None else (
+                        previous * 0.8 + unit_cost * 0.2)
+            elif throttled:
+                # 429で消費されなかった推定分を返却
+                self._tokens += ticket.estimated_ru
+
+            if throttled:
+                self._stats["throttled"] += 1
+                if retry_after_ms:
+                    self._paused_until = max(self._paused_until, now + retry_after_ms / 1000.0)
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self._limit = max(float(self.min_concurrency),
+                                      self._limit * self.decrease_factor)
+                    self._last_decrease = now
+            else:
+                # 1ウィンドウ（現在の同時実行数分の完了）ごとに +1
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+
+            self._released.notify_all()
+
+    # ------------------------------------------------------------------
+    # 実行ヘルパー
+    # ------------------------------------------------------------------
+
+    def run(
+        self,
+        fn: Callable[..., T],
+        *args,
+        kind: str = "default",
+        units: int = 1,
+        max_attempts: int = 10,
+        **kwargs
+    ) -> T:
+        """流量制御下で fn を実行し、429の場合は retry-after に従って再試行"""
+        attempt = 0
+        while True:
+            attempt += 1
+            ticket = self.acquire(kind, units)
+            try:
+                result = fn(*args, **kwargs)
+            except CosmosHttpResponseError as e:
+                throttled = e.status_code == 429
+                self.complete(ticket, e.headers, throttled=throttled)
+                if throttled and attempt < max_attempts:
+                    continue
+                raise
+            except BaseException:
+                self.complete(ticket)
+                raise
+            self.complete(ticket, response_headers(result))
+            return result
+
+    async def arun(
+        self,
+        fn: Callable[..., Awaitable[T]],
+        *args,
+        kind: str = "default",
+        units: int = 1,
+        max_attempts: int = 10,
+        **kwargs
+    ) -> T:
+        """run() の非同期版"""
+        attempt = 0
+        while True:
+            attempt += 1
+            ticket = await self.acquire_async(kind, units)
+            try:
+                result = await fn(*args, **kwargs)
+            except CosmosHttpResponseError as e:
+                throttled = e.status_code == 429
+                self.complete(ticket, e.headers, throttled=throttled)
+                if throttled and attempt < max_attempts:
+                    continue
+                raise
+            except BaseException:
+                self.complete(ticket)
+                raise
+            self.complete(ticket, response_headers(result))
+            return result